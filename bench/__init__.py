@@ -0,0 +1 @@
+"""性能测试：本地替身API和视频服务器，以及各项指标的测量（python -m bench）"""
@@ -0,0 +1,6 @@
+"""python -m bench：性能测试"""
+import sys
+
+from bench.runner import main
+
+sys.exit(main())
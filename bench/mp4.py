@@ -0,0 +1,29 @@
+"""生成测试用的 MP4 文件结构（只有盒子结构，没有可解码的画面）"""
+import struct
+
+
+def box(kind, body):
+    return struct.pack(">I4s", 8 + len(body), kind) + body
+
+
+def full_box(kind, body, version=0):
+    return box(kind, bytes([version, 0, 0, 0]) + body)
+
+
+def track(handler, codec, width=0, height=0):
+    tkhd = full_box(b"tkhd", struct.pack(">IIIII", 0, 0, 1, 0, 0) + bytes(52) + struct.pack(">II", width << 16, height << 16))
+    hdlr = full_box(b"hdlr", bytes(4) + handler + bytes(12) + b"bench\0")
+    entry = bytes(6) + b"\0\1" + bytes(16) + struct.pack(">HH", width, height) + bytes(50)
+    stsd = full_box(b"stsd", struct.pack(">I", 1) + box(codec, entry))
+    stbl = box(b"stbl", stsd)
+    return box(b"trak", tkhd + box(b"mdia", hdlr + box(b"minf", stbl)))
+
+
+def make_mp4(size, duration=60.0, width=1280, height=720, faststart=True, tag=b""):
+    """大约 size 字节的 MP4，tag 写在 mdat 的开头和末尾，让每个视频的内容指纹不同"""
+    mvhd = full_box(b"mvhd", struct.pack(">IIII", 0, 0, 1000, int(duration * 1000)) + bytes(80))
+    moov = box(b"moov", mvhd + track(b"vide", b"avc1", width, height) + track(b"soun", b"mp4a"))
+    ftyp = box(b"ftyp", b"isom\0\0\0\0isomavc1")
+    payload_size = max(2 * len(tag), size - len(ftyp) - len(moov) - 8)
+    mdat = box(b"mdat", tag + bytes(payload_size - 2 * len(tag)) + tag)
+    return ftyp + moov + mdat if faststart else ftyp + mdat + moov
@@ -0,0 +1,122 @@
+"""运行性能测试，结果保存为 JSON，可以和基准结果比较
+
+    python -m bench --output before.json
+    python -m bench --output after.json --baseline before.json
+    python -m bench --latency 0.2 --bandwidth 2000 --failure-rate 0.1 --only fetch download
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+
+from bench import suites
+from bench.server import StandInServer
+
+SUITES = {
+    "fetch": lambda server: suites.fetch_latency(server),
+    "download": lambda server: suites.download_throughput(server),
+    "ttff": lambda server: suites.time_to_first_frame(server),
+    "playlist": lambda server: suites.playlist_view_cost(),
+    "save": lambda server: suites.save_cost(),
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m bench", description="随机mn视频的性能测试")
+    parser.add_argument("--output", default="bench_results.json", help="结果文件")
+    parser.add_argument("--baseline", help="与这个结果文件比较")
+    parser.add_argument("--threshold", type=float, default=0.10, help="变差超过这个比例时视为退化（默认 0.10）")
+    parser.add_argument("--only", nargs="+", choices=sorted(SUITES), help="只运行这些测试")
+    parser.add_argument("--latency", type=float, default=0.0, help="替身服务器每个请求的延迟(秒)")
+    parser.add_argument("--bandwidth", type=float, help="替身服务器每个连接的速度上限(KB/s)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="替身服务器返回503的概率")
+    parser.add_argument("--video-size", type=float, default=8, help="生成的视频大小(MB)")
+    parser.add_argument("--video", help="用这个真实的视频文件代替生成的视频（测量首帧时间需要）")
+    parser.add_argument("--seed", type=int, default=0, help="随机数种子")
+    return parser
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(results, baseline, threshold):
+    """逐项和基准比较，返回 (输出行, 退化的指标数)"""
+    lines, regressions = [], 0
+    for name, current in sorted(results.items()):
+        previous = baseline.get(name)
+        if not previous or current["unit"] == "info" or not previous["value"]:
+            continue
+        change = current["value"] / previous["value"] - 1
+        higher_is_better = current["unit"].endswith("/s")
+        worse = -change if higher_is_better else change
+        mark = ""
+        if worse > threshold:
+            mark = "  <-- 退化"
+            regressions += 1
+        elif worse < -threshold:
+            mark = "  (改进)"
+        lines.append(f"{name:<40}{previous['value']:>12.3f} -> {current['value']:>12.3f} "
+                     f"{current['unit']:<7}{change:+8.1%}{mark}")
+    return lines, regressions
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    server = StandInServer(
+        latency=args.latency,
+        bandwidth=args.bandwidth * 1024 if args.bandwidth else None,
+        failure_rate=args.failure_rate,
+        video_size=int(args.video_size * 1024 ** 2),
+        video_file=args.video,
+        seed=args.seed
+    )
+    results, skipped = {}, {}
+    with server:
+        for name in args.only or list(SUITES):
+            print(f"运行 {name} ...", file=sys.stderr, flush=True)
+            try:
+                results.update(SUITES[name](server))
+            except Exception as e:  # 缺少 vlc/requests 或没有真实视频时跳过
+                skipped[name] = f"{type(e).__name__}: {e}"
+                print(f"  跳过: {skipped[name]}", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "server": {"latency": args.latency, "bandwidth_kbps": args.bandwidth,
+                       "failure_rate": args.failure_rate, "video_size_mb": args.video_size,
+                       "video": args.video, "seed": args.seed},
+            "requests": server.requests,
+            "failures": server.failures,
+            "skipped": skipped
+        },
+        "results": results
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    for name, item in sorted(results.items()):
+        value = item["value"]
+        print(f"{name:<40}{value:>12.3f} {item['unit']}" if isinstance(value, (int, float)) else f"{name:<40}{value:>12}")
+    print(f"结果已保存到 {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)["results"]
+        lines, regressions = compare(results, baseline, args.threshold)
+        print(f"\n与 {args.baseline} 比较:")
+        print("\n".join(lines))
+        if regressions:
+            print(f"{regressions} 项指标退化超过 {args.threshold:.0%}")
+            return 1
+    return 0
@@ -0,0 +1,179 @@
+"""本地替身服务器：模拟随机视频API和视频CDN，可以注入延迟、限速和失败"""
+import http.server
+import json
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from bench.mp4 import make_mp4
+
+API_PATH = "/api/MP4_xiaojiejie"
+WRITE_CHUNK = 16 * 1024
+
+
+class StandInServer:
+    """API 返回 /videos/<n>.mp4 形式的地址，视频支持 HEAD 和 Range
+
+    latency 是每个请求的额外延迟(秒)，bandwidth 是每个连接的速度上限(字节/秒，None 为不限)，
+    failure_rate 是请求返回 503 的概率。seed 固定后 API 返回的地址序列和失败的请求都可以重现。
+    video_file 指定时所有视频都返回这个文件（测量首帧时间需要真实可解码的视频）。
+    """
+
+    def __init__(self, latency=0.0, bandwidth=None, failure_rate=0.0, video_size=2 * 1024 ** 2,
+                 videos=100000, video_file=None, seed=0):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.failure_rate = failure_rate
+        self.video_size = video_size
+        self.videos = videos
+        self.video_file = video_file
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+        self._videos = OrderedDict()  # 最近生成的视频内容
+        self._httpd = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._httpd.server_port}"
+
+    @property
+    def api_url(self):
+        return f"{self.base_url}{API_PATH}?type=json"
+
+    def video_url(self, n):
+        return f"{self.base_url}/videos/{n}.mp4"
+
+    def start(self):
+        handler = type("Handler", (_Handler,), {"config": self})
+        self._httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._httpd.daemon_threads = True
+        self._httpd.handle_error = lambda request, address: None  # 客户端中途断开是正常的
+        threading.Thread(target=self._httpd.serve_forever, name="bench-server", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def next_video(self):
+        """API 下一次返回的视频序号"""
+        with self._lock:
+            return self.rng.randrange(self.videos)
+
+    def should_fail(self):
+        with self._lock:
+            self.requests += 1
+            if self.failure_rate and self.rng.random() < self.failure_rate:
+                self.failures += 1
+                return True
+            return False
+
+    def video(self, n):
+        """第 n 个视频的内容"""
+        if self.video_file:
+            n = -1
+        with self._lock:
+            data = self._videos.get(n)
+            if data is not None:
+                self._videos.move_to_end(n)
+                return data
+        if self.video_file:
+            with open(self.video_file, 'rb') as f:
+                data = f.read()
+        else:
+            data = make_mp4(self.video_size, tag=f"video-{n:08d}".encode())
+        with self._lock:
+            self._videos[n] = data
+            while len(self._videos) > 8:
+                self._videos.popitem(last=False)
+        return data
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # 和真实的CDN一样，否则小响应会多等待一次延迟确认(约40ms)
+    config = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.handle_request(send_body=True)
+
+    def do_HEAD(self):
+        self.handle_request(send_body=False)
+
+    def handle_request(self, send_body):
+        config = self.config
+        if config.latency:
+            time.sleep(config.latency)
+        if config.should_fail():
+            self.send_bytes(503, b"", send_body)
+            return
+        path = self.path.split("?", 1)[0]
+        if path == API_PATH:
+            body = json.dumps({"code": 200, "mp4_video": config.video_url(config.next_video())}).encode()
+            self.send_bytes(200, body, send_body, content_type="application/json")
+            return
+        match = re.fullmatch(r"/videos/(\d+)\.mp4", path)
+        if not match:
+            self.send_bytes(404, b"", send_body)
+            return
+        self.send_video(config.video(int(match.group(1))), send_body)
+
+    def send_video(self, data, send_body):
+        total = len(data)
+        start, end = 0, total - 1
+        match = re.fullmatch(r"bytes=(\d*)-(\d*)", self.headers.get("Range", ""))
+        if match and (match.group(1) or match.group(2)):
+            if match.group(1):
+                start = int(match.group(1))
+                end = min(int(match.group(2)), total - 1) if match.group(2) else total - 1
+            else:
+                start = max(0, total - int(match.group(2)))
+            if start >= total:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{total}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{total}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        if send_body:
+            self.write_throttled(data[start:end + 1])
+
+    def send_bytes(self, status, body, send_body, content_type="text/plain"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.write_throttled(body)
+
+    def write_throttled(self, data):
+        bandwidth = self.config.bandwidth
+        started = time.perf_counter()
+        for offset in range(0, len(data), WRITE_CHUNK):
+            self.wfile.write(data[offset:offset + WRITE_CHUNK])
+            if bandwidth:
+                # 按已发送的字节数计算应该经过的时间
+                delay = (offset + WRITE_CHUNK) / bandwidth - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
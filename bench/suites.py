@@ -0,0 +1,242 @@
+"""各项性能测试，每个函数返回 {指标名: {"value": 数值, "unit": 单位}}
+
+单位以 "/s" 结尾的指标越大越好，其他（ms、s）越小越好。
+"""
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+PLAYLIST_SIZES = (10, 1000, 100000)
+HISTORY_SIZES = (1000, 10000, 100000)
+
+
+def metric(value, unit):
+    return {"value": round(value, 4), "unit": unit}
+
+
+def timed(func, repeat=20, warmup=1):
+    """多次执行 func，返回每次耗时(毫秒)的列表"""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def summarize(name, samples, unit="ms"):
+    """中位数和 p95"""
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return {f"{name}.p50": metric(statistics.median(ordered), unit), f"{name}.p95": metric(p95, unit)}
+
+
+def _engine():
+    from mnvideo import aio
+    engine = aio.AsyncEngine()
+    engine.start()
+    return engine
+
+
+def fetch_latency(server, count=50, batch=100):
+    """请求API得到视频地址的延迟，以及批量获取的速度"""
+    from mnvideo import api
+    api.API_URL = server.api_url
+    results = {}
+    engine = _engine()
+    try:
+        samples, errors = [], 0
+        for _ in range(count):
+            started = time.perf_counter()
+            try:
+                engine.run(api.fetch_video_url_async(engine.client))
+            except Exception:
+                errors += 1
+            samples.append((time.perf_counter() - started) * 1000)
+        results.update(summarize("fetch.async", samples))
+        results["fetch.async.errors"] = metric(errors, "count")
+
+        started = time.perf_counter()
+        fetcher = api.fetch_video_batch(batch, concurrency=8, rate=1000, engine=engine)
+        fetcher.wait()
+        results["fetch.batch.throughput"] = metric(len(fetcher.urls) / (time.perf_counter() - started), "urls/s")
+    finally:
+        engine.stop()
+
+    samples = timed(lambda: api.fetch_video_url(timeout=10), repeat=count, warmup=1)
+    results.update(summarize("fetch.sync", samples))
+    return results
+
+
+def download_throughput(server, repeat=3):
+    """下载一个视频的速度（asyncio 引擎和 requests 两种实现）"""
+    from mnvideo import aio
+    from mnvideo.download import stream_download
+    results = {}
+    size = len(server.video(0)) / 1024 ** 2
+    engine = _engine()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "video.mp4")
+        try:
+            samples = timed(lambda: engine.run(aio.download(engine.client, server.video_url(0), path)),
+                            repeat=repeat)
+        finally:
+            engine.stop()
+        results["download.async"] = metric(size / (statistics.median(samples) / 1000), "MB/s")
+        samples = timed(lambda: stream_download(server.video_url(0), path), repeat=repeat)
+        results["download.sync"] = metric(size / (statistics.median(samples) / 1000), "MB/s")
+    return results
+
+
+def time_to_first_frame(server, repeat=5, settle=2.0):
+    """切换到下一个视频到画面出现的时间：直接打开和已在备用播放器上预加载两种情况
+
+    需要 python-vlc，并且服务器要用 video_file 提供可以解码的真实视频。
+    """
+    import ctypes
+    import vlc
+    from mnvideo.preload import Preloader, PreloadSlot
+
+    if not server.video_file:
+        raise RuntimeError("需要 --video 指定一个真实的视频文件")
+    instance = vlc.Instance("--no-audio", "--quiet", "--no-xlib")
+    slots, frames, callbacks = [], {}, []
+    for _ in range(2):
+        player = instance.media_player_new()
+        buffer = (ctypes.c_ubyte * (160 * 90 * 4))()
+        frame = threading.Event()
+        lock = vlc.CallbackDecorators.VideoLockCb(
+            lambda opaque, planes, buffer=buffer: planes.__setitem__(0, ctypes.addressof(buffer)))
+        unlock = vlc.CallbackDecorators.VideoUnlockCb(lambda opaque, picture, planes: None)
+        display = vlc.CallbackDecorators.VideoDisplayCb(lambda opaque, picture, frame=frame: frame.set())
+        callbacks.append((buffer, lock, unlock, display))  # 保持回调的引用
+        player.video_set_callbacks(lock, unlock, display, None)
+        player.video_set_format("RV32", 160, 90, 160 * 4)
+        slot = PreloadSlot(player)
+        frames[id(slot)] = frame
+        slots.append(slot)
+    preloader = Preloader(instance, slots)
+
+    def switch(url):
+        for frame in frames.values():
+            frame.clear()
+        started = time.perf_counter()
+        slot, _ = preloader.activate(url)
+        if not frames[id(slot)].wait(10):
+            raise RuntimeError("等待首帧超时")
+        return (time.perf_counter() - started) * 1000
+
+    cold, preloaded = [], []
+    try:
+        for i in range(repeat):
+            cold.append(switch(server.video_url(2 * i)))
+            preloader.preload([server.video_url(2 * i + 1)])
+            time.sleep(settle)
+            preloaded.append(switch(server.video_url(2 * i + 1)))
+    finally:
+        preloader.stop_all()
+    results = summarize("ttff.cold", cold)
+    results.update(summarize("ttff.preloaded", preloaded))
+    return results
+
+
+class HeadlessView:
+    """没有显示器时代替 VirtualTreeview：同样只为可见的行调用 row_func"""
+
+    def __init__(self, rows=30):
+        self.row_func = None
+        self.count = 0
+        self.first = 0
+        self.rows = rows
+
+    def set_count(self, count):
+        self.count = count
+        self.first = max(0, min(self.first, count - self.rows))
+        self.render()
+
+    def refresh(self, index):
+        if self.first <= index < self.first + self.rows and index < self.count:
+            self.row_func(index)
+
+    def see(self, index):
+        if 0 <= index < self.count and not self.first <= index < self.first + self.rows:
+            self.first = max(0, min(index - self.rows // 2, self.count - self.rows))
+            self.render()
+
+    def render(self):
+        for index in range(self.first, min(self.count, self.first + self.rows)):
+            self.row_func(index)
+
+
+def _playlist_view():
+    """有显示器时用真实的 VirtualTreeview，否则用 HeadlessView"""
+    try:
+        import tkinter as tk
+        from mnvideo.virtual_list import VirtualTreeview
+        root = tk.Tk()
+    except Exception:
+        return HeadlessView(), None, "headless"
+    root.geometry("400x600")
+    view = VirtualTreeview(root, None, columns=("序号", "状态"), height=30)
+    view.pack(fill="both", expand=True)
+    root.update()
+    return view, root, "tk"
+
+
+def playlist_view_cost(sizes=PLAYLIST_SIZES):
+    """update_playlist（PlaylistView.sync）的耗时：替换整个列表、追加一个视频、切换当前视频"""
+    from mnvideo.playlist_view import PlaylistView
+    results = {}
+    view, root, kind = _playlist_view()
+    try:
+        for size in sizes:
+            playlist = PlaylistView(view)
+            urls = [f"http://example.com/{i}.mp4" for i in range(size)]
+            samples = timed(lambda: playlist.sync(list(urls), 0), repeat=5)
+            results.update(summarize(f"playlist.{size}.replace", samples))
+            playlist.sync(urls, 0)
+            samples = timed(lambda: (urls.append("http://example.com/new.mp4"), playlist.sync(urls, 0)))
+            results.update(summarize(f"playlist.{size}.append", samples))
+            positions = iter(range(1, 10 ** 6))
+            samples = timed(lambda: playlist.sync(urls, next(positions) * 7919 % len(urls)))
+            results.update(summarize(f"playlist.{size}.switch", samples))
+    finally:
+        if root:
+            root.destroy()
+    results["playlist.view"] = {"value": kind, "unit": "info"}
+    return results
+
+
+def save_cost(sizes=HISTORY_SIZES):
+    """save_data（Storage.flush）的耗时随播放历史增长的变化，以及保存会话快照的耗时"""
+    from mnvideo.storage import Storage
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        storage = Storage(os.path.join(directory, "bench.db"))
+        try:
+            count = 0
+            for size in sizes:
+                for i in range(count, size):
+                    storage.add_history(f"http://example.com/{i % 5000}.mp4", i)
+                storage.flush()
+                count = size
+
+                def add_and_flush():
+                    storage.add_history("http://example.com/new.mp4")
+                    storage.flush()
+                results.update(summarize(f"save.{size}.add_history", timed(add_and_flush)))
+                results.update(summarize(f"save.{size}.recent_history", timed(storage.recent_history)))
+
+                videos = [f"http://example.com/{i}.mp4" for i in range(size)]
+
+                def save_session():
+                    storage.save_session({'current_index': 0, 'position': 0, 'settings': {}}, videos)
+                    storage.flush()
+                results.update(summarize(f"save.{size}.session", timed(save_session, repeat=5)))
+        finally:
+            storage.close()
+    return results
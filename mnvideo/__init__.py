@@ -0,0 +1 @@
+"""随机mn视频播放器的公共模块（与界面无关）"""
@@ -0,0 +1,6 @@
+"""python -m mnvideo：命令行模式"""
+import sys
+
+from mnvideo.cli import main
+
+sys.exit(main())
@@ -0,0 +1,471 @@
+"""asyncio网络核心：在独立线程中运行事件循环，统一负责API请求、HEAD探测和下载
+
+只用标准库实现了一个支持 keep-alive 连接池、重定向、分块传输、Range 和 HTTP 代理的 HTTP/1.1 客户端，
+所有连接都由同一个事件循环管理，大量并发请求不需要每个请求占用一个线程。
+"""
+import asyncio
+import base64
+import concurrent.futures
+import json
+import os
+import ssl
+import threading
+import time
+import urllib.request
+from urllib.parse import unquote, urljoin, urlsplit
+
+from mnvideo import metrics
+from mnvideo.download import CHUNK_SIZE, PROGRESS_INTERVAL, DownloadStopped
+from mnvideo.network import RETRY_STATUS, USER_AGENT, backoff_delay
+
+CONNECT_TIMEOUT = 5  # 秒
+READ_TIMEOUT = 30  # 秒，每次读取的超时
+MAX_REDIRECTS = 5
+REDIRECT_STATUS = frozenset({301, 302, 303, 307, 308})
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# 请求失败时会重试的异常（TimeoutError 和 ConnectionError 都是 OSError 的子类）
+RETRY_ERRORS = (OSError, asyncio.IncompleteReadError)
+
+
+class HTTPError(Exception):
+    """响应状态码表示失败"""
+
+    def __init__(self, status, url):
+        super().__init__(f"HTTP {status}: {url}")
+        self.status = status
+        self.url = url
+
+
+class _Connection:
+    def __init__(self, key, reader, writer, proxy_headers=None):
+        self.key = key
+        self.reader = reader
+        self.writer = writer
+        self.proxy_headers = proxy_headers  # 经HTTP代理发送普通请求时附加的请求头，直连和隧道为None
+        self.reused = False
+
+    def close(self):
+        self.writer.close()
+
+
+class AsyncResponse:
+    """HTTP响应，响应体需要按需读取；用完后必须 close()（或使用 async with）
+
+    headers 的键都是小写。读完响应体后连接会放回连接池。
+    """
+
+    def __init__(self, client, conn, limit, method, url, status, headers, keep_alive):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self._client = client
+        self._conn = conn
+        self._limit = limit
+        self._keep_alive = keep_alive and headers.get("connection", "").lower() != "close"
+        self._chunked = "chunked" in headers.get("transfer-encoding", "").lower()
+        self._chunk_left = 0
+        length = headers.get("content-length")
+        self._remaining = int(length) if length and length.isdigit() and not self._chunked else None
+        self._eof = method == "HEAD" or status in (204, 304) or self._remaining == 0
+        if self._remaining is None and not self._chunked:
+            self._keep_alive = False  # 读到连接关闭为止，连接不能复用
+
+    @property
+    def status_code(self):
+        return self.status
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise HTTPError(self.status, self.url)
+
+    async def read_chunk(self, size=CHUNK_SIZE):
+        """读取最多 size 字节的响应体，读完时返回空字节串"""
+        if self._eof:
+            return b""
+        reader = self._conn.reader
+        timeout = self._client.read_timeout
+        if self._chunked:
+            if self._chunk_left == 0:
+                line = await asyncio.wait_for(reader.readline(), timeout)
+                self._chunk_left = int(line.split(b";", 1)[0].strip() or b"0", 16)
+                if self._chunk_left == 0:
+                    # 跳过结尾的 trailer
+                    while (await asyncio.wait_for(reader.readline(), timeout)).strip():
+                        pass
+                    self._finish()
+                    return b""
+            data = await asyncio.wait_for(reader.read(min(size, self._chunk_left)), timeout)
+            if not data:
+                raise ConnectionError("服务器提前关闭了连接")
+            self._chunk_left -= len(data)
+            if self._chunk_left == 0:
+                await asyncio.wait_for(reader.readexactly(2), timeout)  # 块末尾的 CRLF
+            return data
+        if self._remaining is None:
+            data = await asyncio.wait_for(reader.read(size), timeout)
+            if not data:
+                self._finish()
+            return data
+        data = await asyncio.wait_for(reader.read(min(size, self._remaining)), timeout)
+        if not data:
+            raise ConnectionError("服务器提前关闭了连接")
+        self._remaining -= len(data)
+        if self._remaining == 0:
+            self._finish()
+        return data
+
+    async def iter_chunks(self, size=CHUNK_SIZE):
+        """逐块读取响应体"""
+        while True:
+            chunk = await self.read_chunk(size)
+            if not chunk:
+                return
+            yield chunk
+
+    async def read(self):
+        """读取全部响应体"""
+        return b"".join([chunk async for chunk in self.iter_chunks()])
+
+    async def json(self):
+        return json.loads(await self.read())
+
+    def close(self):
+        """释放连接：响应体已读完时放回连接池，否则关闭"""
+        if self._conn is None:
+            return
+        self._client._release(self._conn, self._eof and self._keep_alive)
+        self._conn = None
+        self._limit.release()
+
+    def _finish(self):
+        self._eof = True
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+
+class AsyncHTTPClient:
+    """基于 asyncio 流的 HTTP/1.1 客户端，只能在所属的事件循环中使用
+
+    每个主机最多同时使用 per_host 个连接，超出的请求等待空闲连接；
+    连接错误、超时和可重试的状态码按 network.backoff_delay 退避后重试。
+    proxies 的格式与 urllib.request.getproxies() 相同（默认读取 HTTP(S)_PROXY 环境变量和系统代理设置，
+    和 requests 一样遵守 NO_PROXY），https 地址经代理的 CONNECT 隧道访问。
+    """
+
+    def __init__(self, per_host=8, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 retries=3, backoff=0.5, proxies=None):
+        self.per_host = per_host
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.proxies = urllib.request.getproxies() if proxies is None else proxies
+        self._bypass = {}  # 主机 -> 是否不使用代理
+        self._idle = {}  # (协议, 主机, 端口) -> 空闲连接列表
+        self._limits = {}  # (协议, 主机, 端口) -> Semaphore
+        self._ssl = None
+
+    def close(self):
+        """关闭所有空闲连接"""
+        for connections in self._idle.values():
+            for conn in connections:
+                conn.close()
+        self._idle.clear()
+
+    async def request(self, method, url, headers=None, allow_redirects=True, retries=None):
+        """发送请求并返回 AsyncResponse（只读取了响应头）"""
+        retries = self.retries if retries is None else retries
+        for _ in range(MAX_REDIRECTS + 1):
+            response = await self._request_with_retry(method, url, headers, retries)
+            location = response.headers.get("location")
+            if not allow_redirects or response.status not in REDIRECT_STATUS or not location:
+                return response
+            response.close()
+            url = urljoin(url, location)
+            if response.status == 303 and method != "HEAD":
+                method = "GET"
+        raise HTTPError(response.status, url)
+
+    async def get(self, url, **kwargs):
+        return await self.request("GET", url, **kwargs)
+
+    async def head(self, url, **kwargs):
+        """HEAD请求，返回已关闭的响应（只有状态码和响应头）"""
+        response = await self.request("HEAD", url, **kwargs)
+        response.close()
+        return response
+
+    async def get_json(self, url, **kwargs):
+        """GET请求并解析JSON，状态码表示失败时抛出 HTTPError"""
+        async with await self.get(url, **kwargs) as response:
+            response.raise_for_status()
+            return await response.json()
+
+    async def _request_with_retry(self, method, url, headers, retries):
+        attempt = 0
+        while True:
+            try:
+                response = await self._send(method, url, headers)
+            except RETRY_ERRORS:
+                if attempt >= retries:
+                    raise
+            else:
+                if response.status not in RETRY_STATUS or attempt >= retries:
+                    return response
+                response.close()
+            metrics.inc("http.retries")
+            await asyncio.sleep(backoff_delay(attempt, self.backoff))
+            attempt += 1
+
+    async def _send(self, method, url, headers):
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in DEFAULT_PORTS or not parts.hostname:
+            raise ValueError(f"不支持的地址: {url}")
+        key = (scheme, parts.hostname, parts.port or DEFAULT_PORTS[scheme])
+        limit = self._limits.setdefault(key, asyncio.Semaphore(self.per_host))
+        await limit.acquire()
+        try:
+            while True:
+                conn = await self._connect(key)
+                try:
+                    await self._write_request(conn, method, parts, headers)
+                    status, response_headers, keep_alive = await asyncio.wait_for(
+                        self._read_head(conn), self.read_timeout)
+                    break
+                except RETRY_ERRORS:
+                    conn.close()
+                    if not conn.reused:
+                        raise
+                    # 复用的空闲连接可能已被服务器关闭，换一个连接再试
+                except BaseException:
+                    conn.close()  # 被取消（如 wait_for 超时）时连接处于不确定的状态，不能放回连接池
+                    raise
+            return AsyncResponse(self, conn, limit, method, url, status, response_headers, keep_alive)
+        except BaseException:
+            limit.release()
+            raise
+
+    async def _connect(self, key):
+        idle = self._idle.get(key)
+        while idle:
+            conn = idle.pop()
+            if not conn.reader.at_eof():
+                conn.reused = True
+                return conn
+            conn.close()
+        scheme, host, port = key
+        ssl_context = None
+        if scheme == "https":
+            if self._ssl is None:
+                self._ssl = ssl.create_default_context()
+            ssl_context = self._ssl
+        proxy = self._proxy_for(scheme, host)
+        if proxy is None:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(host, port, ssl=ssl_context), self.connect_timeout)
+            return _Connection(key, reader, writer)
+
+        proxy_host, proxy_port, proxy_headers = proxy
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(proxy_host, proxy_port), self.connect_timeout)
+        conn = _Connection(key, reader, writer, proxy_headers)
+        if scheme == "http":
+            return conn
+        # https：先让代理建立到目标主机的隧道，再在隧道上握手
+        conn.proxy_headers = None
+        try:
+            await asyncio.wait_for(self._open_tunnel(conn, host, port, proxy_headers, ssl_context),
+                                   self.connect_timeout)
+        except BaseException:
+            conn.close()
+            raise
+        return conn
+
+    def _proxy_for(self, scheme, host):
+        """目标主机使用的代理 (主机, 端口, 请求头)，不使用代理时返回None"""
+        proxy = self.proxies.get(scheme)
+        if not proxy:
+            return None
+        bypass = self._bypass.get(host)
+        if bypass is None:
+            bypass = self._bypass[host] = bool(urllib.request.proxy_bypass(host))
+        if bypass:
+            return None
+        parts = urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+        headers = {}
+        if parts.username:
+            credentials = f"{unquote(parts.username)}:{unquote(parts.password or '')}"
+            headers["Proxy-Authorization"] = "Basic " + base64.b64encode(credentials.encode()).decode("ascii")
+        return parts.hostname, parts.port or 8080, headers
+
+    async def _open_tunnel(self, conn, host, port, proxy_headers, ssl_context):
+        lines = [f"CONNECT {host}:{port} HTTP/1.1", f"Host: {host}:{port}", f"User-Agent: {USER_AGENT}"]
+        lines.extend(f"{name}: {value}" for name, value in proxy_headers.items())
+        conn.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        await conn.writer.drain()
+        status, _, _ = await self._read_head(conn)
+        if status != 200:
+            raise ConnectionError(f"代理拒绝建立到 {host}:{port} 的隧道: HTTP {status}")
+        if not hasattr(conn.writer, "start_tls"):
+            raise ConnectionError("经代理访问 https 需要 Python 3.11 或更高版本")
+        await conn.writer.start_tls(ssl_context, server_hostname=host)
+
+    async def _write_request(self, conn, method, parts, headers):
+        scheme, host, port = conn.key
+        target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        host_header = host if port == DEFAULT_PORTS[scheme] else f"{host}:{port}"
+        if conn.proxy_headers is not None:
+            target = f"{scheme}://{host_header}{target}"  # 经代理的普通请求使用完整地址
+        lines = [f"{method} {target} HTTP/1.1", f"Host: {host_header}",
+                 f"User-Agent: {USER_AGENT}", "Accept-Encoding: identity", "Connection: keep-alive"]
+        lines.extend(f"{name}: {value}" for name, value in (conn.proxy_headers or {}).items())
+        lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+        conn.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        await asyncio.wait_for(conn.writer.drain(), self.read_timeout)
+
+    async def _read_head(self, conn):
+        line = await conn.reader.readline()
+        if not line:
+            raise ConnectionError("服务器关闭了连接")
+        version, status = line.decode("latin-1").split(None, 2)[:2]
+        headers = {}
+        while True:
+            line = await conn.reader.readline()
+            if not line.strip():
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        return int(status), headers, version == "HTTP/1.1"
+
+    def _release(self, conn, reusable):
+        idle = self._idle.setdefault(conn.key, [])
+        if reusable and len(idle) < self.per_host:
+            idle.append(conn)
+        else:
+            conn.close()
+
+
+async def download(client, url, path, progress=None, chunk_size=CHUNK_SIZE, resume=False,
+                   should_stop=None):
+    """download.stream_download 的协程版本，参数和返回值相同
+
+    progress 和 should_stop 在事件循环线程中调用；写文件是同步的，但每次只写一小块。
+    """
+    temp_path = path + ".part"
+    offset = os.path.getsize(temp_path) if resume and os.path.exists(temp_path) else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else None
+    response = await client.get(url, headers=headers)
+    try:
+        if offset and response.status == 416:
+            # 临时文件与服务器上的文件不一致，重新下载
+            response.close()
+            offset = 0
+            response = await client.get(url)
+        response.raise_for_status()
+        if offset and response.status != 206:
+            offset = 0  # 服务器不支持Range，从头下载
+        length = int(response.headers.get("content-length") or 0)
+        total = offset + length if length else None
+        done = offset
+        last_report = 0.0
+        try:
+            with open(temp_path, "ab" if offset else "wb") as f:
+                async for chunk in response.iter_chunks(chunk_size):
+                    if should_stop and should_stop():
+                        raise DownloadStopped()
+                    f.write(chunk)
+                    done += len(chunk)
+                    now = time.monotonic()
+                    if progress and now - last_report >= PROGRESS_INTERVAL:
+                        last_report = now
+                        progress(done, total)
+        except BaseException:
+            if not resume and os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    finally:
+        response.close()
+    os.replace(temp_path, path)
+    if progress:
+        progress(done, total)
+    return done
+
+
+class AsyncEngine:
+    """在后台线程中运行 asyncio 事件循环，供界面线程和工作线程提交网络任务
+
+    dispatch(func, *args) 把回调交回界面线程（例如播放器的 call_in_ui），
+    没有提供时回调直接在事件循环线程中执行。
+    """
+
+    def __init__(self, dispatch=None, per_host=8):
+        self.dispatch = dispatch
+        self.per_host = per_host
+        self.loop = None
+        self.client = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    def start(self):
+        """启动事件循环线程"""
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name="asyncio-engine", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def stop(self, timeout=2.0):
+        """取消所有未完成的任务并停止事件循环"""
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout)
+
+    def submit(self, coro, callback=None):
+        """在事件循环中运行协程，返回 concurrent.futures.Future（调用其 cancel() 可取消）
+
+        callback(result, error) 在协程结束后经 dispatch 调用，被取消时不调用。
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        if callback:
+            def done(f):
+                if f.cancelled():
+                    return
+                error = f.exception()
+                result = None if error else f.result()
+                if self.dispatch:
+                    self.dispatch(callback, result, error)
+                else:
+                    callback(result, error)
+            future.add_done_callback(done)
+        return future
+
+    def run(self, coro, timeout=None):
+        """在工作线程中同步等待协程的结果（不能在事件循环线程或界面线程中调用）"""
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.client = AsyncHTTPClient(per_host=self.per_host)
+        self._ready.set()
+        try:
+            self.loop.run_forever()
+            tasks = asyncio.all_tasks(self.loop)
+            for task in tasks:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        finally:
+            self.client.close()
+            self.loop.close()
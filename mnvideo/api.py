@@ -0,0 +1,67 @@
+"""随机视频API"""
+from mnvideo import metrics, network
+from mnvideo.batch import BatchFetcher
+
+API_URL = "https://api.kuleu.com/api/MP4_xiaojiejie?type=json"
+
+
+def fetch_video_url(timeout=10):
+    """请求一次API，返回视频地址（没有地址时返回None）"""
+    with metrics.timer("fetch.api"):
+        response = network.get(API_URL, timeout=timeout)
+        response.raise_for_status()
+        return response.json().get('mp4_video') or None
+
+
+def fetch_unique_video_url(dedup, attempts=5, timeout=10):
+    """请求API直到得到一个没有获取过的视频
+
+    attempts 次都重复时（API的视频大多已经获取过）返回最后一个重复的地址，保证播放不会停下；
+    API没有返回地址时返回None。
+    """
+    duplicate = None
+    for _ in range(attempts):
+        url = fetch_video_url(timeout)
+        if url and dedup.register_if_new(url):
+            return url
+        duplicate = url or duplicate
+    if duplicate:
+        metrics.inc("fetch.duplicate_fallback")
+    return duplicate
+
+
+async def fetch_video_url_async(client):
+    """fetch_video_url 的协程版本，client 是 aio.AsyncHTTPClient"""
+    with metrics.timer("fetch.api"):
+        data = await client.get_json(API_URL)
+    return data.get('mp4_video') or None
+
+
+async def fetch_unique_video_url_async(client, dedup, attempts=5):
+    """fetch_unique_video_url 的协程版本，dedup 需要提供 async_fingerprint_func"""
+    duplicate = None
+    for _ in range(attempts):
+        url = await fetch_video_url_async(client)
+        if url and await dedup.register_if_new_async(url):
+            return url
+        duplicate = url or duplicate
+    if duplicate:
+        metrics.inc("fetch.duplicate_fallback")
+    return duplicate
+
+
+def fetch_video_batch(count, dedup=None, concurrency=4, rate=2.0, timeout=10, engine=None, **callbacks):
+    """并发获取 count 个不重复的视频地址，返回已启动的 BatchFetcher
+
+    rate 是每秒最多发起的请求数；callbacks 可以是 on_result/on_error/on_done，
+    不需要逐个处理结果时调用 wait() 后读取 urls。
+    提供 engine (aio.AsyncEngine) 时请求在其事件循环中并发执行，不再每个并发占用一个线程。
+    """
+    if engine:
+        fetch_func = lambda: fetch_video_url_async(engine.client)
+    else:
+        fetch_func = lambda: fetch_video_url(timeout)
+    fetcher = BatchFetcher(fetch_func, count, concurrency=concurrency, rate=rate, dedup=dedup,
+                           **callbacks)
+    fetcher.start(engine)
+    return fetcher
@@ -0,0 +1,228 @@
+"""批量获取视频地址：并发请求、令牌桶限速与统计"""
+import asyncio
+import threading
+import time
+
+
+class RateLimiter:
+    """令牌桶限速：平均每秒 rate 次，最多连续 burst 次"""
+
+    def __init__(self, rate, burst=1):
+        if rate <= 0 or burst < 1:
+            raise ValueError("需要满足 rate > 0 且 burst >= 1")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, stop_event=None):
+        """取得一个令牌，必要时等待；stop_event 被设置时返回False"""
+        while True:
+            wait = self._try_take()
+            if not wait:
+                return True
+            if stop_event is None:
+                time.sleep(wait)
+            elif stop_event.wait(wait):
+                return False
+
+    async def acquire_async(self, stop_event=None):
+        """acquire 的协程版本"""
+        while True:
+            wait = self._try_take()
+            if not wait:
+                return True
+            await asyncio.sleep(wait)
+            if stop_event is not None and stop_event.is_set():
+                return False
+
+    def _try_take(self):
+        # 取得令牌时返回0，否则返回需要等待的秒数
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+
+class BatchFetcher:
+    """用最多 concurrency 个线程获取 count 个不重复的视频地址
+
+    请求经过 RateLimiter 限速；重复的地址（dedup 判断，没有 dedup 时只在本批内判断）
+    不计入数量，总请求次数达到 count * max_attempts_factor 后放弃。
+    start(engine) 提供 aio.AsyncEngine 时 fetch_func 应是协程函数，各个并发作为协程在
+    engine 的事件循环中运行，dedup 使用 register_if_new_async。
+    回调函数在工作线程（或事件循环线程）中执行，界面需要自行转交到主线程处理：
+    on_result(url) 每得到一个新地址调用一次，on_error(error) 在请求失败时调用，
+    on_done(fetcher) 在全部完成或取消后调用一次。
+    """
+
+    def __init__(self, fetch_func, count, concurrency=4, rate=2.0, burst=None, dedup=None,
+                 on_result=None, on_error=None, on_done=None, max_attempts_factor=3):
+        if count < 1 or concurrency < 1:
+            raise ValueError("count 和 concurrency 至少为1")
+        self.fetch_func = fetch_func
+        self.count = count
+        self.concurrency = min(concurrency, count)
+        self.limiter = RateLimiter(rate, burst or self.concurrency)
+        self.dedup = dedup
+        self.on_result = on_result
+        self.on_error = on_error
+        self.on_done = on_done
+        self.max_attempts = count * max_attempts_factor
+
+        # 统计
+        self.urls = []
+        self.attempts = 0
+        self.failed = 0
+        self.duplicates = 0
+        self.started_at = None
+        self.finished_at = None
+
+        self._inflight = 0
+        self._seen = set()
+        self._running = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._done_event = threading.Event()
+        self._future = None
+
+    @property
+    def succeeded(self):
+        return len(self.urls)
+
+    @property
+    def cancelled(self):
+        return self._stop_event.is_set()
+
+    @property
+    def finished(self):
+        return self._done_event.is_set()
+
+    def elapsed(self):
+        """已用时间(秒)"""
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    def throughput(self):
+        """平均每秒得到的新地址数"""
+        elapsed = self.elapsed()
+        return self.succeeded / elapsed if elapsed > 0 else 0.0
+
+    def summary(self):
+        """统计信息的文字描述"""
+        return (f"已获取 {self.succeeded}/{self.count}，失败 {self.failed}，重复 {self.duplicates}，"
+                f"{self.throughput():.2f} 个/秒")
+
+    def start(self, engine=None):
+        """启动工作线程，提供 engine 时改为在其事件循环中运行"""
+        if self.started_at is not None:
+            return
+        self.started_at = time.monotonic()
+        if engine:
+            self._future = engine.submit(self._run_async())
+            return
+        self._running = self.concurrency
+        for i in range(self.concurrency):
+            thread = threading.Thread(target=self._worker, name=f"batch-fetch-{i}", daemon=True)
+            thread.start()
+
+    def cancel(self):
+        """取消（线程模式下正在进行的请求完成后停止，协程模式下立即取消）"""
+        self._stop_event.set()
+        if self._future:
+            self._future.cancel()
+
+    def wait(self, timeout=None):
+        """等待全部完成，返回是否已完成"""
+        return self._done_event.wait(timeout)
+
+    def _claim(self):
+        # 还需要请求时占用一次请求名额
+        with self._lock:
+            if self.cancelled or self.attempts >= self.max_attempts:
+                return False
+            if self.succeeded + self._inflight >= self.count:
+                return False
+            self.attempts += 1
+            self._inflight += 1
+            return True
+
+    def _accept(self, url):
+        # 调用方需持有 self._lock
+        if url in self._seen or len(self.urls) >= self.count:
+            return False
+        self._seen.add(url)
+        return True
+
+    def _record(self, url, duplicate):
+        # 统计一次请求的结果，返回新得到的地址
+        with self._lock:
+            self._inflight -= 1
+            if url and not duplicate and self._accept(url):
+                self.urls.append(url)
+                return url
+            if url:
+                self.duplicates += 1
+            else:
+                self.failed += 1  # 请求出错或API没有返回地址
+            return None
+
+    def _report(self, url, error):
+        if url and self.on_result:
+            self.on_result(url)
+        elif error is not None and self.on_error:
+            self.on_error(error)
+
+    def _finish(self):
+        self.finished_at = time.monotonic()
+        self._done_event.set()
+        if self.on_done:
+            self.on_done(self)
+
+    def _worker(self):
+        try:
+            while self._claim():
+                if not self.limiter.acquire(self._stop_event):
+                    with self._lock:
+                        self._inflight -= 1
+                    break
+                url, error = None, None
+                try:
+                    url = self.fetch_func()
+                    duplicate = bool(url) and self.dedup is not None and not self.dedup.register_if_new(url)
+                except Exception as e:
+                    error, duplicate = e, False
+                self._report(self._record(url, duplicate), error)
+        finally:
+            with self._lock:
+                self._running -= 1
+                last = self._running == 0
+            if last:
+                self._finish()
+
+    async def _run_async(self):
+        try:
+            await asyncio.gather(*(self._async_worker() for _ in range(self.concurrency)))
+        finally:
+            self._finish()
+
+    async def _async_worker(self):
+        # 被取消时 CancelledError 直接结束整个批次，不需要再维护计数
+        while self._claim():
+            if not await self.limiter.acquire_async(self._stop_event):
+                with self._lock:
+                    self._inflight -= 1
+                break
+            url, error = None, None
+            try:
+                url = await self.fetch_func()
+                duplicate = bool(url) and self.dedup is not None and not await self.dedup.register_if_new_async(url)
+            except Exception as e:
+                error, duplicate = e, False
+            self._report(self._record(url, duplicate), error)
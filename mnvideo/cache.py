@@ -0,0 +1,143 @@
+"""本地视频缓存"""
+import hashlib
+import os
+import queue
+import threading
+from collections import OrderedDict
+
+from mnvideo.download import stream_download
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3  # 2GB
+
+
+class VideoCache:
+    """以URL哈希为文件名的磁盘缓存，总大小超过 max_bytes 时淘汰最久未使用的文件
+
+    文件的修改时间记录最近一次使用，所以重启后仍能按LRU顺序淘汰；
+    下载先写入 .part 临时文件，完成后才改名，启动时残留的临时文件会被删除。
+    """
+
+    def __init__(self, cache_dir="video_cache", max_bytes=DEFAULT_MAX_BYTES, on_cached=None,
+                 download_func=stream_download):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.on_cached = on_cached  # on_cached(url, path)，在缓存线程中调用
+        self.download_func = download_func  # 参数与 stream_download 相同
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # 键 -> 文件大小，按最近使用排序
+        self._total = 0
+        self._queued = set()
+        self._queue = queue.Queue()
+        self._thread = None
+
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        self._scan()
+
+    @staticmethod
+    def key(url):
+        """缓存键"""
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def path_for(self, url):
+        """url 对应的缓存文件路径"""
+        return os.path.abspath(os.path.join(self.cache_dir, self.key(url) + ".mp4"))
+
+    @property
+    def total_bytes(self):
+        return self._total
+
+    def lookup(self, url):
+        """已缓存时返回本地文件路径并更新使用时间，否则返回None"""
+        key = self.key(url)
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+        path = self.path_for(url)
+        try:
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self._forget(key)
+            return None
+        return path
+
+    def request(self, url):
+        """在后台把 url 下载到缓存（已缓存或已在队列中时忽略）"""
+        if not url.startswith(("http://", "https://")):
+            return
+        key = self.key(url)
+        with self._lock:
+            if key in self._entries or key in self._queued:
+                return
+            self._queued.add(key)
+        self._queue.put(url)
+        if self._thread is None:
+            # 只用一个线程，避免缓存下载占用过多带宽
+            self._thread = threading.Thread(target=self._worker, name="video-cache", daemon=True)
+            self._thread.start()
+
+    def add_file(self, url, path):
+        """登记一个已写入缓存目录的文件"""
+        size = os.path.getsize(path)
+        with self._lock:
+            key = self.key(url)
+            self._forget(key)
+            self._entries[key] = size
+            self._total += size
+        self.evict()
+
+    def evict(self):
+        """淘汰最久未使用的文件，直到总大小不超过上限"""
+        with self._lock:
+            for key in list(self._entries):
+                if self._total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.cache_dir, key + ".mp4"))
+                except FileNotFoundError:
+                    pass
+                except OSError:
+                    continue  # 文件正在使用，跳过
+                self._forget(key)
+
+    def _forget(self, key):
+        # 调用方需持有 self._lock
+        size = self._entries.pop(key, None)
+        if size is not None:
+            self._total -= size
+
+    def _scan(self):
+        """加载已有的缓存文件，删除上次中断留下的临时文件"""
+        files = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith(".part"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            elif name.endswith(".mp4"):
+                stat = os.stat(path)
+                files.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._total += size
+        self.evict()
+
+    def _worker(self):
+        while True:
+            url = self._queue.get()
+            path = self.path_for(url)
+            try:
+                self.download_func(url, path)
+                self.add_file(url, path)
+                if self.on_cached:
+                    self.on_cached(url, path)
+            except Exception:
+                pass
+            finally:
+                with self._lock:
+                    self._queued.discard(self.key(url))
@@ -0,0 +1,187 @@
+"""命令行模式：在没有显示器的服务器上获取和下载视频
+
+    python -m mnvideo harvest --count 50 --concurrency 8
+    python -m mnvideo download --playlist playlist.json
+    python -m mnvideo daemon --batch 20 --interval 600 --download
+    python -m mnvideo check --playlist playlist.json --prune
+    python -m mnvideo --metrics metrics.prom daemon --batch 20
+
+视频地址输出到标准输出（每行一个），进度和统计信息输出到标准错误。
+--metrics 指定的文件以 .json 结尾时追加一行 JSON，否则写入 Prometheus 文本格式。
+"""
+import argparse
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+
+from mnvideo import metrics
+from mnvideo.download_manager import DONE, FAILED
+from mnvideo.download import format_progress, format_size
+
+
+def log(message):
+    """带时间的日志，输出到标准错误"""
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {message}", file=sys.stderr, flush=True)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m mnvideo", description="随机mn视频的命令行模式")
+    parser.add_argument("--data-dir", default=".", help="数据库、缓存和下载目录所在的目录（默认当前目录）")
+    parser.add_argument("--download-dir", help="下载目录（默认 <data-dir>/downloaded_videos）")
+    parser.add_argument("--workers", type=int, default=3, help="同时下载的视频数")
+    parser.add_argument("--metrics", metavar="PATH", help="启用性能统计，退出时（守护模式下每轮结束时）写入这个文件")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    harvest = commands.add_parser("harvest", help="批量获取新视频的地址")
+    add_fetch_options(harvest)
+    harvest.add_argument("--count", type=int, default=20, help="获取的视频数量")
+    harvest.add_argument("--output", help="把结果保存为播放列表文件")
+    harvest.add_argument("--download", action="store_true", help="获取后下载这些视频")
+
+    download = commands.add_parser("download", help="下载播放列表文件中的视频")
+    download.add_argument("--playlist", required=True, help="播放列表文件(.json)")
+
+    check = commands.add_parser("check", help="检查播放列表文件中的地址是否已失效")
+    check.add_argument("--playlist", required=True, help="播放列表文件(.json)")
+    check.add_argument("--prune", action="store_true", help="从文件中移除失效的地址")
+
+    daemon = commands.add_parser("daemon", help="长期运行，定时获取（并下载）新视频")
+    add_fetch_options(daemon)
+    daemon.add_argument("--batch", type=int, default=20, help="每轮获取的视频数量")
+    daemon.add_argument("--interval", type=float, default=600, help="两轮之间的间隔(秒)")
+    daemon.add_argument("--download", action="store_true", help="下载获取到的视频")
+    return parser
+
+
+def add_fetch_options(parser):
+    parser.add_argument("--concurrency", type=int, default=4, help="并发请求数（不超过每个主机的连接数上限）")
+    parser.add_argument("--rate", type=float, default=2.0, help="每秒最多请求API的次数")
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    metrics.enable(bool(args.metrics))
+
+    # 解析完参数再加载核心，--help 和参数错误时不需要初始化网络和数据库
+    from mnvideo.core import PlayerCore
+
+    stop_event = threading.Event()
+
+    def on_signal(signum, frame):
+        log("正在退出...")
+        stop_event.set()
+
+    signal.signal(signal.SIGINT, on_signal)
+    signal.signal(signal.SIGTERM, on_signal)
+
+    core = PlayerCore(args.data_dir, download_workers=args.workers, index_metadata=False,
+                      on_storage_error=lambda action, e: log(f"{action}: {e}"))
+    if args.download_dir:
+        core.download_manager.download_dir = args.download_dir
+    core.start(prefetch=False)
+    try:
+        command = {"harvest": harvest, "download": download, "check": check, "daemon": daemon}[args.command]
+        return command(core, args, stop_event)
+    finally:
+        core.close()
+        write_metrics(args)
+
+
+def write_metrics(args):
+    """把性能统计写入 --metrics 指定的文件"""
+    if not args.metrics:
+        return
+    try:
+        metrics.REGISTRY.write_file(args.metrics)
+    except OSError as e:
+        log(f"写入性能统计失败: {e}")
+
+
+def fetch(core, count, args, stop_event):
+    """获取 count 个新视频，返回 BatchFetcher"""
+    done = threading.Event()
+    fetcher = core.fetch_batch(
+        count,
+        concurrency=args.concurrency,
+        rate=args.rate,
+        on_result=lambda url: print(url, flush=True),
+        on_done=lambda fetcher: done.set()
+    )
+    while not done.wait(5):
+        if stop_event.is_set():
+            fetcher.cancel()
+            done.wait(5)
+            break
+        log(fetcher.summary())
+    log(fetcher.summary())
+    if fetcher.succeeded < count and fetcher.duplicates > fetcher.failed:
+        log("API 返回的大多是已经获取过的视频，可以稍后再试")
+    return fetcher
+
+
+def wait_downloads(core, jobs, stop_event, interval=2):
+    """等待下载任务完成并定期输出进度，返回失败的任务数"""
+    while jobs:
+        finished = [job for job in jobs if job.state in (DONE, FAILED)]
+        done = sum(job.done for job in jobs)
+        total = sum(job.total or 0 for job in jobs)
+        log(f"下载 {len(finished)}/{len(jobs)}: {format_progress(done, total)}，"
+            f"{format_size(core.download_manager.total_speed())}/s")
+        if len(finished) == len(jobs) or stop_event.wait(interval):
+            break
+    failed = [job for job in jobs if job.state == FAILED]
+    for job in failed:
+        log(f"下载失败 {job.url}: {job.error}")
+    return len(failed)
+
+
+def harvest(core, args, stop_event):
+    fetcher = fetch(core, args.count, args, stop_event)
+    if args.output:
+        core.save_playlist_file(args.output)
+    else:
+        core.record_playlist(f"harvest-{int(time.time())}", core.playlist_data())
+    if args.download and fetcher.urls:
+        if wait_downloads(core, core.download_playlist(fetcher.urls), stop_event):
+            return 1
+    return 0 if fetcher.succeeded == args.count else 1
+
+
+def download(core, args, stop_event):
+    playlist_data = core.load_playlist_file(args.playlist)
+    jobs = core.download_playlist(playlist_data.get('videos', []))
+    log(f"已将 {len(jobs)} 个视频加入下载队列")
+    return 1 if wait_downloads(core, jobs, stop_event) else 0
+
+
+def check(core, args, stop_event):
+    """输出失效的地址，全部有效时返回0"""
+    settings = core.apply_playlist_data(core.load_playlist_file(args.playlist))
+    log(f"正在检查 {core.check_playlist()} 个地址")
+    while core.liveness.pending() and not stop_event.wait(0.5):
+        pass
+    dead = [url for url in core.video_urls if core.is_dead(url)]
+    for url in dead:
+        print(url, flush=True)
+    log(f"{len(dead)}/{len(core.video_urls)} 个地址已失效")
+    if args.prune and dead and not stop_event.is_set():
+        core.prune_dead()
+        core.save_playlist_file(args.playlist, settings)
+        log(f"已从 {args.playlist} 中移除失效的地址")
+    return 1 if dead else 0
+
+
+def daemon(core, args, stop_event):
+    log(f"守护模式：每 {args.interval:.0f} 秒获取 {args.batch} 个视频")
+    name = f"daemon-{datetime.now().strftime('%Y%m%d')}"
+    while not stop_event.is_set():
+        fetcher = fetch(core, args.batch, args, stop_event)
+        core.record_playlist(name, core.playlist_data())
+        if args.download and fetcher.urls:
+            # 下载在后台进行，不等待完成
+            core.download_playlist(fetcher.urls)
+        write_metrics(args)
+        stop_event.wait(args.interval)
+    return 0
@@ -0,0 +1,363 @@
+"""播放器核心：视频获取、播放列表、缓存、下载和存储，不依赖 tkinter 和 vlc"""
+import json
+import os
+import time
+import traceback
+
+from mnvideo import aio, metrics
+from mnvideo.api import fetch_unique_video_url_async, fetch_video_batch
+from mnvideo.cache import DEFAULT_MAX_BYTES, VideoCache
+from mnvideo.dedup import DedupIndex, normalize_url, remote_fingerprint_async
+from mnvideo.download_manager import DownloadManager
+from mnvideo.liveness import DEAD, LivenessProber
+from mnvideo.metadata import MetadataIndex
+from mnvideo.persist import DebouncedWriter
+from mnvideo.prefetch import UrlPrefetcher
+from mnvideo.shuffle import ShuffleBag
+from mnvideo.storage import Storage
+
+
+class PlayerCore:
+    """图形界面和命令行共用的播放器核心
+
+    数据文件（数据库、缓存、下载目录和下载任务列表）都放在 data_dir 中。
+    后台产生的回调经 dispatch(func, *args) 转交，图形界面传入 call_in_ui；
+    不提供 dispatch 时回调直接在工作线程或事件循环线程中执行。
+    index_metadata=True 时在后台获取播放列表中视频的时长、分辨率和大小。
+    """
+
+    def __init__(self, data_dir=".", dispatch=None, cache_max_bytes=DEFAULT_MAX_BYTES,
+                 prefetch_low=2, prefetch_high=5, download_workers=3,
+                 on_prefetch_ready=None, on_prefetch_error=None, on_download_update=None,
+                 on_liveness=None, on_metadata=None, on_storage_error=None, index_metadata=True):
+        self.data_dir = data_dir
+        self.dispatch = dispatch
+        self.video_urls = []  # 播放列表
+        self.current_index = -1  # 当前视频索引
+        self.shuffle = ShuffleBag()  # 随机播放的顺序和历史
+        self.batch_fetcher = None
+        self.index_metadata = index_metadata
+        self.on_metadata = on_metadata
+        self.on_storage_error = on_storage_error  # on_storage_error(操作, 错误)
+        self._session_key = None  # 上次保存的播放列表的特征，没变时只保存状态
+        self._session_videos = None  # (播放列表, 长度)：等待 data_writer 保存的播放列表
+
+        if not os.path.exists(data_dir):
+            os.makedirs(data_dir)
+
+        # API请求、探测和下载都在 asyncio 引擎的事件循环中执行
+        self.engine = aio.AsyncEngine(dispatch=dispatch)
+        self.engine.start()
+
+        # 播放历史、收藏夹、播放列表和去重索引保存在数据库中，首次运行时导入旧版数据
+        self.storage = Storage(self.path("player_data.db"))
+        try:
+            self.storage.migrate(self.path("player_data.json"), playlist_dir=data_dir)
+        except Exception as e:
+            # 旧版数据文件保留不动，下次启动时再导入
+            self._storage_error("导入旧版数据失败", e)
+        self.data_writer = DebouncedWriter(self.save_data)  # 合并频繁的保存
+        self.dedup = DedupIndex(  # 跳过重复的视频
+            self.storage,
+            fingerprint_func=lambda url: self.engine.run(remote_fingerprint_async(self.engine.client, url)),
+            async_fingerprint_func=lambda url: remote_fingerprint_async(self.engine.client, url)
+        )
+
+        # 播放过的视频缓存到本地，重播时不再从网络读取
+        self.cache = VideoCache(self.path("video_cache"), cache_max_bytes,
+                                download_func=self.download_in_engine)
+
+        # 后台预取视频地址，start(prefetch=True) 时才开始
+        self.prefetcher = UrlPrefetcher(
+            lambda: self.engine.run(fetch_unique_video_url_async(self.engine.client, self.dedup)),
+            low_watermark=prefetch_low,
+            high_watermark=prefetch_high,
+            on_ready=self._callback(on_prefetch_ready),
+            on_error=self._callback(on_prefetch_error)
+        )
+
+        # 探测播放列表中的地址是否已过期
+        self.liveness = LivenessProber(self.engine, on_result=on_liveness)
+
+        # 视频信息（时长、分辨率、编码、大小）
+        self.metadata = MetadataIndex(self.engine, self.storage, on_result=self._on_metadata)
+
+        # 下载管理
+        self.download_manager = DownloadManager(
+            self.path("downloaded_videos"),
+            max_workers=download_workers,
+            state_file=self.path("downloads.json"),
+            on_update=self._callback(on_download_update),
+            dedup=self.dedup,
+            download_func=self.download_in_engine
+        )
+
+    def path(self, name):
+        """数据目录中的文件路径"""
+        return os.path.join(self.data_dir, name)
+
+    def start(self, prefetch=True):
+        """启动下载工作线程，prefetch=True 时同时开始预取视频地址"""
+        if prefetch:
+            self.prefetcher.start()
+        self.download_manager.start()
+
+    def close(self):
+        """停止后台任务并保存数据"""
+        self.prefetcher.stop()
+        if self.batch_fetcher:
+            self.batch_fetcher.cancel()
+        self.liveness.cancel()
+        self.metadata.cancel()
+        self.download_manager.stop()
+        self.download_manager.save()
+        self.engine.stop()
+        self.data_writer.close()
+        self.storage.close()
+
+    def call(self, func, *args):
+        """经 dispatch 执行回调"""
+        if self.dispatch:
+            self.dispatch(func, *args)
+        else:
+            func(*args)
+
+    def _callback(self, func):
+        if func is None:
+            return None
+        return lambda *args: self.call(func, *args)
+
+    def _on_metadata(self, url, info):
+        self.data_writer.mark_dirty()
+        if self.on_metadata:
+            self.call(self.on_metadata, url, info)
+
+    def download_in_engine(self, url, path, **kwargs):
+        """在 asyncio 引擎中下载（由下载和缓存的工作线程调用，等待下载完成）"""
+        return self.engine.run(aio.download(self.engine.client, url, path, **kwargs))
+
+    def _storage_error(self, action, error):
+        traceback.print_exc()
+        if self.on_storage_error:
+            self.call(self.on_storage_error, action, error)
+
+    def save_data(self):
+        """把缓冲的修改写入数据库（由 data_writer 在后台线程中调用）"""
+        try:
+            with metrics.timer("storage.flush"):
+                session_videos, self._session_videos = self._session_videos, None
+                if session_videos is not None:
+                    # 播放列表只会追加或整体替换，复制前 count 项就是保存时的内容
+                    urls, count = session_videos
+                    self.storage.save_session_videos(urls[:count])
+                self.storage.flush()
+        except Exception as e:
+            self._storage_error("保存数据失败", e)
+
+    # 获取视频
+    def fetch_batch(self, count, concurrency=4, rate=2.0, on_result=None, on_error=None, on_done=None):
+        """并发获取 count 个新视频，得到的地址会加入播放列表；正在获取时返回None
+
+        请求都经过引擎共用的连接池，concurrency 最多为每个主机的连接数 engine.per_host。
+        """
+        if self.batch_fetcher and not self.batch_fetcher.finished:
+            return None
+        concurrency = max(1, min(concurrency, self.engine.per_host))
+
+        def result(url):
+            self.append_video(url)
+            if on_result:
+                on_result(url)
+
+        self.batch_fetcher = fetch_video_batch(
+            count,
+            dedup=self.dedup,
+            concurrency=concurrency,
+            rate=rate,
+            engine=self.engine,
+            on_result=self._callback(result),
+            on_error=self._callback(on_error),
+            on_done=self._callback(on_done)
+        )
+        return self.batch_fetcher
+
+    # 播放列表
+    def append_video(self, url):
+        """把视频地址添加到播放列表末尾"""
+        self.video_urls.append(url)
+        self.shuffle.resize(len(self.video_urls))
+        self.request_metadata([url])
+
+    def clear_playlist(self):
+        """清空播放列表"""
+        self.video_urls = []
+        self.current_index = -1
+        self.shuffle.reset(0)
+
+    def playlist_data(self, settings=None):
+        """播放列表文件的内容"""
+        return {
+            'videos': self.video_urls,
+            'current_index': self.current_index,
+            'settings': settings or {}
+        }
+
+    def apply_playlist_data(self, playlist_data):
+        """使用播放列表数据替换当前列表，返回其中的播放设置"""
+        self.video_urls = playlist_data.get('videos', [])
+        self.current_index = playlist_data.get('current_index', -1)
+        self.shuffle.reset(len(self.video_urls), self.current_index)
+        self.request_metadata()
+        return playlist_data.get('settings', {})
+
+    def save_playlist_file(self, file_path, settings=None):
+        """把播放列表保存到文件，同时记录到数据库"""
+        playlist_data = self.playlist_data(settings)
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(playlist_data, f, ensure_ascii=False, indent=2)
+        self.record_playlist(self.playlist_name(file_path), playlist_data)
+
+    def load_playlist_file(self, file_path):
+        """读取播放列表文件并记录到数据库，返回文件内容（不替换当前列表）"""
+        with open(file_path, 'r', encoding='utf-8') as f:
+            playlist_data = json.load(f)
+        self.record_playlist(self.playlist_name(file_path), playlist_data)
+        return playlist_data
+
+    def record_playlist(self, name, playlist_data):
+        self.storage.save_playlist(name, playlist_data)
+        self.data_writer.mark_dirty()
+
+    @staticmethod
+    def playlist_name(file_path):
+        """播放列表在数据库中的名称（文件名）"""
+        return os.path.splitext(os.path.basename(file_path))[0]
+
+    # 会话
+    def save_session(self, position=0, settings=None):
+        """保存会话快照（写入由 data_writer 在后台合并完成）
+
+        播放列表只在长度或首尾变化时重新保存，而且复制和序列化都在 data_writer 的线程中进行，
+        调用方（界面线程）只记录列表和长度。
+        """
+        urls = self.video_urls
+        key = (id(urls), len(urls), urls[0] if urls else None, urls[-1] if urls else None)
+        if key != self._session_key:
+            self._session_videos = (urls, len(urls))
+            self._session_key = key
+        self.storage.save_session({
+            'current_index': self.current_index,
+            'position': int(position),
+            'settings': settings or {},
+            'saved_at': time.time()
+        })
+        self.data_writer.mark_dirty()
+
+    def load_session(self):
+        """读取上次的会话（不替换当前列表），没有或已损坏时返回None"""
+        try:
+            session = self.storage.load_session()
+        except Exception:
+            return None
+        if not session or not session.get('videos'):
+            return None
+        return session
+
+    def restore_session(self, session):
+        """用 load_session 的结果恢复播放列表，返回 (播放位置ms, 播放设置)
+
+        地址不在这里检查，播放失败时再跳过，启动不会因此变慢。
+        """
+        self.video_urls = list(session['videos'])
+        index = session.get('current_index', -1)
+        self.current_index = index if 0 <= index < len(self.video_urls) else -1
+        self.shuffle.reset(len(self.video_urls), self.current_index)
+        self._session_key = None
+        self.request_metadata()
+        position = session.get('position', 0) if self.current_index >= 0 else 0
+        return max(0, position), session.get('settings', {})
+
+    # 历史和收藏
+    def add_history(self, url, index=-1):
+        """记录一次播放"""
+        self.storage.add_history(url, index)
+        self.data_writer.mark_dirty()
+
+    def add_favorite(self, url):
+        """添加收藏，已收藏时返回False"""
+        if self.storage.is_favorite(url):
+            return False
+        self.storage.add_favorite(url)
+        self.data_writer.mark_dirty()
+        return True
+
+    # 视频信息
+    def request_metadata(self, urls=None, urgent=False):
+        """在后台获取播放列表（或 urls）中视频的信息（index_metadata=False 时只处理 urgent 的请求）"""
+        if self.index_metadata or urgent:
+            self.metadata.request(self.video_urls if urls is None else urls, urgent)
+
+    def media_info(self, url):
+        """已知的视频信息字典，还没有得到时返回None"""
+        return self.metadata.get(url)
+
+    def content_key(self, url):
+        """视频内容的标识：已知内容指纹时用指纹（地址过期更换后不变），否则用规范化的地址"""
+        if not url.startswith(("http://", "https://")):
+            return os.path.abspath(url)
+        normalized = normalize_url(url)
+        return self.storage.url_fingerprint(normalized) or normalized
+
+    def local_copy(self, url):
+        """视频的本地文件（本地视频、缓存或已下载的副本），没有时返回None；不更新缓存的使用时间"""
+        if not url.startswith(("http://", "https://")):
+            return url if os.path.exists(url) else None
+        path = self.cache.path_for(url)
+        if os.path.exists(path):
+            return path
+        fingerprint = self.storage.url_fingerprint(normalize_url(url))
+        path = self.storage.file_for_fingerprint(fingerprint) if fingerprint else None
+        return path if path and os.path.exists(path) else None
+
+    # 地址有效性
+    def check_playlist(self, urls=None):
+        """在后台探测播放列表（或 urls）中的地址是否已失效，返回新开始探测的数量"""
+        return self.liveness.check(self.video_urls if urls is None else urls)
+
+    def is_dead(self, url):
+        """url 是否已知失效"""
+        return self.liveness.is_dead(url)
+
+    def mark_dead(self, url):
+        """记录 url 已失效（例如播放器打开失败），在探测结果过期前不再选中它"""
+        self.liveness.mark(url, DEAD)
+
+    def prune_dead(self):
+        """从播放列表中移除已知失效的地址，返回移除的数量"""
+        alive = []
+        index = -1
+        for i, url in enumerate(self.video_urls):
+            if i == self.current_index:
+                index = len(alive)  # 当前视频被移除时指向它后面的第一个有效地址
+            if not self.liveness.is_dead(url):
+                alive.append(url)
+        removed = len(self.video_urls) - len(alive)
+        if removed:
+            self.video_urls = alive
+            self.current_index = min(index, len(alive) - 1)
+            self.shuffle.reset(len(alive), self.current_index)
+        return removed
+
+    # 下载
+    def download(self, url, index=None):
+        """把视频加入下载队列"""
+        index = self.current_index if index is None else index
+        return self.download_manager.add(url, f"video_{index}_{int(time.time())}.mp4")
+
+    def download_playlist(self, urls=None):
+        """把播放列表（或 urls）中的网络视频全部加入下载队列，返回新建的任务"""
+        timestamp = int(time.time())
+        items = [(url, f"video_{i}_{timestamp}.mp4")
+                 for i, url in enumerate(self.video_urls if urls is None else urls)
+                 if url.startswith(("http://", "https://"))]
+        return self.download_manager.add_many(items)
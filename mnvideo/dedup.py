@@ -0,0 +1,194 @@
+"""视频去重：地址规范化和内容指纹"""
+import hashlib
+import os
+import re
+import threading
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from mnvideo import network
+
+CHUNK_SIZE = 64 * 1024  # 指纹使用的首尾数据块大小
+
+# 签名、过期时间和统计用的参数，同一个视频每次请求都可能不同
+VOLATILE_PARAMS = re.compile(
+    r"^(auth_key|sign|signature|token|expires?|t|ts|timestamp|x-oss-.*|x-amz-.*|utm_.*|spm|from)$",
+    re.IGNORECASE,
+)
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url):
+    """规范化视频地址：小写协议和主机，去掉默认端口、片段和易变的查询参数"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if not VOLATILE_PARAMS.match(k))
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+def make_fingerprint(size, head, tail):
+    """由文件大小和首尾数据块计算指纹"""
+    digest = hashlib.sha1()
+    digest.update(head)
+    digest.update(tail)
+    return f"{size}:{digest.hexdigest()}"
+
+
+def file_fingerprint(path, chunk_size=CHUNK_SIZE):
+    """本地文件的内容指纹"""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        head = f.read(chunk_size)
+        f.seek(max(0, size - chunk_size))
+        tail = f.read(chunk_size)
+    return make_fingerprint(size, head, tail)
+
+
+def _read_range(url, start, end, timeout):
+    """读取 [start, end] 字节，返回 (数据, 文件总大小)；服务器不支持Range时返回 (None, None)"""
+    response = network.get(url, headers={"Range": f"bytes={start}-{end}"}, stream=True, timeout=timeout)
+    try:
+        response.raise_for_status()
+        content_range = response.headers.get("Content-Range", "")
+        if response.status_code != 206 or "/" not in content_range:
+            return None, None
+        total = content_range.rsplit("/", 1)[1]
+        length = end - start + 1
+        data = b""
+        for chunk in response.iter_content(chunk_size=length):
+            data += chunk
+            if len(data) >= length:
+                break  # 服务器返回的数据比请求的多时只取需要的部分
+        return data[:length], int(total) if total.isdigit() else None
+    finally:
+        response.close()
+
+
+def remote_fingerprint(url, chunk_size=CHUNK_SIZE, timeout=10):
+    """用两次Range请求计算远程视频的内容指纹，只下载首尾各 chunk_size 字节
+
+    服务器不支持Range或无法得到文件大小时返回None。
+    """
+    head, size = _read_range(url, 0, chunk_size - 1, timeout)
+    if head is None or size is None:
+        return None
+    if size <= chunk_size:
+        tail = head[max(0, size - chunk_size):]
+    else:
+        tail, _ = _read_range(url, size - chunk_size, size - 1, timeout)
+        if tail is None:
+            return None
+    return make_fingerprint(size, head, tail)
+
+
+async def read_range_async(client, url, start, end):
+    """_read_range 的协程版本，client 是 aio.AsyncHTTPClient"""
+    async with await client.get(url, headers={"Range": f"bytes={start}-{end}"}) as response:
+        response.raise_for_status()
+        content_range = response.headers.get("content-range", "")
+        if response.status != 206 or "/" not in content_range:
+            return None, None
+        total = content_range.rsplit("/", 1)[1]
+        length = end - start + 1
+        data = b""
+        while len(data) < length:
+            chunk = await response.read_chunk(length - len(data))
+            if not chunk:
+                break
+            data += chunk
+        return data, int(total) if total.isdigit() else None
+
+
+async def remote_fingerprint_async(client, url, chunk_size=CHUNK_SIZE):
+    """remote_fingerprint 的协程版本"""
+    head, size = await read_range_async(client, url, 0, chunk_size - 1)
+    if head is None or size is None:
+        return None
+    if size <= chunk_size:
+        tail = head[max(0, size - chunk_size):]
+    else:
+        tail, _ = await read_range_async(client, url, size - chunk_size, size - 1)
+        if tail is None:
+            return None
+    return make_fingerprint(size, head, tail)
+
+
+class DedupIndex:
+    """已获取视频的去重索引，数据保存在 Storage 中"""
+
+    def __init__(self, storage, fingerprint_func=remote_fingerprint, async_fingerprint_func=None):
+        self.storage = storage
+        self.fingerprint_func = fingerprint_func
+        self.async_fingerprint_func = async_fingerprint_func  # 协程函数，供 register_if_new_async 使用
+        self._lock = threading.Lock()
+        self._checking = set()  # 正在计算指纹的地址，避免并发时重复登记
+
+    def register_if_new(self, url):
+        """url 是新视频时登记并返回True；地址或内容已出现过时返回False
+
+        会发起网络请求计算指纹，应在后台线程中调用；指纹计算失败时只按地址判断。
+        """
+        normalized = normalize_url(url)
+        if not self._begin(normalized):
+            return False
+        try:
+            fingerprint = self.fingerprint_func(url)
+        except Exception:
+            fingerprint = None
+        return self._finish(normalized, fingerprint)
+
+    async def register_if_new_async(self, url):
+        """register_if_new 的协程版本，用 async_fingerprint_func 计算指纹"""
+        normalized = normalize_url(url)
+        if not self._begin(normalized):
+            return False
+        try:
+            fingerprint = await self.async_fingerprint_func(url)
+        except Exception:
+            fingerprint = None
+        except BaseException:
+            # 任务被取消，不登记
+            with self._lock:
+                self._checking.discard(normalized)
+            raise
+        return self._finish(normalized, fingerprint)
+
+    def _begin(self, normalized):
+        # 地址没有出现过时标记为正在检查
+        with self._lock:
+            if normalized in self._checking or self.storage.is_seen_url(normalized):
+                return False
+            self._checking.add(normalized)
+            return True
+
+    def _finish(self, normalized, fingerprint):
+        # 登记地址，返回内容是否是新的
+        with self._lock:
+            self._checking.discard(normalized)
+            is_new = not (fingerprint and self.storage.is_seen_fingerprint(fingerprint))
+            self.storage.add_seen_url(normalized, fingerprint)
+            return is_new
+
+    def fingerprint(self, url):
+        """远程视频的内容指纹（已登记过时直接使用记录的值）"""
+        fingerprint = self.storage.url_fingerprint(normalize_url(url))
+        if fingerprint:
+            return fingerprint
+        try:
+            return self.fingerprint_func(url)
+        except Exception:
+            return None
+
+    def existing_file(self, fingerprint):
+        """已下载的相同内容的文件（文件已不存在时返回None）"""
+        if not fingerprint:
+            return None
+        path = self.storage.file_for_fingerprint(fingerprint)
+        return path if path and os.path.exists(path) else None
+
+    def add_file(self, path, fingerprint=None):
+        """登记已下载的文件"""
+        self.storage.add_file(fingerprint or file_fingerprint(path), path)
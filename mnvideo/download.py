@@ -0,0 +1,77 @@
+"""流式下载"""
+import os
+import time
+
+from mnvideo import network
+
+CHUNK_SIZE = 256 * 1024  # 每块 256KB，内存占用与视频大小无关
+PROGRESS_INTERVAL = 0.2  # 进度回调的最小间隔(秒)
+
+
+def format_size(size):
+    """格式化字节数"""
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1024
+
+
+def format_progress(done, total):
+    """格式化下载进度"""
+    if total:
+        return f"{format_size(done)} / {format_size(total)} ({done * 100 // total}%)"
+    return format_size(done)
+
+
+class DownloadStopped(Exception):
+    """下载被调用方中止（resume=True 时保留临时文件以便续传）"""
+
+
+def stream_download(url, path, progress=None, chunk_size=CHUNK_SIZE, timeout=(5, 30),
+                    resume=False, should_stop=None):
+    """分块下载到临时文件，完成后原子地重命名为 path，返回文件的字节数
+
+    progress(done, total) 在下载线程中调用，total 未知时为None。
+    resume=True 时用 HTTP Range 从已有的临时文件末尾续传，出错或中止时保留临时文件；
+    should_stop() 返回True时中止下载并抛出 DownloadStopped。
+    """
+    temp_path = path + ".part"
+    offset = os.path.getsize(temp_path) if resume and os.path.exists(temp_path) else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else None
+    response = network.get(url, stream=True, timeout=timeout, headers=headers)
+    try:
+        if offset and response.status_code == 416:
+            # 临时文件与服务器上的文件不一致，重新下载
+            response.close()
+            offset = 0
+            response = network.get(url, stream=True, timeout=timeout)
+        response.raise_for_status()
+        if offset and response.status_code != 206:
+            offset = 0  # 服务器不支持Range，从头下载
+        length = int(response.headers.get("Content-Length") or 0)
+        total = offset + length if length else None
+        done = offset
+        last_report = 0.0
+        try:
+            with open(temp_path, "ab" if offset else "wb") as f:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    if should_stop and should_stop():
+                        raise DownloadStopped()
+                    if not chunk:
+                        continue
+                    f.write(chunk)
+                    done += len(chunk)
+                    now = time.monotonic()
+                    if progress and now - last_report >= PROGRESS_INTERVAL:
+                        last_report = now
+                        progress(done, total)
+        except BaseException:
+            if not resume and os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    finally:
+        response.close()
+    os.replace(temp_path, path)
+    if progress:
+        progress(done, total)
+    return done
@@ -0,0 +1,297 @@
+"""下载管理：任务队列、工作线程池与断点续传"""
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+
+from mnvideo import metrics
+from mnvideo.download import DownloadStopped, stream_download
+
+# 任务状态
+QUEUED = "queued"
+RUNNING = "running"
+PAUSED = "paused"
+DONE = "done"
+FAILED = "failed"
+
+STATE_LABELS = {
+    QUEUED: "等待中",
+    RUNNING: "下载中",
+    PAUSED: "已暂停",
+    DONE: "已完成",
+    FAILED: "失败",
+}
+
+SPEED_SMOOTHING = 0.3  # 速度的指数平滑系数
+
+
+class DownloadJob:
+    """一个下载任务"""
+
+    def __init__(self, job_id, url, path, state=QUEUED, done=0, total=None, error=""):
+        self.id = job_id
+        self.url = url
+        self.path = path
+        self.state = state
+        self.done = done
+        self.total = total
+        self.error = error
+        self.speed = 0.0  # 字节/秒
+
+    @property
+    def filename(self):
+        return os.path.basename(self.path)
+
+    def to_dict(self):
+        return {
+            'url': self.url,
+            'path': self.path,
+            'state': self.state,
+            'done': self.done,
+            'total': self.total,
+            'error': self.error,
+        }
+
+
+class DownloadManager:
+    """用有限数量的工作线程执行下载队列
+
+    任务列表保存在 state_file 中，程序重启后未完成的任务会用 Range 续传。
+    on_update(job) 在工作线程中调用，界面需要自行转交到主线程处理。
+    提供 dedup 时，内容已下载过的视频会硬链接到已有文件（不支持硬链接时直接指向已有文件）。
+    download_func 与 stream_download 的参数相同，可以换成在 asyncio 引擎中执行的版本。
+    """
+
+    def __init__(self, download_dir="downloaded_videos", max_workers=3,
+                 state_file="downloads.json", on_update=None, dedup=None,
+                 download_func=stream_download):
+        self.download_dir = download_dir
+        self.max_workers = max_workers
+        self.state_file = state_file
+        self.on_update = on_update
+        self.dedup = dedup  # DedupIndex，相同内容的视频只保存一份
+        self.download_func = download_func
+
+        self.jobs = []
+        self._ids = itertools.count(1)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._threads = []
+        self._active = set()  # 工作线程正在执行（还没有退出 _run）的任务
+        self._stopped = False
+
+    def start(self):
+        """加载上次的任务并启动工作线程"""
+        self.load()
+        for i in range(self.max_workers):
+            thread = threading.Thread(target=self._worker, name=f"download-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """停止工作线程，正在下载的任务保留临时文件，下次启动时续传"""
+        self._stopped = True
+        for _ in self._threads:
+            self._queue.put(None)
+
+    def add(self, url, filename):
+        """添加下载任务"""
+        return self.add_many([(url, filename)])[0]
+
+    def add_many(self, items):
+        """添加多个下载任务 [(url, filename)]，全部加入后只保存一次任务列表"""
+        if not os.path.exists(self.download_dir):
+            os.makedirs(self.download_dir)
+        with self._lock:
+            jobs = [DownloadJob(next(self._ids), url, os.path.join(self.download_dir, filename))
+                    for url, filename in items]
+            self.jobs.extend(jobs)
+        for job in jobs:
+            self._queue.put(job)
+        self.save()
+        for job in jobs:
+            self._notify(job)
+        return jobs
+
+    def pause(self, job):
+        """暂停任务（正在下载的任务会在下一块数据后停止）"""
+        with self._lock:
+            if job.state not in (QUEUED, RUNNING):
+                return
+            job.state = PAUSED
+            job.speed = 0.0
+        self.save()
+        self._notify(job)
+
+    def resume(self, job):
+        """继续暂停或失败的任务
+
+        暂停后原来的工作线程可能还在写临时文件，这时只改为等待中，由那个线程退出后重新排队，
+        避免两个线程同时续传同一个文件。
+        """
+        with self._lock:
+            if job.state not in (PAUSED, FAILED):
+                return
+            job.state = QUEUED
+            job.error = ""
+            running = job in self._active
+        if not running:
+            self._queue.put(job)
+        self.save()
+        self._notify(job)
+
+    def remove(self, job):
+        """移除任务，未完成的临时文件一并删除"""
+        self.pause(job)
+        with self._lock:
+            if job in self.jobs:
+                self.jobs.remove(job)
+        if job.state != DONE:
+            self._remove_partial(job)
+        self.save()
+
+    def snapshot(self):
+        """当前任务列表的副本"""
+        with self._lock:
+            return list(self.jobs)
+
+    def total_speed(self):
+        """所有任务的总下载速度(字节/秒)"""
+        with self._lock:
+            return sum(job.speed for job in self.jobs if job.state == RUNNING)
+
+    def load(self):
+        """加载任务列表，中断的任务重新排队"""
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                items = json.load(f)
+        except Exception:
+            return
+        with self._lock:
+            for item in items:
+                state = item.get('state', QUEUED)
+                if state == RUNNING:
+                    state = QUEUED
+                job = DownloadJob(next(self._ids), item['url'], item['path'], state,
+                                  item.get('done', 0), item.get('total'), item.get('error', ""))
+                self.jobs.append(job)
+                if state == QUEUED:
+                    self._queue.put(job)
+
+    def save(self):
+        """原子地保存任务列表"""
+        if not self.state_file:
+            return
+        with self._lock:
+            items = [job.to_dict() for job in self.jobs]
+        with self._save_lock:
+            temp_path = self.state_file + ".tmp"
+            try:
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(items, f, ensure_ascii=False)
+                os.replace(temp_path, self.state_file)
+            except OSError:
+                pass
+
+    def _notify(self, job):
+        if self.on_update:
+            self.on_update(job)
+
+    def _reuse_file(self, job, existing):
+        """用已有的相同文件完成任务，不再重复下载"""
+        try:
+            os.link(existing, job.path)
+        except OSError:
+            job.path = existing
+        self._remove_partial(job)
+        with self._lock:
+            if job.state == RUNNING:
+                job.done = job.total = os.path.getsize(existing)
+                job.state = DONE
+
+    def _remove_partial(self, job):
+        try:
+            os.remove(job.path + ".part")
+        except OSError:
+            pass
+
+    def _worker(self):
+        """工作线程：依次执行队列中的任务"""
+        while True:
+            job = self._queue.get()
+            if job is None or self._stopped:
+                return
+            with self._lock:
+                if job.state != QUEUED or job not in self.jobs or job in self._active:
+                    continue  # 排队期间被暂停或移除，或者是重复的排队
+                job.state = RUNNING
+                self._active.add(job)
+            self._notify(job)
+            try:
+                self._run(job)
+            except Exception as e:
+                # 指纹、查找已有文件等步骤出错时也只让这个任务失败，工作线程继续运行
+                self._fail(job, e)
+            with self._lock:
+                self._active.discard(job)
+                requeue = job.state == QUEUED and job in self.jobs  # 执行期间被暂停后又继续
+            if requeue:
+                self._queue.put(job)
+            self.save()
+            self._notify(job)
+
+    def _fail(self, job, error):
+        metrics.inc("download.failed")
+        with self._lock:
+            if job.state == RUNNING and not self._stopped:  # 退出时被取消的任务下次续传
+                job.state = FAILED
+                job.error = str(error)
+
+    def _run(self, job):
+        last = [time.monotonic(), job.done]
+
+        def progress(done, total):
+            now = time.monotonic()
+            elapsed = now - last[0]
+            if elapsed > 0:
+                speed = (done - last[1]) / elapsed
+                job.speed = speed if not job.speed else (
+                    SPEED_SMOOTHING * speed + (1 - SPEED_SMOOTHING) * job.speed)
+            last[0], last[1] = now, done
+            job.done, job.total = done, total
+            self._notify(job)
+
+        def should_stop():
+            return self._stopped or job.state != RUNNING
+
+        fingerprint = None
+        if self.dedup:
+            fingerprint = self.dedup.fingerprint(job.url)
+            existing = self.dedup.existing_file(fingerprint)
+            if existing and os.path.abspath(existing) != os.path.abspath(job.path):
+                self._reuse_file(job, existing)
+                return
+
+        started, start_done = metrics.now(), job.done
+        try:
+            self.download_func(job.url, job.path, progress=progress, resume=True,
+                               should_stop=should_stop)
+            if self.dedup:
+                self.dedup.add_file(job.path, fingerprint)
+        except DownloadStopped:
+            return
+        except Exception as e:
+            self._fail(job, e)
+            return
+        finally:
+            job.speed = 0.0
+            metrics.inc("download.bytes", max(0, job.done - start_done))
+        metrics.since("download.job", started)
+        with self._lock:
+            if job.state == RUNNING:
+                job.state = DONE
@@ -0,0 +1,34 @@
+"""跨线程事件桥"""
+import threading
+
+
+class EventBridge:
+    """把其他线程（如VLC的回调线程）产生的事件转交给界面线程
+
+    post() 可在任意线程调用，不会阻塞；同一种事件在两次 drain() 之间只保留最新的值，
+    所以一连串的事件（如每秒几十次的 TimeChanged）在每一帧最多只应用一次。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    def post(self, kind, value=None):
+        """记录一个事件，覆盖同类未处理的事件"""
+        with self._lock:
+            # 重新插入，使事件保持最后一次到达的顺序
+            self._pending.pop(kind, None)
+            self._pending[kind] = value
+
+    def drain(self):
+        """取出所有未处理的事件 [(kind, value)]，按到达顺序排列"""
+        with self._lock:
+            if not self._pending:
+                return []
+            pending, self._pending = self._pending, {}
+        return list(pending.items())
+
+    def clear(self):
+        """丢弃未处理的事件"""
+        with self._lock:
+            self._pending = {}
@@ -0,0 +1,125 @@
+"""视频地址有效性探测：找出播放列表中已过期的链接"""
+import asyncio
+import os
+import threading
+import time
+
+from mnvideo.aio import RETRY_ERRORS
+
+ALIVE = "alive"
+DEAD = "dead"
+UNKNOWN = "unknown"  # 网络错误或服务器暂时不可用，之后再试
+
+# 过期的 CDN 链接通常返回这些状态码
+DEAD_STATUS = frozenset({401, 403, 404, 410, 451})
+# 不支持 HEAD 的服务器返回这些状态码，改用 Range 请求
+HEAD_UNSUPPORTED = frozenset({405, 501})
+
+
+def classify_status(status):
+    """根据状态码判断地址是否有效"""
+    if status < 400:
+        return ALIVE
+    if status in DEAD_STATUS:
+        return DEAD
+    return UNKNOWN
+
+
+async def probe_url(client, url, timeout=10):
+    """探测一个地址，返回 ALIVE、DEAD 或 UNKNOWN
+
+    先发 HEAD 请求，服务器不支持时改为只读取第一个字节的 Range 请求。本地文件检查是否存在。
+    """
+    if not url.startswith(("http://", "https://")):
+        return ALIVE if os.path.exists(url) else DEAD
+    try:
+        response = await asyncio.wait_for(client.head(url, retries=1), timeout)
+        if response.status in HEAD_UNSUPPORTED:
+            response = await asyncio.wait_for(
+                client.get(url, headers={"Range": "bytes=0-0"}, retries=1), timeout)
+            response.close()
+    except ValueError:
+        return DEAD  # 不是可以请求的地址
+    except RETRY_ERRORS + (asyncio.TimeoutError,):
+        return UNKNOWN
+    return classify_status(response.status)
+
+
+class LivenessProber:
+    """在 asyncio 引擎中并发探测地址，结果缓存 ttl 秒
+
+    同时最多探测 concurrency 个地址；on_result(url, state) 经引擎的 dispatch 调用。
+    可在任意线程调用。
+    """
+
+    def __init__(self, engine, concurrency=8, ttl=600, timeout=10, on_result=None):
+        self.engine = engine
+        self.concurrency = concurrency
+        self.ttl = ttl
+        self.timeout = timeout
+        self.on_result = on_result
+        self._results = {}  # 地址 -> (状态, 探测时间)
+        self._pending = {}  # 地址 -> 探测中的 Future
+        self._semaphore = None
+        self._lock = threading.Lock()
+
+    def state(self, url):
+        """缓存中的探测结果，没有探测过或已过期时返回 UNKNOWN"""
+        with self._lock:
+            result = self._results.get(url)
+        if result is None or time.monotonic() - result[1] > self.ttl:
+            return UNKNOWN
+        return result[0]
+
+    def is_dead(self, url):
+        return self.state(url) == DEAD
+
+    def mark(self, url, state):
+        """直接记录结果（例如播放器打开失败时标记为失效）"""
+        with self._lock:
+            self._results[url] = (state, time.monotonic())
+
+    def check(self, urls):
+        """在后台探测没有有效结果的地址，返回新开始探测的数量"""
+        started = 0
+        for url in urls:
+            if self.state(url) != UNKNOWN:
+                continue
+            with self._lock:
+                if url in self._pending:
+                    continue
+                self._pending[url] = None
+            future = self.engine.submit(self._probe(url), lambda state, error, url=url: self._done(url, state, error))
+            with self._lock:
+                if url in self._pending:
+                    self._pending[url] = future
+            started += 1
+        return started
+
+    def pending(self):
+        """正在探测（或排队）的地址数"""
+        with self._lock:
+            return len(self._pending)
+
+    def cancel(self):
+        """取消所有未完成的探测"""
+        with self._lock:
+            futures, self._pending = list(self._pending.values()), {}
+        for future in futures:
+            if future:
+                future.cancel()
+
+    async def _probe(self, url):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            return await probe_url(self.engine.client, url, self.timeout)
+
+    def _done(self, url, state, error):
+        state = UNKNOWN if error else state
+        with self._lock:
+            self._pending.pop(url, None)
+            if state != UNKNOWN:
+                self._results[url] = (state, time.monotonic())
+        if self.on_result:
+            self.on_result(url, state)
@@ -0,0 +1,109 @@
+"""视频信息索引：在后台探测播放列表中视频的时长、分辨率、编码和大小"""
+import asyncio
+import threading
+from collections import deque
+
+from mnvideo import mp4meta
+
+
+class MetadataIndex:
+    """按地址索引的视频信息，结果保存在 Storage 中，下次启动不用再探测
+
+    request() 把地址加入队列，asyncio 引擎中最多 concurrency 个协程依次处理：
+    先查数据库，没有时用 mp4meta 读取文件头（每个远程文件只读取几十KB）。
+    on_result(url, info) 在事件循环线程中调用。get() 只读内存，可以在界面线程中频繁调用。
+    """
+
+    def __init__(self, engine, storage, concurrency=4, on_result=None, probe_func=mp4meta.probe_url):
+        self.engine = engine
+        self.storage = storage
+        self.concurrency = concurrency
+        self.on_result = on_result
+        self.probe_func = probe_func  # probe_func(client, url) 协程函数
+        self._info = {}  # 地址 -> 信息字典
+        self._queue = deque()
+        self._urgent = deque()  # 优先处理的地址（例如可见的行）
+        self._queued = set()
+        self._probing = set()  # 正在处理的地址
+        self._failed = set()  # 本次运行中探测失败的地址，不再重试
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        """已知的视频信息，还没有得到时返回None"""
+        return self._info.get(url)
+
+    def request(self, urls, urgent=False):
+        """在后台获取 urls 的信息，urgent=True 时排在队列前面"""
+        with self._lock:
+            for url in urls:
+                if url in self._info or url in self._failed:
+                    continue
+                if urgent:
+                    self._urgent.append(url)
+                elif url not in self._queued:
+                    self._queue.append(url)
+                self._queued.add(url)
+            workers = min(self.concurrency - self._active, len(self._queue) + len(self._urgent))
+            self._active += max(0, workers)
+        for _ in range(workers):
+            self.engine.submit(self._worker())
+
+    def pending(self):
+        """等待获取信息的地址数"""
+        with self._lock:
+            return len(self._queued)
+
+    def cancel(self):
+        """清空队列（正在探测的地址会继续完成）"""
+        with self._lock:
+            self._queue.clear()
+            self._urgent.clear()
+            self._queued.clear()
+
+    def _next(self):
+        """取出下一个地址，队列为空时返回None并减少工作协程计数"""
+        with self._lock:
+            while self._urgent or self._queue:
+                url = (self._urgent or self._queue).popleft()
+                if url in self._queued and url not in self._probing:
+                    self._probing.add(url)
+                    return url
+            self._active -= 1
+            return None
+
+    async def _worker(self):
+        finished = False
+        try:
+            while True:
+                url = self._next()
+                if url is None:
+                    finished = True
+                    return
+                info = await self._load(url)
+                with self._lock:
+                    self._queued.discard(url)
+                    self._probing.discard(url)
+                    if info is None:
+                        self._failed.add(url)
+                    else:
+                        self._info[url] = info
+                if info is not None and self.on_result:
+                    self.on_result(url, info)
+        finally:
+            if not finished:
+                with self._lock:
+                    self._active -= 1
+
+    async def _load(self, url):
+        # 数据库操作会加锁，放到线程池中执行，不阻塞事件循环
+        loop = asyncio.get_running_loop()
+        info = await loop.run_in_executor(None, self.storage.media_info, url)
+        if info is not None:
+            return info
+        try:
+            info = await self.probe_func(self.engine.client, url)
+        except Exception:
+            return None
+        await loop.run_in_executor(None, self.storage.save_media_info, url, info)
+        return info
@@ -0,0 +1,227 @@
+"""性能统计：计数器和耗时直方图，可以导出为 Prometheus 文本格式或 JSON
+
+默认不启用，此时记录函数只检查一个布尔值就返回，所以可以一直留在热点代码中：
+
+    with metrics.timer("fetch.api"):
+        ...
+    metrics.inc("play.preload_hit")
+    started = metrics.now()
+    ...
+    metrics.since("play.first_frame", started)
+"""
+import functools
+import json
+import os
+import re
+import threading
+import time
+
+# 直方图的桶上限(毫秒)，最后还有一个 +Inf 桶
+BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+
+
+class Histogram:
+    """耗时分布(毫秒)"""
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = 0.0
+
+    def observe(self, ms):
+        index = 0
+        while index < len(BUCKETS) and ms > BUCKETS[index]:
+            index += 1
+        self.buckets[index] += 1
+        self.count += 1
+        self.sum += ms
+        self.min = ms if self.min is None else min(self.min, ms)
+        self.max = max(self.max, ms)
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, q):
+        """由桶估计分位数（在桶内线性插值）"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            if seen + count >= rank and count:
+                lower = BUCKETS[index - 1] if index > 0 else 0.0
+                upper = BUCKETS[index] if index < len(BUCKETS) else self.max
+                lower, upper = max(lower, self.min), min(upper, self.max)
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.max
+
+    def to_dict(self):
+        return {"count": self.count, "sum": round(self.sum, 3), "mean": round(self.mean, 3),
+                "min": round(self.min or 0.0, 3), "max": round(self.max, 3),
+                "p50": round(self.quantile(0.5), 3), "p95": round(self.quantile(0.95), 3),
+                "buckets": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], self.buckets))}
+
+
+class Registry:
+    """一组计数器和直方图（线程安全）"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.counters = {}
+        self.histograms = {}
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, ms):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(ms)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.started_at = time.time()
+
+    def snapshot(self):
+        """当前数据的字典（可以序列化为 JSON）"""
+        with self._lock:
+            return {
+                "time": time.time(),
+                "since": self.started_at,
+                "counters": dict(self.counters),
+                "histograms": {name: h.to_dict() for name, h in self.histograms.items()}
+            }
+
+    def prometheus_text(self, prefix="mnvideo"):
+        """Prometheus 文本格式（直方图单位为毫秒）"""
+        snapshot = self.snapshot()
+        lines = []
+        for name, value in sorted(snapshot["counters"].items()):
+            metric = f"{prefix}_{_metric_name(name)}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        for name, histogram in sorted(snapshot["histograms"].items()):
+            metric = f"{prefix}_{_metric_name(name)}_ms"
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, count in histogram["buckets"].items():
+                cumulative += count
+                lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+            lines += [f"{metric}_sum {histogram['sum']}", f"{metric}_count {histogram['count']}"]
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """写入 Prometheus 文本文件（可供 node_exporter 的 textfile 收集器读取）"""
+        temp_path = path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(temp_path, path)
+
+    def append_json(self, path):
+        """把当前数据作为一行 JSON 追加到日志文件"""
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(self.snapshot(), ensure_ascii=False) + "\n")
+
+    def write_file(self, path):
+        """path 以 .json 结尾时追加一行 JSON，否则写入 Prometheus 文本文件"""
+        if path.endswith(".json"):
+            self.append_json(path)
+        else:
+            self.write_prometheus(path)
+
+
+def _metric_name(name):
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+REGISTRY = Registry()
+
+
+def enable(enabled=True):
+    """启用或停用统计"""
+    REGISTRY.enabled = enabled
+
+
+def is_enabled():
+    return REGISTRY.enabled
+
+
+def inc(name, value=1):
+    """计数器加 value"""
+    if REGISTRY.enabled:
+        REGISTRY.inc(name, value)
+
+
+def observe(name, ms):
+    """记录一次耗时(毫秒)"""
+    if REGISTRY.enabled:
+        REGISTRY.observe(name, ms)
+
+
+def now():
+    """开始计时，没有启用时返回None"""
+    return time.perf_counter() if REGISTRY.enabled else None
+
+
+def since(name, started):
+    """记录从 now() 到现在的耗时，started 为None时忽略"""
+    if started is not None and REGISTRY.enabled:
+        REGISTRY.observe(name, (time.perf_counter() - started) * 1000)
+
+
+class _Timer:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        REGISTRY.observe(self.name, (time.perf_counter() - self.started) * 1000)
+        if exc_type is not None:
+            REGISTRY.inc(self.name + ".errors")
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name):
+    """计时的上下文管理器，出错时同时计数 name.errors"""
+    return _Timer(name) if REGISTRY.enabled else _NULL_TIMER
+
+
+def timed(name):
+    """计时的装饰器"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not REGISTRY.enabled:
+                return func(*args, **kwargs)
+            with _Timer(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,165 @@
+"""MP4 文件头解析：只读取文件开头和 moov 盒子的少量数据得到时长、分辨率和编码
+
+MP4 由一系列盒子组成（4字节大小 + 4字节类型），描述信息都在 moov 中，
+moov 可能在文件开头（faststart）也可能在 mdat 之后，所以按盒子头依次跳过，不读取视频数据。
+"""
+import os
+import struct
+
+from mnvideo.dedup import read_range_async
+
+HEAD_SIZE = 16 * 1024  # 每次读取的窗口大小
+MOOV_LIMIT = 32 * 1024  # moov 最多读取的字节数（只需要靠前的 mvhd、tkhd、stsd）
+MAX_BOXES = 32  # 顶层最多跳过的盒子数
+CONTAINERS = frozenset({b"moov", b"trak", b"mdia", b"minf", b"stbl"})
+
+
+def box_header(data, pos, end):
+    """解析 data[pos:end] 开头的盒子头，返回 (类型, 头长度, 盒子大小)，数据不足时返回None
+
+    盒子大小为0表示一直到文件末尾，此时返回的大小为None。
+    """
+    if pos + 8 > end:
+        return None
+    size, kind = struct.unpack_from(">I4s", data, pos)
+    if size == 1:
+        if pos + 16 > end:
+            return None
+        return kind, 16, struct.unpack_from(">Q", data, pos + 8)[0]
+    if size == 0:
+        return kind, 8, None
+    if size < 8:
+        raise ValueError("无效的MP4盒子")
+    return kind, 8, size
+
+
+def parse_moov(data):
+    """从（可能不完整的）moov 内容中解析信息"""
+    info = {}
+    _walk(data, 0, len(data), info, {})
+    return info
+
+
+def _walk(data, pos, end, info, track):
+    while True:
+        header = box_header(data, pos, end)
+        if header is None:
+            return
+        kind, header_len, size = header
+        box_end = end if size is None else min(end, pos + size)
+        body = pos + header_len
+        try:
+            if kind in CONTAINERS:
+                if kind == b"trak":
+                    track = {}
+                _walk(data, body, box_end, info, track)
+                if kind == b"trak":
+                    _apply_track(info, track)
+            elif kind == b"mvhd":
+                _parse_mvhd(data, body, info)
+            elif kind == b"tkhd":
+                _parse_tkhd(data, body, track)
+            elif kind == b"hdlr":
+                track['handler'] = data[body + 8:body + 12]
+            elif kind == b"stsd":
+                _parse_stsd(data, body, track)
+        except struct.error:
+            pass  # 盒子被截断
+        if size is None or pos + size >= end:
+            return
+        pos += size
+
+
+def _parse_mvhd(data, body, info):
+    if data[body] == 1:
+        timescale, duration = struct.unpack_from(">IQ", data, body + 20)
+    else:
+        timescale, duration = struct.unpack_from(">II", data, body + 12)
+    if timescale:
+        info['duration'] = duration / timescale
+
+
+def _parse_tkhd(data, body, track):
+    offset = body + (88 if data[body] == 1 else 76)
+    width, height = struct.unpack_from(">II", data, offset)
+    track['width'] = width >> 16  # 16.16 定点数
+    track['height'] = height >> 16
+
+
+def _parse_stsd(data, body, track):
+    count, size, kind = struct.unpack_from(">II4s", data, body + 4)
+    if count:
+        track['codec'] = kind.decode("latin-1").strip()
+        if len(data) >= body + 8 + 36:
+            # 视频的 SampleEntry 中也有宽高，tkhd 被缩放过时以它为准
+            track['entry_size'] = struct.unpack_from(">HH", data, body + 8 + 32)
+
+
+def _apply_track(info, track):
+    handler = track.get('handler')
+    if handler == b"vide" and 'codec' not in info:
+        info['codec'] = track.get('codec')
+        width, height = track.get('entry_size') or (track.get('width'), track.get('height'))
+        if width and height:
+            info['width'], info['height'] = width, height
+    elif handler == b"soun" and 'audio_codec' not in info:
+        info['audio_codec'] = track.get('codec')
+
+
+async def probe_mp4(read, head_size=HEAD_SIZE, moov_limit=MOOV_LIMIT):
+    """读取 MP4 信息，返回包含 size、duration、width、height、codec、audio_codec 的字典（没有的项不包含）
+
+    read(start, end) 是协程函数，返回 (data[start:end+1], 文件大小)。
+    不是 MP4 或找不到 moov 时只返回文件大小。
+    """
+    buffer, total = await read(0, head_size - 1)
+    if buffer is None:
+        return {}
+    info = {'size': total} if total else {}
+    start = 0  # buffer 在文件中的起始位置
+    pos = 0
+    for _ in range(MAX_BOXES):
+        if total is not None and pos >= total:
+            break
+        if pos + 16 > start + len(buffer) and (total is None or start + len(buffer) < total):
+            start = pos
+            buffer, _ = await read(pos, pos + head_size - 1)
+            if not buffer:
+                break
+        header = box_header(buffer, pos - start, len(buffer))
+        if header is None:
+            break
+        kind, header_len, size = header
+        if pos == 0 and kind not in (b"ftyp", b"moov", b"free", b"skip", b"wide"):
+            break  # 不是 MP4
+        if kind == b"moov":
+            need = min(size or moov_limit, moov_limit)
+            if pos + need > start + len(buffer):
+                start = pos
+                buffer, _ = await read(pos, pos + need - 1)
+            info.update(parse_moov(buffer[pos - start + header_len:pos - start + need]))
+            break
+        if size is None:
+            break
+        pos += size
+    return info
+
+
+async def probe_url(client, url):
+    """用 Range 请求读取远程或本地 MP4 文件的信息"""
+    if not url.startswith(("http://", "https://")):
+        return await probe_mp4(_file_reader(url))
+
+    async def read(start, end):
+        return await read_range_async(client, url, start, end)
+    return await probe_mp4(read)
+
+
+def _file_reader(path):
+    size = os.path.getsize(path)
+
+    async def read(start, end):
+        with open(path, 'rb') as f:
+            f.seek(start)
+            return f.read(end - start + 1), size
+    return read
@@ -0,0 +1,74 @@
+"""共享的HTTP网络层：连接池、keep-alive、重试与退避"""
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from mnvideo import metrics
+
+DEFAULT_TIMEOUT = (5, 10)  # (连接超时, 读取超时) 秒
+RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
+USER_AGENT = "Random-Beauty/5.0"
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def create_session(pool_hosts=10, per_host=4):
+    """创建带连接池的会话，每个主机最多保持 per_host 个连接"""
+    session = requests.Session()
+    # pool_block=True 时超过上限的请求会等待空闲连接，而不是新建连接
+    adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=per_host,
+                          pool_block=True, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
+def get_session():
+    """全局共享的会话（线程安全地延迟创建）"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+
+def backoff_delay(attempt, base=0.5, cap=8.0):
+    """指数退避 + 全抖动：在 [0, min(cap, base*2^attempt)] 内随机取值"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def request(method, url, timeout=DEFAULT_TIMEOUT, retries=3, backoff=0.5, session=None, **kwargs):
+    """发送请求，连接错误、超时和可重试的状态码会按退避策略重试
+
+    最后一次仍失败时抛出异常或返回最后的响应，由调用方处理状态码。
+    """
+    session = session or get_session()
+    for attempt in range(retries + 1):
+        try:
+            response = session.request(method, url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt >= retries:
+                raise
+        else:
+            if response.status_code not in RETRY_STATUS or attempt >= retries:
+                return response
+            response.close()
+        metrics.inc("http.retries")
+        time.sleep(backoff_delay(attempt, backoff))
+
+
+def get(url, **kwargs):
+    """GET请求"""
+    return request("GET", url, **kwargs)
+
+
+def head(url, **kwargs):
+    """HEAD请求"""
+    kwargs.setdefault("allow_redirects", True)
+    return request("HEAD", url, **kwargs)
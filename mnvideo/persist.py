@@ -0,0 +1,79 @@
+"""延迟合并的后台持久化"""
+import threading
+import time
+
+
+class DebouncedWriter:
+    """把频繁的保存请求合并成少量的后台写入
+
+    mark_dirty() 可在任意线程调用；距最后一次标记 delay 秒后写入，
+    持续有新标记时最多推迟 max_delay 秒。flush() 在当前线程立即写入，用于退出前。
+    """
+
+    def __init__(self, write_func, delay=2.0, max_delay=10.0, on_error=None):
+        self.write_func = write_func
+        self.delay = delay
+        self.max_delay = max_delay
+        self.on_error = on_error
+
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._dirty = False
+        self._first_mark = 0.0
+        self._last_mark = 0.0
+        self._stopped = False
+        self._thread = threading.Thread(target=self._worker, name="debounced-writer", daemon=True)
+        self._thread.start()
+
+    def mark_dirty(self):
+        """标记数据已修改"""
+        with self._cond:
+            now = time.monotonic()
+            if not self._dirty:
+                self._dirty = True
+                self._first_mark = now
+            self._last_mark = now
+            self._cond.notify()
+
+    def flush(self):
+        """如有未保存的修改，立即写入"""
+        with self._cond:
+            dirty = self._dirty
+            self._dirty = False
+        if dirty:
+            self._write()
+
+    def close(self):
+        """停止后台线程并写入剩余的修改"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._thread.join(timeout=5)
+        self.flush()
+
+    def _write(self):
+        with self._write_lock:
+            try:
+                self.write_func()
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(e)
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._dirty and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                # 等到一段时间内没有新的修改，或者已经推迟太久
+                while not self._stopped:
+                    now = time.monotonic()
+                    deadline = min(self._last_mark + self.delay, self._first_mark + self.max_delay)
+                    if now >= deadline:
+                        break
+                    self._cond.wait(deadline - now)
+                if self._stopped:
+                    return
+                self._dirty = False
+            self._write()
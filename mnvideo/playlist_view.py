@@ -0,0 +1,58 @@
+"""播放列表的增量显示"""
+
+PLAYING = "▶"
+IDLE = "⏸"
+DEAD = "✖"  # 地址已失效
+
+
+class PlaylistView:
+    """把播放列表同步到 VirtualTreeview：只更新列表长度和当前项变化的两行
+
+    行内容在显示时才由 row() 生成，所以新增、切换当前项的代价与列表长度无关。
+    """
+
+    def __init__(self, view, is_dead=None, details=None, image=None):
+        self.view = view
+        self.view.row_func = self.row
+        self.is_dead = is_dead  # is_dead(url)：地址是否已知失效
+        self.details = details  # details(url)：附加列（时长、分辨率等）的内容
+        self.image = image  # image(url)：行首显示的图片（缩略图），没有时返回空字符串
+        self.urls = []
+        self.current = -1
+
+    def row(self, index):
+        """第 index 行显示的内容"""
+        if index == self.current:
+            status = PLAYING
+        elif self.is_dead and self.is_dead(self.urls[index]):
+            status = DEAD
+        else:
+            status = IDLE
+        values = (index+1, status)
+        if self.details:
+            values += tuple(self.details(self.urls[index]))
+        if self.image:
+            return f"视频 {index+1}", values, self.image(self.urls[index])
+        return f"视频 {index+1}", values
+
+    def refresh_visible(self):
+        """重新显示可见的行（例如探测到失效地址后）"""
+        self.view.render()
+
+    def sync(self, urls, current_index):
+        """根据播放列表和当前序号更新显示"""
+        if urls is not self.urls or len(urls) < self.view.count:
+            # 列表被替换或变短，重新显示
+            self.urls = urls
+            self.current = current_index
+            self.view.set_count(0)
+            self.view.set_count(len(urls))
+        elif len(urls) != self.view.count:
+            self.view.set_count(len(urls))
+
+        if current_index != self.current:
+            previous = self.current
+            self.current = current_index
+            self.view.refresh(previous)
+            self.view.refresh(current_index)
+            self.view.see(current_index)
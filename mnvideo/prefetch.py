@@ -0,0 +1,115 @@
+"""视频地址后台预取"""
+import threading
+from collections import deque
+
+
+class UrlPrefetcher:
+    """在后台线程中预取视频地址，使队列中始终有可用的地址
+
+    队列中的地址(含正在请求的)少于 low_watermark 时开始补充，
+    补充到 high_watermark 为止。回调函数在工作线程中执行，
+    界面需要自行转交到主线程处理。
+    """
+
+    def __init__(self, fetch_func, low_watermark=2, high_watermark=5, workers=2,
+                 on_ready=None, on_error=None, max_retry_delay=30.0):
+        self.fetch_func = fetch_func
+        self.on_ready = on_ready
+        self.on_error = on_error
+        self.workers = workers
+        self.max_retry_delay = max_retry_delay
+        self.set_watermarks(low_watermark, high_watermark)
+
+        self._ready = deque()
+        self._inflight = 0
+        self._refilling = True
+        self._stopped = False
+        self._cond = threading.Condition()
+        self._stop_event = threading.Event()
+        self._threads = []
+
+    def set_watermarks(self, low_watermark, high_watermark):
+        """设置补充队列的高低水位"""
+        if high_watermark < 1 or not 0 <= low_watermark <= high_watermark:
+            raise ValueError("需要满足 0 <= low_watermark <= high_watermark 且 high_watermark >= 1")
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        if hasattr(self, '_cond'):
+            with self._cond:
+                self._check_watermark()
+                self._cond.notify_all()
+
+    def start(self):
+        """启动工作线程"""
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"url-prefetch-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """停止预取"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._stop_event.set()
+
+    def take(self):
+        """取出一个已就绪的地址，没有时立即返回None"""
+        with self._cond:
+            url = self._ready.popleft() if self._ready else None
+            self._check_watermark()
+            self._cond.notify_all()
+        return url
+
+    def available(self):
+        """已就绪的地址数量"""
+        with self._cond:
+            return len(self._ready)
+
+    def _check_watermark(self):
+        # 调用方需持有 self._cond
+        if len(self._ready) + self._inflight < self.low_watermark:
+            self._refilling = True
+
+    def _needs_more(self):
+        # 调用方需持有 self._cond
+        if len(self._ready) + self._inflight >= self.high_watermark:
+            self._refilling = False
+        return self._refilling
+
+    def _worker(self):
+        """工作线程：按水位补充地址，失败时指数退避"""
+        retry_delay = 1.0
+        while True:
+            with self._cond:
+                while not self._stopped and not self._needs_more():
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                self._inflight += 1
+
+            url, error = None, None
+            try:
+                url = self.fetch_func()
+            except Exception as e:
+                error = e
+
+            with self._cond:
+                self._inflight -= 1
+                if url:
+                    self._ready.append(url)
+                self._check_watermark()
+                self._cond.notify_all()
+
+            if url:
+                retry_delay = 1.0
+                if self.on_ready:
+                    self.on_ready(url)
+            else:
+                if error is not None and self.on_error:
+                    self.on_error(error)
+                if self._stop_event.wait(retry_delay):
+                    return
+                retry_delay = min(retry_delay * 2, self.max_retry_delay)
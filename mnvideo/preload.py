@@ -0,0 +1,85 @@
+"""用备用播放器预先缓冲接下来的视频"""
+
+
+class PreloadSlot:
+    """一个播放器及其显示区域"""
+
+    def __init__(self, player, view=None):
+        self.player = player
+        self.view = view
+        self.url = None  # 已加载的地址
+
+
+class Preloader:
+    """管理一个当前播放器和若干备用播放器
+
+    备用播放器以 :start-paused 打开接下来的视频，缓冲好后停在第一帧并静音；
+    切换到已预加载的视频时只需恢复播放，不用再等待网络缓冲。
+    不依赖具体的界面库，instance 和 player 是 python-vlc 的对象。
+    """
+
+    def __init__(self, instance, slots):
+        self.instance = instance
+        self.slots = slots
+        self.active = slots[0]
+
+    @property
+    def depth(self):
+        """最多预加载的视频数量"""
+        return len(self.slots) - 1
+
+    def is_preloaded(self, url):
+        """url 是否已在备用播放器上缓冲"""
+        return any(slot.url == url for slot in self.slots if slot is not self.active)
+
+    def activate(self, url, options=()):
+        """播放 url，返回 (播放槽, 是否命中预加载)
+
+        命中预加载时切换到对应的备用播放器，原来的播放器停止并成为备用；
+        否则在当前播放器上直接打开。options 是额外的媒体选项（如 :start-time）。
+        """
+        for slot in self.slots:
+            if slot is not self.active and slot.url == url and not options:
+                previous = self.active
+                self.active = slot
+                slot.player.audio_set_mute(False)
+                slot.player.play()
+                previous.player.stop()
+                previous.url = None
+                return slot, True
+
+        self._open(self.active, url, options)
+        self.active.player.audio_set_mute(False)
+        return self.active, False
+
+    def preload(self, urls):
+        """按优先级在备用播放器上缓冲 urls，不再需要的预加载会被替换"""
+        wanted = []
+        for url in urls:
+            if url and url != self.active.url and url not in wanted:
+                wanted.append(url)
+        wanted = wanted[:self.depth]
+
+        standby = [slot for slot in self.slots if slot is not self.active]
+        free = [slot for slot in standby if slot.url not in wanted]
+        loaded = {slot.url for slot in standby}
+        for url in wanted:
+            if url in loaded or not free:
+                continue
+            slot = free.pop(0)
+            slot.player.audio_set_mute(True)
+            self._open(slot, url, (":start-paused",))
+
+    def stop_all(self):
+        """停止所有播放器"""
+        for slot in self.slots:
+            slot.player.stop()
+            slot.url = None
+
+    def _open(self, slot, url, options):
+        media = self.instance.media_new(url)
+        for option in options:
+            media.add_option(option)
+        slot.player.set_media(media)
+        slot.player.play()
+        slot.url = url
@@ -0,0 +1,239 @@
+"""进程内的性能分析：在运行中的程序里随时开始和停止，不需要重新启动
+
+SamplingProfiler 在后台线程中定时抓取所有线程的调用栈，开销很小，输出折叠栈
+（flamegraph.pl、speedscope 等工具可以直接生成火焰图）和耗时排行；
+解释器不支持 sys._current_frames 时 create_profiler 退回到只分析调用线程的 cProfile。
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+DEFAULT_INTERVAL = 0.005  # 采样间隔(秒)
+MAX_DEPTH = 128  # 每个调用栈最多记录的层数
+IDLE_FUNCTIONS = frozenset({"mainloop"})  # 主线程调用栈的最内层是这些函数时表示空闲（在等待事件）
+STALL_THRESHOLD = 0.1  # 主线程连续忙碌超过这个时间(秒)记为一次卡顿
+
+
+def create_profiler(interval=DEFAULT_INTERVAL):
+    """优先使用采样分析器"""
+    if hasattr(sys, "_current_frames"):
+        return SamplingProfiler(interval)
+    return CProfileProfiler()
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """对所有线程（除了自己的采样线程）定时采样的分析器
+
+    同时记录主线程的卡顿：连续的采样中主线程都不在 IDLE_FUNCTIONS 里等待事件，
+    每次卡顿保存开始时间、持续时间和期间出现最多的调用栈。
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL, stall_threshold=STALL_THRESHOLD):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.stacks = Counter()  # 折叠栈 "线程;外层;...;内层" -> 采样次数
+        self.samples = 0
+        self.stalls = []  # [(距开始的秒数, 持续秒数, 调用栈)]
+        self.started_at = None
+        self.stopped_at = None
+        self._labels = {}  # 代码对象 -> 显示名称
+        self._thread_names = {}
+        self._busy = None  # 主线程当前的忙碌区间 [开始时间, 最后时间, Counter]
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def duration(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.stopped_at or time.perf_counter()) - self.started_at
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self.started_at, self.stopped_at = time.perf_counter(), None
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self.running:
+            return
+        self._stop.set()
+        self._thread.join()
+        self.stopped_at = time.perf_counter()
+        self._end_busy(self.stopped_at)
+
+    def _run(self):
+        own = threading.get_ident()
+        main = threading.main_thread().ident
+        while not self._stop.wait(self.interval):
+            self.sample(own, main)
+
+    def sample(self, own=None, main=None):
+        """抓取一次所有线程的调用栈"""
+        now = time.perf_counter()
+        labels = self._labels
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            leaf = frame.f_code.co_name
+            while frame is not None and len(stack) < MAX_DEPTH:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = _frame_label(code)
+                stack.append(label)
+                frame = frame.f_back
+            stack.append(self._thread_name(ident))
+            key = ";".join(reversed(stack))
+            self.stacks[key] += 1
+            if ident == main:
+                if leaf in IDLE_FUNCTIONS:
+                    self._end_busy(now)
+                else:
+                    self._add_busy(now, key)
+        self.samples += 1
+
+    def _thread_name(self, ident):
+        name = self._thread_names.get(ident)
+        if name is None:
+            self._thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            name = self._thread_names.setdefault(ident, f"thread-{ident}")
+        return name
+
+    def _add_busy(self, now, key):
+        if self._busy is None:
+            self._busy = [now, now, Counter()]
+        self._busy[1] = now
+        self._busy[2][key] += 1
+
+    def _end_busy(self, now):
+        if self._busy is None:
+            return
+        started, last, stacks = self._busy
+        self._busy = None
+        duration = last - started + self.interval
+        if duration >= self.stall_threshold:
+            self.stalls.append((started - self.started_at, duration, stacks.most_common(1)[0][0]))
+
+    def collapsed(self):
+        """折叠栈格式的文本，每行 "栈 采样次数" """
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self, top=30):
+        """按自身和累计采样次数排列的函数，以及主线程最长的卡顿"""
+        total = sum(self.stacks.values()) or 1
+        own, inclusive, threads = Counter(), Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            threads[frames[0]] += count
+            own[frames[-1]] += count
+            for label in set(frames[1:]):
+                inclusive[label] += count
+        lines = [f"采样分析: {self.duration:.1f} 秒，{self.samples} 次采样，间隔 {self.interval * 1000:.0f} 毫秒",
+                 "", "各线程采样次数:"]
+        lines += [f"  {count:8d}  {name}" for name, count in threads.most_common()]
+        for title, counter in (("自身", own), ("累计", inclusive)):
+            lines += ["", f"前 {top} 个函数（按{title}采样次数）:"]
+            lines += [f"  {count:8d} {count * 100 / total:6.1f}%  {label}"
+                      for label, count in counter.most_common(top)]
+        stalls = sorted(self.stalls, key=lambda stall: -stall[1])[:top]
+        lines += ["", f"主线程卡顿（超过 {self.stall_threshold * 1000:.0f} 毫秒）: {len(self.stalls)} 次"]
+        for offset, duration, stack in stalls:
+            lines.append(f"  第 {offset:.1f} 秒，{duration * 1000:.0f} 毫秒: {' <- '.join(reversed(stack.split(';')[-4:]))}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, prefix, top=30):
+        """写入 prefix.folded（折叠栈）和 prefix.txt（排行），返回文件路径列表"""
+        return _write_files(prefix, [(".folded", self.collapsed()), (".txt", self.summary(top))])
+
+
+class CProfileProfiler:
+    """cProfile 分析器：只分析调用 start() 的线程（图形界面中即界面线程）"""
+
+    def __init__(self):
+        self._profile = None
+        self.running = False
+        self.started_at = None
+        self.stopped_at = None
+
+    @property
+    def duration(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.stopped_at or time.perf_counter()) - self.started_at
+
+    def start(self):
+        if self.running:
+            return
+        self._profile = cProfile.Profile()
+        self.started_at, self.stopped_at = time.perf_counter(), None
+        self._profile.enable()
+        self.running = True
+
+    def stop(self):
+        if not self.running:
+            return
+        self._profile.disable()
+        self.stopped_at = time.perf_counter()
+        self.running = False
+
+    def collapsed(self):
+        """由调用关系近似的两层折叠栈 "调用者;函数 自身微秒数"（cProfile 不记录完整的调用栈）"""
+        lines = []
+        for func, (_, _, tottime, _, callers) in pstats.Stats(self._profile).stats.items():
+            label = self._label(func)
+            total = sum(caller[2] for caller in callers.values()) or tottime
+            for caller, (_, _, caller_tottime, _) in callers.items():
+                share = tottime * caller_tottime / total if total else 0
+                if share >= 1e-6:
+                    lines.append(f"{self._label(caller)};{label} {int(share * 1e6)}\n")
+            if not callers and tottime >= 1e-6:
+                lines.append(f"{label} {int(tottime * 1e6)}\n")
+        return "".join(lines)
+
+    @staticmethod
+    def _label(func):
+        filename, line, name = func
+        return f"{name} ({os.path.basename(filename)}:{line})"
+
+    def summary(self, top=30):
+        output = io.StringIO()
+        output.write(f"cProfile: {self.duration:.1f} 秒\n")
+        stats = pstats.Stats(self._profile, stream=output)
+        stats.sort_stats("tottime").print_stats(top)
+        stats.sort_stats("cumulative").print_stats(top)
+        return output.getvalue()
+
+    def dump(self, prefix, top=30):
+        """写入 prefix.folded、prefix.txt 和 prefix.prof（pstats 格式），返回文件路径列表"""
+        paths = _write_files(prefix, [(".folded", self.collapsed()), (".txt", self.summary(top))])
+        self._profile.dump_stats(prefix + ".prof")
+        return paths + [prefix + ".prof"]
+
+
+def _write_files(prefix, contents):
+    directory = os.path.dirname(prefix)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    paths = []
+    for suffix, text in contents:
+        with open(prefix + suffix, 'w', encoding='utf-8') as f:
+            f.write(text)
+        paths.append(prefix + suffix)
+    return paths
@@ -0,0 +1,101 @@
+"""界面定时任务调度"""
+import time
+import traceback
+
+
+class TickScheduler:
+    """用一个可取消的 after 循环驱动所有周期任务
+
+    播放中且窗口可见时以 active_interval 运行；暂停、停止时降为 idle_interval；
+    窗口最小化时降为 hidden_interval。标记为 active_only 的任务（如进度条）
+    只在播放中且可见时执行。只能在界面线程中使用。
+    任务出错时输出异常信息到标准错误，并调用 on_error(name, error)（例如显示在状态栏），不影响其他任务。
+    """
+
+    def __init__(self, root, active_interval=100, idle_interval=250, hidden_interval=1000, on_error=None):
+        self.root = root
+        self.active_interval = active_interval
+        self.idle_interval = idle_interval
+        self.hidden_interval = hidden_interval
+        self.on_error = on_error
+        self.tasks = {}  # 名称 -> [函数, 间隔(ms), 下次执行时间, 是否只在播放时执行]
+        self.active = False
+        self._running = False
+        self._in_tick = False  # 正在执行任务，结束时由 _tick 安排下一次调度
+        self._after_id = None
+
+    def register(self, name, func, interval=0, active_only=False):
+        """注册周期任务（同名任务会被替换），interval 为最小间隔(ms)，0表示每次都执行"""
+        self.tasks[name] = [func, interval, 0.0, active_only]
+
+    def unregister(self, name):
+        """取消周期任务"""
+        self.tasks.pop(name, None)
+
+    def set_active(self, active):
+        """切换播放状态，从空闲变为播放时立即执行一次"""
+        was_active = self.active
+        self.active = active
+        if active and not was_active:
+            self.restart()
+
+    def start(self):
+        """开始调度（在任务中调用时由当前这次调度结束后安排，始终只有一个等待中的调度）"""
+        self._running = True
+        if self._after_id is None and not self._in_tick:
+            self._after_id = self.root.after_idle(self._tick)
+
+    def stop(self):
+        """停止调度"""
+        self._running = False
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def restart(self):
+        """取消等待中的一次调度并立即执行"""
+        self.stop()
+        self.start()
+
+    def is_visible(self):
+        """窗口是否可见（未最小化）"""
+        try:
+            return self.root.state() not in ("iconic", "withdrawn")
+        except Exception:
+            return False
+
+    def current_interval(self):
+        """当前的调度间隔(ms)"""
+        if not self.is_visible():
+            return self.hidden_interval
+        return self.active_interval if self.active else self.idle_interval
+
+    def _tick(self):
+        self._after_id = None
+        self._in_tick = True
+        try:
+            self._run_tasks()
+        finally:
+            self._in_tick = False
+        if self._running:
+            self._after_id = self.root.after(self.current_interval(), self._tick)
+
+    def _run_tasks(self):
+        visible = self.is_visible()
+        now = time.monotonic()
+        for name, task in list(self.tasks.items()):
+            func, interval, due, active_only = task
+            if active_only and not (self.active and visible):
+                continue
+            if now < due:
+                continue
+            task[2] = now + interval / 1000
+            try:
+                func()
+            except Exception as e:
+                traceback.print_exc()
+                if self.on_error:
+                    try:
+                        self.on_error(name, e)
+                    except Exception:
+                        traceback.print_exc()
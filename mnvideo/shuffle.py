@@ -0,0 +1,183 @@
+"""随机播放顺序"""
+import random
+from collections import Counter, deque
+
+MAX_HISTORY = 1000  # 保留的播放历史长度
+
+
+class ShuffleBag:
+    """洗牌式随机播放：每一轮每个视频恰好播放一次，最近 window 次播放过的视频不会重复
+
+    视频数少于 2 * window 时窗口缩小为视频数的一半，保证每一轮都有一半以上的视频参与随机抽取，
+    否则所有视频都在窗口内，每一轮只能按上一轮的顺序重复。
+
+    用增量的 Fisher-Yates 抽取：本轮剩余的序号放在列表中，每次随机取一个并与末尾交换后弹出，
+    新加入播放列表的序号直接放进本轮，所以选择下一个和追加都是 O(1)。
+    新一轮开始时仍在 window 内的序号先暂缓，离开 window 后再加入本轮。
+    播放历史用于上一个，提前抽好的序号（peek）也放在历史中当前位置之后。
+    """
+
+    def __init__(self, count=0, window=10, rng=None):
+        self.window = window
+        self.rng = rng or random.Random()
+        self.reset(count)
+
+    def reset(self, count, current=-1):
+        """播放列表被替换或有视频被移除时重新开始，current 是当前播放的序号"""
+        self.count = count
+        self.remaining = []  # 本轮还没有抽到的序号
+        self.where = {}  # 序号 -> 在 remaining 中的位置
+        self.deferred = set()  # 本轮暂缓的序号（还在最近播放的窗口内）
+        self.recent = deque()  # 最近播放的序号
+        self.recent_counts = Counter()
+        self.last_played = {}  # 序号 -> 播放计数，用于找出最早播放的暂缓序号
+        self.plays = 0
+        self.history = []
+        self.position = -1  # 当前播放的视频在 history 中的位置
+        self._refill()
+        if 0 <= current < count:
+            self.visit(current)
+
+    def resize(self, count):
+        """播放列表末尾新增了视频，新序号加入本轮"""
+        for index in range(self.count, count):
+            self._add(index)
+        self.count = max(self.count, count)
+
+    def current(self):
+        """当前播放的序号，没有时返回-1"""
+        return self.history[self.position] if self.position >= 0 else -1
+
+    def visit(self, index):
+        """记录不是由 next/prev 选出的播放（例如双击播放列表）"""
+        if index == self.current():
+            return
+        if self.position + 1 < len(self.history) and self.history[self.position + 1] == index:
+            self.position += 1
+        else:
+            self._drop_planned()
+            self._remove(index)
+            self.history.append(index)
+            self.position += 1
+        self._played(index)
+        self._trim_history()
+
+    def next(self, skip=None):
+        """选出下一个序号并记为已播放，skip(index) 为真的序号在本轮中跳过；列表为空时返回-1"""
+        for _ in range(self.count + len(self.history) - self.position):
+            if self.position + 1 >= len(self.history):
+                index = self._draw()
+                if index < 0:
+                    return -1
+                self.history.append(index)
+            if skip and skip(self.history[self.position + 1]):
+                del self.history[self.position + 1]
+                continue
+            self.position += 1
+            index = self.history[self.position]
+            self._played(index)
+            self._trim_history()
+            return index
+        return -1
+
+    def prev(self):
+        """回到历史中的上一个序号，没有时返回-1"""
+        if self.position <= 0:
+            return -1
+        self.position -= 1
+        return self.history[self.position]
+
+    def peek(self, n, skip=None):
+        """接下来会播放的 n 个序号（提前抽好，之后 next 按这个顺序返回）"""
+        upcoming = []
+        offset = self.position + 1
+        while len(upcoming) < n:
+            if offset >= len(self.history):
+                index = self._draw()
+                if index < 0:
+                    break
+                self.history.append(index)
+            index = self.history[offset]
+            if skip and skip(index):
+                del self.history[offset]
+                continue
+            upcoming.append(index)
+            offset += 1
+        return upcoming
+
+    def _add(self, index):
+        if index not in self.where:
+            self.where[index] = len(self.remaining)
+            self.remaining.append(index)
+
+    def _remove(self, index):
+        position = self.where.pop(index, None)
+        if position is None:
+            self.deferred.discard(index)
+            return
+        last = self.remaining.pop()
+        if last != index:
+            self.remaining[position] = last
+            self.where[last] = position
+
+    def _draw(self):
+        """从本轮剩余的序号中随机抽取一个"""
+        if not self.remaining:
+            self._refill()
+        if not self.remaining:
+            return -1
+        position = self.rng.randrange(len(self.remaining))
+        index = self.remaining[position]
+        self._remove(index)
+        return index
+
+    def _refill(self):
+        """开始新的一轮"""
+        planned = set(self.history[self.position + 1:])
+        self.deferred.clear()
+        for index in range(self.count):
+            if index in planned:
+                continue
+            if self.recent_counts[index]:
+                self.deferred.add(index)
+            else:
+                self._add(index)
+        if not self.remaining and self.deferred:
+            # 视频数不超过 window 时只能重复，选最早播放的那个
+            index = min(self.deferred, key=lambda i: self.last_played.get(i, -1))
+            self.deferred.discard(index)
+            self._add(index)
+
+    def _window(self):
+        """实际使用的窗口大小"""
+        return min(self.window, self.count // 2)
+
+    def _played(self, index):
+        self.plays += 1
+        self.last_played[index] = self.plays
+        self.recent.append(index)
+        self.recent_counts[index] += 1
+        window = self._window()
+        while len(self.recent) > window:
+            old = self.recent.popleft()
+            self.recent_counts[old] -= 1
+            if not self.recent_counts[old]:
+                del self.recent_counts[old]
+                if old in self.deferred:
+                    self.deferred.discard(old)
+                    self._add(old)
+
+    def _drop_planned(self):
+        """放弃提前抽好的序号，放回本轮"""
+        for index in self.history[self.position + 1:]:
+            if self.recent_counts[index]:
+                self.deferred.add(index)
+            else:
+                self._add(index)
+        del self.history[self.position + 1:]
+
+    def _trim_history(self):
+        extra = len(self.history) - MAX_HISTORY
+        if extra > 0 and self.position >= extra:
+            del self.history[:extra]
+            self.position -= extra
@@ -0,0 +1,69 @@
+"""用 libvlc 离屏解码截取视频帧（需要 python-vlc）"""
+import ctypes
+import threading
+
+import vlc
+
+
+class FrameGrabber:
+    """截取视频中的一帧，缩小到指定尺寸
+
+    视频通过 video_set_callbacks 解码到内存中，不需要窗口，缩放由 libvlc 完成。
+    每次截图使用单独的播放器，可以在多个线程中同时调用 grab。
+    """
+
+    def __init__(self, timeout=10):
+        self.timeout = timeout
+        self.instance = vlc.Instance("--no-audio", "--no-xlib", "--quiet", "--no-video-title-show")
+
+    def grab(self, source, width, height, start=3.0):
+        """从 start 秒处截取一帧，返回 (宽, 高, RGB数据)"""
+        pitch = width * 4
+        buffer = (ctypes.c_ubyte * (pitch * height))()
+        result = []
+        done = threading.Event()
+
+        # 回调对象必须在播放期间保持引用
+        @vlc.CallbackDecorators.VideoLockCb
+        def lock(opaque, planes):
+            planes[0] = ctypes.addressof(buffer)
+            return None
+
+        @vlc.CallbackDecorators.VideoUnlockCb
+        def unlock(opaque, picture, planes):
+            pass
+
+        @vlc.CallbackDecorators.VideoDisplayCb
+        def display(opaque, picture):
+            # 跳转后的第一帧可能还是跳转前的关键帧，取第二帧
+            result.append(None)
+            if len(result) == 2:
+                result[1] = bytes(buffer)
+                done.set()
+
+        media = self.instance.media_new(source)
+        media.add_option(f":start-time={start:.3f}")
+        player = self.instance.media_player_new()
+        player.set_media(media)
+        player.video_set_callbacks(lock, unlock, display, None)
+        player.video_set_format("RV32", width, height, pitch)
+        events = player.event_manager()
+        for event_type in (vlc.EventType.MediaPlayerEncounteredError, vlc.EventType.MediaPlayerEndReached):
+            events.event_attach(event_type, lambda event: done.set())
+        player.play()
+        try:
+            done.wait(self.timeout)
+        finally:
+            player.stop()
+            player.release()
+            media.release()
+        if len(result) < 2 or result[1] is None:
+            raise RuntimeError(f"无法截取视频帧: {source}")
+
+        # RV32 在内存中是 BGRA
+        data = result[1]
+        rgb = bytearray(width * height * 3)
+        rgb[0::3] = data[2::4]
+        rgb[1::3] = data[1::4]
+        rgb[2::3] = data[0::4]
+        return width, height, bytes(rgb)
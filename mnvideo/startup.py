@@ -0,0 +1,55 @@
+"""启动优化：延迟导入和启动计时"""
+import importlib.util
+import sys
+import time
+
+
+def lazy_import(name):
+    """返回一个延迟加载的模块，第一次访问其属性时才真正导入
+
+    模块已导入过时直接返回；找不到模块时抛出 ImportError。
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"找不到模块 {name}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+class StartupTimer:
+    """记录启动过程中各个阶段距离 started_at 的时间
+
+    enabled=False 时 mark 不做任何事，可以一直留在代码里。
+    """
+
+    def __init__(self, started_at=None, enabled=True):
+        self.started_at = started_at or time.perf_counter()
+        self.enabled = enabled
+        self.marks = {}  # 阶段名称 -> 毫秒，按记录顺序
+        self.reported = False
+
+    def mark(self, name, at=None):
+        """记录阶段完成的时间（同一阶段只记录第一次）"""
+        if self.enabled and name not in self.marks:
+            self.marks[name] = ((at or time.perf_counter()) - self.started_at) * 1000
+
+    def report(self):
+        """各阶段耗时的文字报告"""
+        lines = ["启动耗时 (毫秒):"]
+        previous = 0.0
+        for name, ms in self.marks.items():
+            lines.append(f"  {name:<16}{ms:9.1f}  (+{ms - previous:.1f})")
+            previous = ms
+        return "\n".join(lines)
+
+    def print_report(self, file=None):
+        """输出报告（默认到标准错误），只输出一次"""
+        if self.enabled and not self.reported:
+            self.reported = True
+            print(self.report(), file=file or sys.stderr, flush=True)
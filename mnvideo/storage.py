@@ -0,0 +1,371 @@
+"""SQLite存储：播放历史、收藏夹、播放列表、去重索引和视频信息"""
+import glob
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL,
+    played_at REAL NOT NULL,
+    idx INTEGER NOT NULL DEFAULT -1
+);
+CREATE INDEX IF NOT EXISTS history_url ON history(url);
+CREATE INDEX IF NOT EXISTS history_played_at ON history(played_at);
+CREATE TABLE IF NOT EXISTS favorites (
+    url TEXT PRIMARY KEY,
+    added_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS favorites_added_at ON favorites(added_at);
+CREATE TABLE IF NOT EXISTS playlists (
+    name TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    saved_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS seen_urls (
+    url TEXT PRIMARY KEY,
+    fingerprint TEXT,
+    seen_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS seen_urls_fingerprint ON seen_urls(fingerprint);
+CREATE TABLE IF NOT EXISTS files (
+    fingerprint TEXT PRIMARY KEY,
+    path TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS media_info (
+    url TEXT PRIMARY KEY,
+    duration REAL,
+    width INTEGER,
+    height INTEGER,
+    codec TEXT,
+    audio_codec TEXT,
+    size INTEGER,
+    probed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class Storage:
+    """播放器数据库（WAL模式，可在多个线程中使用）
+
+    写操作只放进缓冲区，由 flush()（通常在 DebouncedWriter 的后台线程中）在一个事务中批量写入。
+    查询不会触发写入：读连接只读取已提交的数据，再叠加缓冲区中还没有提交的修改，
+    所以界面线程的查询不需要等待写入，也总能读到最新的数据。
+    """
+
+    def __init__(self, path="player_data.db"):
+        self.path = path
+        self._lock = threading.RLock()  # 保护缓冲区和读连接
+        self._pending = []  # [(序号, sql, 参数)]
+        self._overlay = {}  # (表, 键) -> (序号, 值)：还没有提交的修改
+        self._pending_history = []  # [(序号, (url, played_at, idx))]
+        self._seq = itertools.count(1)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        if path == ":memory:":
+            # 内存数据库不能打开第二个连接，写入期间查询只能等待
+            self._reader = self.conn
+            self._write_lock = self._lock
+        else:
+            self._reader = sqlite3.connect(path, check_same_thread=False)
+            self._write_lock = threading.Lock()
+
+    def close(self):
+        """写入缓冲区并关闭数据库"""
+        self.flush()
+        with self._write_lock, self._lock:
+            if self._reader is not self.conn:
+                self._reader.close()
+            self.conn.close()
+
+    def flush(self):
+        """在一个事务中写入所有缓冲的操作，出错时回滚并保留缓冲区，之后再次写入"""
+        with self._write_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+                pending, self._pending = self._pending, []
+            try:
+                for _, sql, params in pending:
+                    self.conn.execute(sql, params)
+                # 提交和清除叠加的修改一起进行，查询不会重复或漏掉数据
+                with self._lock:
+                    self.conn.commit()
+                    self._drop_overlay(pending[-1][0])
+            except BaseException:
+                self.conn.rollback()
+                with self._lock:
+                    self._pending = pending + self._pending
+                raise
+
+    def _write(self, sql, params, key=None, value=None):
+        # 缓冲一个写操作，key 不为None时同时记录叠加的值
+        with self._lock:
+            seq = next(self._seq)
+            self._pending.append((seq, sql, params))
+            if key is not None:
+                self._overlay[key] = (seq, value)
+
+    def _drop_overlay(self, seq):
+        # 调用方需持有 self._lock；删除已提交（序号不大于 seq）的修改
+        self._overlay = {key: item for key, item in self._overlay.items() if item[0] > seq}
+        self._pending_history = [item for item in self._pending_history if item[0] > seq]
+
+    def _pending_value(self, table, key, default=None):
+        # 调用方需持有 self._lock
+        item = self._overlay.get((table, key))
+        return default if item is None else item[1]
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._reader.execute(sql, params).fetchall()
+
+    # 播放历史
+    def add_history(self, url, index=-1, played_at=None):
+        """记录一次播放"""
+        row = (url, played_at or time.time(), index)
+        with self._lock:
+            self._write("INSERT INTO history (url, played_at, idx) VALUES (?, ?, ?)", row)
+            self._pending_history.append((self._pending[-1][0], row))
+
+    def _with_pending_history(self, rows, limit, since=None):
+        # 调用方需持有 self._lock；把没有提交的播放记录合并到查询结果中
+        pending = [row for _, row in self._pending_history if since is None or row[1] >= since]
+        if not pending:
+            return rows
+        return sorted(rows + pending, key=lambda row: row[1], reverse=True)[:limit]
+
+    def recent_history(self, limit=200):
+        """最近播放的记录 [(url, played_at, index)]，新的在前"""
+        with self._lock:
+            rows = self._query(
+                "SELECT url, played_at, idx FROM history ORDER BY played_at DESC LIMIT ?", (limit,))
+            return self._with_pending_history(rows, limit)
+
+    def played_since(self, since, limit=1000):
+        """某个时间之后的播放记录 [(url, played_at, index)]，新的在前"""
+        with self._lock:
+            rows = self._query(
+                "SELECT url, played_at, idx FROM history WHERE played_at >= ? "
+                "ORDER BY played_at DESC LIMIT ?", (since, limit))
+            return self._with_pending_history(rows, limit, since)
+
+    def most_played(self, limit=50):
+        """播放次数最多的视频 [(url, count, last_played_at)]"""
+        with self._lock:
+            pending = [row for _, row in self._pending_history]
+            urls = {row[0] for row in pending}
+            # 没有提交的记录最多让 len(urls) 个视频排进前面，多查询这些行即可
+            rows = self._query(
+                "SELECT url, COUNT(*) AS plays, MAX(played_at) FROM history "
+                "GROUP BY url ORDER BY plays DESC LIMIT ?", (limit + len(urls),))
+            if not pending:
+                return rows
+            counts = {url: [plays, last] for url, plays, last in rows}
+            for url in urls - counts.keys():
+                plays, last = self._query(
+                    "SELECT COUNT(*), MAX(played_at) FROM history WHERE url = ?", (url,))[0]
+                counts[url] = [plays, last or 0]
+            for url, played_at, _ in pending:
+                counts[url][0] += 1
+                counts[url][1] = max(counts[url][1], played_at)
+            merged = [(url, plays, last) for url, (plays, last) in counts.items()]
+            return sorted(merged, key=lambda row: row[1], reverse=True)[:limit]
+
+    def history_count(self):
+        """播放记录总数"""
+        with self._lock:
+            return self._query("SELECT COUNT(*) FROM history")[0][0] + len(self._pending_history)
+
+    # 收藏夹
+    def add_favorite(self, url):
+        """添加收藏（已收藏时忽略）"""
+        with self._lock:
+            added_at = self._pending_value("favorites", url, time.time())
+            self._write("INSERT OR IGNORE INTO favorites (url, added_at) VALUES (?, ?)",
+                        (url, added_at), ("favorites", url), added_at)
+
+    def is_favorite(self, url):
+        """是否已收藏"""
+        with self._lock:
+            if ("favorites", url) in self._overlay:
+                return True
+            return bool(self._query("SELECT 1 FROM favorites WHERE url = ?", (url,)))
+
+    def favorites(self):
+        """收藏的视频地址，按收藏时间排序"""
+        with self._lock:
+            urls = [row[0] for row in self._query("SELECT url FROM favorites ORDER BY added_at")]
+            known = set(urls)
+            pending = sorted((item[1], key[1]) for key, item in self._overlay.items()
+                             if key[0] == "favorites" and key[1] not in known)
+            return urls + [url for _, url in pending]
+
+    # 播放列表
+    def save_playlist(self, name, data):
+        """保存播放列表（同名时覆盖）"""
+        row = (name, json.dumps(data, ensure_ascii=False), time.time())
+        self._write("INSERT OR REPLACE INTO playlists (name, data, saved_at) VALUES (?, ?, ?)",
+                    row, ("playlists", name), row)
+
+    def load_playlist(self, name):
+        """读取播放列表，不存在时返回None"""
+        with self._lock:
+            row = self._pending_value("playlists", name)
+            if row is None:
+                rows = self._query("SELECT name, data, saved_at FROM playlists WHERE name = ?", (name,))
+                row = rows[0] if rows else None
+        return json.loads(row[1]) if row else None
+
+    def playlist_names(self):
+        """已保存的播放列表名称，最近保存的在前"""
+        with self._lock:
+            saved = dict(self._query("SELECT name, saved_at FROM playlists"))
+            for (table, name), (_, row) in self._overlay.items():
+                if table == "playlists":
+                    saved[name] = row[2]
+        return sorted(saved, key=saved.get, reverse=True)
+
+    # 去重索引
+    def add_seen_url(self, url, fingerprint=None):
+        """记录获取过的（规范化后的）视频地址及其内容指纹"""
+        self._write("INSERT OR REPLACE INTO seen_urls (url, fingerprint, seen_at) VALUES (?, ?, ?)",
+                    (url, fingerprint, time.time()), ("seen_urls", url), fingerprint)
+
+    def is_seen_url(self, url):
+        """（规范化后的）视频地址是否获取过"""
+        with self._lock:
+            if ("seen_urls", url) in self._overlay:
+                return True
+            return bool(self._query("SELECT 1 FROM seen_urls WHERE url = ?", (url,)))
+
+    def url_fingerprint(self, url):
+        """已登记地址的内容指纹，没有时返回None"""
+        with self._lock:
+            if ("seen_urls", url) in self._overlay:
+                return self._pending_value("seen_urls", url)
+            rows = self._query("SELECT fingerprint FROM seen_urls WHERE url = ?", (url,))
+            return rows[0][0] if rows else None
+
+    def is_seen_fingerprint(self, fingerprint):
+        """是否获取过相同内容的视频"""
+        with self._lock:
+            if any(key[0] == "seen_urls" and item[1] == fingerprint for key, item in self._overlay.items()):
+                return True
+            return bool(self._query("SELECT 1 FROM seen_urls WHERE fingerprint = ? LIMIT 1", (fingerprint,)))
+
+    def add_file(self, fingerprint, path):
+        """记录已下载文件的内容指纹"""
+        self._write("INSERT OR REPLACE INTO files (fingerprint, path) VALUES (?, ?)",
+                    (fingerprint, path), ("files", fingerprint), path)
+
+    def file_for_fingerprint(self, fingerprint):
+        """相同内容的已下载文件路径，没有时返回None"""
+        with self._lock:
+            path = self._pending_value("files", fingerprint)
+            if path is not None:
+                return path
+            rows = self._query("SELECT path FROM files WHERE fingerprint = ?", (fingerprint,))
+            return rows[0][0] if rows else None
+
+    # 视频信息
+    MEDIA_KEYS = ('duration', 'width', 'height', 'codec', 'audio_codec', 'size')
+
+    def save_media_info(self, url, info):
+        """保存探测到的视频信息（info 中没有的项保存为空）"""
+        values = tuple(info.get(key) for key in self.MEDIA_KEYS)
+        self._write(
+            "INSERT OR REPLACE INTO media_info (url, duration, width, height, codec, audio_codec, size, probed_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (url, *values, time.time()), ("media_info", url), values)
+
+    def media_info(self, url):
+        """视频信息字典（只包含已知的项），没有探测过时返回None"""
+        with self._lock:
+            values = self._pending_value("media_info", url)
+            if values is None:
+                rows = self._query(
+                    "SELECT duration, width, height, codec, audio_codec, size FROM media_info WHERE url = ?", (url,))
+                values = rows[0] if rows else None
+        if values is None:
+            return None
+        return {key: value for key, value in zip(self.MEDIA_KEYS, values) if value is not None}
+
+    # 会话快照
+    def save_session(self, state, videos=None):
+        """保存会话状态（索引、播放位置、设置），videos 不为 None 时同时保存播放列表"""
+        if videos is not None:
+            self.save_session_videos(videos)
+        self.set_meta("session_state", json.dumps(state, ensure_ascii=False))
+
+    def save_session_videos(self, videos):
+        """只保存会话的播放列表"""
+        self.set_meta("session_videos", json.dumps(videos, ensure_ascii=False))
+
+    def load_session(self):
+        """读取上次的会话，返回包含 videos 的状态字典，没有时返回None"""
+        state = self.get_meta("session_state")
+        if state is None:
+            return None
+        session = json.loads(state)
+        session['videos'] = json.loads(self.get_meta("session_videos", "[]"))
+        return session
+
+    # 一次性迁移
+    def get_meta(self, key, default=None):
+        with self._lock:
+            if ("meta", key) in self._overlay:
+                return self._pending_value("meta", key)
+            rows = self._query("SELECT value FROM meta WHERE key = ?", (key,))
+            return rows[0][0] if rows else default
+
+    def set_meta(self, key, value):
+        self._write("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value), ("meta", key), value)
+
+    def migrate(self, json_path="player_data.json", playlist_dir="."):
+        """从旧版的 player_data.json 和播放列表文件导入数据（只执行一次）"""
+        if self.get_meta("migrated") is not None:
+            return
+        if os.path.exists(json_path):
+            self._migrate_player_data(json_path)
+        if playlist_dir:
+            self._migrate_playlists(playlist_dir, exclude=json_path)
+        self.set_meta("migrated", str(time.time()))
+        self.flush()
+        if os.path.exists(json_path):
+            os.replace(json_path, json_path + ".bak")
+
+    def _migrate_player_data(self, json_path):
+        with open(json_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for item in data.get('history', []):
+            try:
+                played_at = datetime.fromisoformat(item['timestamp']).timestamp()
+            except (KeyError, ValueError):
+                played_at = time.time()
+            self.add_history(item.get('url', ''), item.get('index', -1), played_at)
+        for url in data.get('favorites', []):
+            self.add_favorite(url)
+
+    def _migrate_playlists(self, playlist_dir, exclude):
+        for path in glob.glob(os.path.join(playlist_dir, "*.json")):
+            if os.path.abspath(path) == os.path.abspath(exclude):
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if isinstance(data, dict) and isinstance(data.get('videos'), list):
+                self.save_playlist(os.path.splitext(os.path.basename(path))[0], data)
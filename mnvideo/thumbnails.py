@@ -0,0 +1,207 @@
+"""视频缩略图：后台生成、磁盘缓存"""
+import hashlib
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 64 * 1024 ** 2  # 64MB
+
+
+def encode_png(width, height, rgb):
+    """把 RGB 像素数据编码为 PNG（tkinter 的 PhotoImage 可以直接读取）"""
+    stride = width * 3
+    raw = b"".join(b"\0" + rgb[y * stride:(y + 1) * stride] for y in range(height))
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw, 6)) + chunk(b"IEND", b"")
+
+
+class ThumbnailCache:
+    """按内容寻址的缩略图缓存，总大小超过 max_bytes 时淘汰最久未使用的文件
+
+    键由调用方决定（相同内容的视频应得到相同的键），文件名是键的哈希。
+    """
+
+    def __init__(self, cache_dir="thumbnails", max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # 文件名 -> 大小，按最近使用排序
+        self._total = 0
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        self._scan()
+
+    @staticmethod
+    def name(key):
+        return hashlib.sha1(key.encode('utf-8')).hexdigest() + ".png"
+
+    def lookup(self, key):
+        """已缓存时返回文件路径，否则返回None"""
+        name = self.name(key)
+        with self._lock:
+            if name not in self._entries:
+                return None
+            self._entries.move_to_end(name)
+        path = os.path.join(self.cache_dir, name)
+        try:
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self._forget(name)
+            return None
+        return path
+
+    def store(self, key, data):
+        """保存缩略图，返回文件路径"""
+        name = self.name(key)
+        path = os.path.join(self.cache_dir, name)
+        temp_path = path + ".tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        with self._lock:
+            self._forget(name)
+            self._entries[name] = len(data)
+            self._total += len(data)
+        self.evict()
+        return path
+
+    def evict(self):
+        """淘汰最久未使用的文件，直到总大小不超过上限"""
+        with self._lock:
+            for name in list(self._entries):
+                if self._total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except FileNotFoundError:
+                    pass
+                except OSError:
+                    continue
+                self._forget(name)
+
+    def _forget(self, name):
+        # 调用方需持有 self._lock
+        size = self._entries.pop(name, None)
+        if size is not None:
+            self._total -= size
+
+    def _scan(self):
+        files = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith(".tmp"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            elif name.endswith(".png"):
+                stat = os.stat(path)
+                files.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._total += size
+        self.evict()
+
+
+class ThumbnailPipeline:
+    """用 workers 个线程为视频生成缩略图
+
+    grab_func(source, url) 返回 (宽, 高, RGB数据)，source 是本地文件（local_source 找到时）或 url。
+    key_func(url) 得到缓存键；只在 can_use_network() 为真时才从网络读取，
+    本地文件（已缓存或已下载的视频）随时都可以生成，不占用播放的带宽。
+    等待中的请求最多保留 max_pending 个，新的请求优先，滚动出可见区域的行会被挤掉。
+    on_ready(url, path) 在工作线程中调用。
+    """
+
+    def __init__(self, cache, grab_func, key_func=None, workers=2, local_source=None,
+                 can_use_network=None, on_ready=None, max_pending=64):
+        self.cache = cache
+        self.grab_func = grab_func
+        self.key_func = key_func or (lambda url: url)
+        self.workers = workers
+        self.local_source = local_source
+        self.can_use_network = can_use_network
+        self.on_ready = on_ready
+        self.max_pending = max_pending
+        self._keys = {}  # 地址 -> 缓存键
+        self._pending = OrderedDict()  # 等待生成的地址，最新的在末尾
+        self._working = set()
+        self._failed = set()
+        self._threads = []
+        self._stopped = False
+        self._cond = threading.Condition()
+
+    def key(self, url):
+        key = self._keys.get(url)
+        if key is None:
+            key = self._keys[url] = self.key_func(url)
+        return key
+
+    def lookup(self, url):
+        """已生成的缩略图路径，没有时返回None（不会开始生成）"""
+        return self.cache.lookup(self.key(url))
+
+    def request(self, url):
+        """返回缩略图路径；还没有时在后台生成并返回None"""
+        path = self.lookup(url)
+        if path or url in self._failed:
+            return path
+        with self._cond:
+            if url in self._working:
+                return None
+            self._pending.pop(url, None)
+            self._pending[url] = True
+            while len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+            if len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._worker, name="thumbnails", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            self._cond.notify()
+        return None
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._pending.clear()
+            self._cond.notify_all()
+
+    def _take(self):
+        """取出下一个可以处理的 (地址, 来源)，停止时返回None"""
+        with self._cond:
+            while not self._stopped:
+                network = self.can_use_network is None or self.can_use_network()
+                for url in reversed(self._pending):
+                    source = self.local_source(url) if self.local_source else None
+                    if source or network:
+                        del self._pending[url]
+                        self._working.add(url)
+                        return url, source or url
+                # 没有本地文件可用且正在播放网络视频，稍后再试
+                self._cond.wait(None if not self._pending else 1.0)
+            return None
+
+    def _worker(self):
+        while True:
+            task = self._take()
+            if task is None:
+                return
+            url, source = task
+            path = None
+            try:
+                width, height, rgb = self.grab_func(source, url)
+                path = self.cache.store(self.key(url), encode_png(width, height, rgb))
+            except Exception:
+                self._failed.add(url)
+            finally:
+                with self._cond:
+                    self._working.discard(url)
+            if path and self.on_ready:
+                self.on_ready(url, path)
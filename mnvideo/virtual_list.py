@@ -0,0 +1,161 @@
+"""虚拟列表控件：只为可见的行创建 Treeview 项"""
+import tkinter as tk
+from tkinter import ttk
+
+DEFAULT_ROW_HEIGHT = 20
+
+
+class VirtualTreeview(ttk.Frame):
+    """按需渲染的 Treeview
+
+    行数据不保存在控件中，而是在显示时调用 row_func(index) 得到 (text, values) 或 (text, values, image)。
+    控件只保留填满可见区域所需的行，滚动时复用这些行，
+    所以无论列表多长，滚动、跳转和刷新的代价都只与可见行数有关。
+    """
+
+    def __init__(self, parent, row_func, columns=(), show="tree headings", **kwargs):
+        super().__init__(parent)
+        self.row_func = row_func
+        self.count = 0
+        self.first = 0  # 可见区域第一行对应的序号
+        self.rows = 1  # 可见区域能容纳的行数
+        self.slots = []  # 已创建的行ID，第 n 个显示序号 first + n
+        self.selected = -1  # 选中行的序号
+
+        self.tree = ttk.Treeview(self, columns=columns, show=show, selectmode="browse", **kwargs)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.tree.bind("<Configure>", self.on_resize)
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
+        self.tree.bind("<MouseWheel>", self.on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(3))
+        self.tree.bind("<Up>", lambda e: self.move_selection(-1))
+        self.tree.bind("<Down>", lambda e: self.move_selection(1))
+
+    # 与 Treeview 相同的常用接口
+    def heading(self, column, **kwargs):
+        return self.tree.heading(column, **kwargs)
+
+    def column(self, column, **kwargs):
+        return self.tree.column(column, **kwargs)
+
+    def bind(self, sequence=None, func=None, add=None):
+        return self.tree.bind(sequence, func, add)
+
+    def set_count(self, count):
+        """设置列表长度"""
+        self.count = count
+        if self.selected >= count:
+            self.selected = -1
+        self.first = max(0, min(self.first, count - self.rows))
+        self.render()
+
+    def refresh(self, index):
+        """重新读取并显示某一行（不在可见区域时什么也不做）"""
+        slot = index - self.first
+        if 0 <= slot < len(self.slots):
+            self._fill(slot, index)
+
+    def see(self, index):
+        """滚动使某一行可见"""
+        if not 0 <= index < self.count:
+            return
+        if index < self.first or index >= self.first + self.rows:
+            self.scroll_to(index - self.rows // 2)
+
+    def scroll_to(self, first):
+        """把第 first 行滚动到顶部"""
+        first = max(0, min(first, self.count - self.rows))
+        if first != self.first:
+            self.first = first
+            self.render()
+
+    def scroll(self, delta):
+        """滚动 delta 行"""
+        self.scroll_to(self.first + delta)
+
+    def selected_index(self):
+        """选中行的序号，没有选中时返回-1"""
+        return self.selected
+
+    def render(self):
+        """渲染可见区域"""
+        visible = max(0, min(self.rows, self.count - self.first))
+        while len(self.slots) > visible:
+            self.tree.delete(self.slots.pop())
+        for slot in range(visible):
+            if slot == len(self.slots):
+                self.slots.append(self.tree.insert("", "end"))
+            self._fill(slot, self.first + slot)
+
+        slot = self.selected - self.first
+        if 0 <= slot < len(self.slots):
+            if self.tree.selection() != (self.slots[slot],):
+                self.tree.selection_set(self.slots[slot])
+        elif self.tree.selection():
+            self.tree.selection_set(())
+        self._update_scrollbar()
+
+    def _fill(self, slot, index):
+        text, values, *image = self.row_func(index)
+        self.tree.item(self.slots[slot], text=text, values=values, image=image[0] if image else "")
+
+    def _update_scrollbar(self):
+        if self.count <= self.rows:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self.first / self.count, (self.first + self.rows) / self.count)
+
+    def _row_height(self):
+        if self.slots:
+            bbox = self.tree.bbox(self.slots[0])
+            if bbox:
+                return bbox[1], bbox[3]
+        # 还没有布局好的行时按样式计算，使用 Treeview 自己的样式（如缩略图列表的行更高）
+        style = ttk.Style(self)
+        row_height = int(style.lookup(self.tree.cget("style") or "Treeview", "rowheight") or DEFAULT_ROW_HEIGHT)
+        return row_height, row_height
+
+    def on_resize(self, event):
+        """窗口大小变化时重新计算可见行数"""
+        header, row_height = self._row_height()
+        rows = max(1, (event.height - header) // max(1, row_height))
+        if rows != self.rows:
+            self.rows = rows
+            self.first = max(0, min(self.first, self.count - self.rows))
+            self.render()
+
+    def on_scrollbar(self, action, amount, unit=None):
+        """滚动条回调"""
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * self.count))
+        elif action == "scroll":
+            step = self.rows if unit == "pages" else 1
+            self.scroll(int(amount) * step)
+
+    def on_mousewheel(self, event):
+        """鼠标滚轮（Windows/macOS）"""
+        self.scroll(-3 if event.delta > 0 else 3)
+        return "break"
+
+    def on_select(self, event):
+        """记录选中行的序号"""
+        selection = self.tree.selection()
+        if selection and selection[0] in self.slots:
+            self.selected = self.first + self.slots.index(selection[0])
+
+    def move_selection(self, delta):
+        """用方向键移动选中行，越过可见区域时滚动"""
+        if self.count == 0:
+            return "break"
+        index = max(0, min(self.selected + delta, self.count - 1)) if self.selected >= 0 else self.first
+        self.selected = index
+        if index < self.first:
+            self.scroll_to(index)
+        elif index >= self.first + self.rows:
+            self.scroll_to(index - self.rows + 1)
+        self.render()
+        return "break"
@@ -0,0 +1,99 @@
+"""mnvideo.download_manager.DownloadManager：出错的任务不影响工作线程，暂停后立即继续不会重复下载"""
+import os
+import tempfile
+import threading
+import unittest
+
+from mnvideo.download import DownloadStopped
+from mnvideo.download_manager import DONE, FAILED, DownloadManager
+
+
+class BrokenDedup:
+    """计算指纹时出错的去重索引"""
+
+    def fingerprint(self, url):
+        if "broken" in url:
+            raise ConnectionError("fingerprint failed")
+        return None
+
+    def existing_file(self, fingerprint):
+        return None
+
+    def add_file(self, path, fingerprint):
+        pass
+
+
+class DownloadManagerTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.finished = threading.Condition()
+
+    def manager(self, download_func, **kwargs):
+        def on_update(job):
+            with self.finished:
+                self.finished.notify_all()
+        manager = DownloadManager(self.directory, state_file=None, on_update=on_update,
+                                  download_func=download_func, **kwargs)
+        manager.start()
+        self.addCleanup(manager.stop)
+        return manager
+
+    def wait_for(self, predicate):
+        with self.finished:
+            self.assertTrue(self.finished.wait_for(predicate, timeout=5))
+
+    def test_error_before_download_fails_job_and_keeps_worker(self):
+        def download(url, path, progress=None, resume=True, should_stop=None):
+            with open(path, "wb") as f:
+                f.write(b"video")
+        manager = self.manager(download, max_workers=1, dedup=BrokenDedup())
+
+        broken = manager.add("http://example.com/broken.mp4", "broken.mp4")
+        self.wait_for(lambda: broken.state == FAILED)
+        self.assertIn("fingerprint failed", broken.error)
+        # 唯一的工作线程仍然可以执行下一个任务
+        ok = manager.add("http://example.com/ok.mp4", "ok.mp4")
+        self.wait_for(lambda: ok.state == DONE)
+
+    def test_resume_while_paused_worker_is_still_running(self):
+        gate = threading.Event()
+        lock = threading.Lock()
+        running = []
+        overlaps = []
+        runs = []
+
+        def download(url, path, progress=None, resume=True, should_stop=None):
+            with lock:
+                overlaps.append(len(running))
+                running.append(url)
+            try:
+                if not runs:
+                    runs.append(1)
+                    gate.wait(5)  # 第一次下载到这里时暂停并继续
+                    if should_stop():
+                        raise DownloadStopped()
+                else:
+                    runs.append(2)
+                with open(path, "wb") as f:
+                    f.write(b"video")
+            finally:
+                with lock:
+                    running.remove(url)
+        manager = self.manager(download)
+
+        job = manager.add("http://example.com/a.mp4", "a.mp4")
+        self.wait_for(lambda: runs)
+        manager.pause(job)
+        manager.resume(job)
+        gate.set()
+        self.wait_for(lambda: job.state == DONE)
+        self.assertEqual(runs, [1, 2])  # 原来的线程退出后才重新下载
+        self.assertEqual(overlaps, [0, 0])
+        self.assertTrue(os.path.exists(job.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
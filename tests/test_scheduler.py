@@ -0,0 +1,121 @@
+"""mnvideo.scheduler.TickScheduler：间隔、只在播放时执行的任务、错误报告和任务中的重新调度"""
+import itertools
+import unittest
+from unittest import mock
+
+from mnvideo.scheduler import TickScheduler
+
+
+class FakeRoot:
+    """代替 Tk 根窗口，记录等待中的 after 回调，由测试手动执行"""
+
+    def __init__(self):
+        self.pending = {}  # id -> (延迟(ms), 回调)
+        self.window_state = "normal"
+        self._ids = itertools.count(1)
+
+    def after(self, ms, func):
+        after_id = f"after#{next(self._ids)}"
+        self.pending[after_id] = (ms, func)
+        return after_id
+
+    def after_idle(self, func):
+        return self.after("idle", func)
+
+    def after_cancel(self, after_id):
+        self.pending.pop(after_id, None)
+
+    def state(self):
+        return self.window_state
+
+    def run_next(self):
+        """执行最早安排的回调，返回它的延迟"""
+        after_id = next(iter(self.pending))
+        ms, func = self.pending.pop(after_id)
+        func()
+        return ms
+
+
+class TickSchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = FakeRoot()
+        self.errors = []
+        self.scheduler = TickScheduler(self.root, on_error=lambda name, e: self.errors.append((name, e)))
+
+    def test_intervals(self):
+        self.scheduler.start()
+        self.assertEqual(self.root.run_next(), "idle")
+        self.assertEqual(self.root.run_next(), 250)  # 空闲
+        self.scheduler.set_active(True)
+        self.assertEqual(self.root.run_next(), "idle")  # 开始播放时立即执行
+        self.assertEqual(self.root.run_next(), 100)  # 播放中
+        self.root.window_state = "iconic"
+        self.assertEqual(self.root.run_next(), 100)
+        self.assertEqual(list(self.root.pending.values())[0][0], 1000)  # 最小化
+
+    def test_active_only_tasks_skipped_while_idle(self):
+        calls = []
+        self.scheduler.register("always", lambda: calls.append("always"))
+        self.scheduler.register("progress", lambda: calls.append("progress"), active_only=True)
+        self.scheduler.start()
+        self.root.run_next()
+        self.assertEqual(calls, ["always"])
+
+        self.scheduler.set_active(True)
+        self.root.run_next()
+        self.assertEqual(calls, ["always", "always", "progress"])
+
+        self.root.window_state = "iconic"  # 不可见时也跳过
+        self.root.run_next()
+        self.assertEqual(calls, ["always", "always", "progress", "always"])
+
+    def test_task_interval(self):
+        calls = []
+        self.scheduler.register("session", lambda: calls.append(1), interval=5000)
+        self.scheduler.start()
+        with mock.patch("time.monotonic", return_value=100.0):
+            self.root.run_next()
+            self.root.run_next()
+        with mock.patch("time.monotonic", return_value=105.0):
+            self.root.run_next()
+        self.assertEqual(len(calls), 2)
+
+    def test_errors_are_reported_and_other_tasks_still_run(self):
+        calls = []
+        error = ValueError("broken")
+
+        def broken():
+            raise error
+        self.scheduler.register("broken", broken)
+        self.scheduler.register("other", lambda: calls.append(1))
+        self.scheduler.start()
+        with mock.patch("traceback.print_exc"):
+            self.root.run_next()
+            self.root.run_next()
+        self.assertEqual(self.errors, [("broken", error), ("broken", error)])
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(len(self.root.pending), 1)  # 出错后继续调度
+
+    def test_set_active_inside_task_keeps_one_pending_callback(self):
+        # 暂停、继续播放都在任务中切换状态（例如处理播放器事件时）
+        events = iter([True, False] * 5)
+        self.scheduler.register("player_events", lambda: self.scheduler.set_active(next(events, False)))
+        self.scheduler.start()
+        for _ in range(10):
+            self.root.run_next()
+            self.assertEqual(len(self.root.pending), 1)
+
+    def test_restart_and_stop_inside_task(self):
+        self.scheduler.register("restart", self.scheduler.restart)
+        self.scheduler.start()
+        self.root.run_next()
+        self.assertEqual(len(self.root.pending), 1)
+
+        self.scheduler.register("restart", self.scheduler.stop)
+        self.root.run_next()
+        self.assertEqual(self.root.pending, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+"""mnvideo.shuffle.ShuffleBag：每轮恰好播放一次、窗口内不重复、视频较少时仍然随机"""
+import random
+import unittest
+
+from mnvideo.shuffle import ShuffleBag
+
+
+def play(bag, n):
+    return [bag.next() for _ in range(n)]
+
+
+class ShuffleBagTest(unittest.TestCase):
+
+    def assert_rounds(self, order, count):
+        for start in range(0, len(order) - count + 1, count):
+            self.assertEqual(sorted(order[start:start + count]), list(range(count)))
+
+    def assert_no_repeat(self, order, window):
+        for start in range(len(order) - window):
+            span = order[start:start + window + 1]
+            self.assertEqual(len(set(span)), len(span), span)
+
+    def test_each_round_plays_every_video_once(self):
+        bag = ShuffleBag(30, window=10, rng=random.Random(1))
+        self.assert_rounds(play(bag, 30 * 20), 30)
+
+    def test_no_repeat_within_window(self):
+        bag = ShuffleBag(30, window=10, rng=random.Random(2))
+        self.assert_no_repeat(play(bag, 30 * 20), 10)
+
+    def test_small_playlist_still_shuffles(self):
+        for count in (3, 5, 10, 15):
+            bag = ShuffleBag(count, window=10, rng=random.Random(count))
+            order = play(bag, count * 40)
+            self.assert_rounds(order, count)
+            self.assert_no_repeat(order, count // 2)
+            rounds = {tuple(order[start:start + count]) for start in range(count, len(order), count)}
+            self.assertGreater(len(rounds), 1, f"{count} 个视频时每一轮的顺序都相同")
+
+    def test_single_video(self):
+        bag = ShuffleBag(1, rng=random.Random(3))
+        self.assertEqual(play(bag, 3), [0, 0, 0])
+
+    def test_resize_adds_to_current_round(self):
+        bag = ShuffleBag(4, window=2, rng=random.Random(4))
+        first = play(bag, 2)
+        bag.resize(8)
+        rest = play(bag, 6)
+        self.assertEqual(sorted(first + rest), list(range(8)))
+
+    def test_prev_and_peek(self):
+        bag = ShuffleBag(20, rng=random.Random(5))
+        played = play(bag, 3)
+        self.assertEqual(bag.prev(), played[1])
+        self.assertEqual(bag.next(), played[2])
+        upcoming = bag.peek(4)
+        self.assertEqual(play(bag, 4), upcoming)
+
+
+if __name__ == "__main__":
+    unittest.main()
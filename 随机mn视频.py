@@ -1,6 +1,6 @@
 import tkinter as tk
 import vlc
-import requests
+from mnvideo import network
 
 class VLCPlayer:
     def __init__(self, root):
@@ -26,7 +26,7 @@ class VLCPlayer:
     
     def get_video_url(self):
         """获取API视频地址"""
-        response = requests.get("https://api.kuleu.com/api/MP4_xiaojiejie?type=json")
+        response = network.get("https://api.kuleu.com/api/MP4_xiaojiejie?type=json")
         return response.json().get('mp4_video', '')
     
     def play(self):
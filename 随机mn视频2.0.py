@@ -1,6 +1,7 @@
 import tkinter as tk
 import vlc
-import requests
+from mnvideo import network
+from mnvideo.download import stream_download
 import os
 
 class EnhancedVLCPlayer:
@@ -32,7 +33,7 @@ class EnhancedVLCPlayer:
     
     def fetch_video_urls(self):
         """获取API视频地址列表"""
-        response = requests.get("https://api.kuleu.com/api/MP4_xiaojiejie?type=json")
+        response = network.get("https://api.kuleu.com/api/MP4_xiaojiejie?type=json")
         video_url = response.json().get('mp4_video', '')
         if video_url:
             self.video_urls.append(video_url)
@@ -74,10 +75,8 @@ class EnhancedVLCPlayer:
         """下载当前视频"""
         if self.current_index >= 0 and self.current_index < len(self.video_urls):
             url = self.video_urls[self.current_index]
-            response = requests.get(url)
             filename = os.path.join(os.getcwd(), f"video_{self.current_index}.mp4")
-            with open(filename, 'wb') as file:
-                file.write(response.content)
+            stream_download(url, filename)
             print(f"视频已下载到: {filename}")
 
 if __name__ == "__main__":
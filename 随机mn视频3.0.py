@@ -1,7 +1,8 @@
 import tkinter as tk
 from tkinter import ttk
 import vlc
-import requests
+from mnvideo import network
+from mnvideo.download import stream_download
 import os
 
 class EnhancedVLCPlayer:
@@ -45,7 +46,7 @@ class EnhancedVLCPlayer:
 
     def fetch_video_urls(self):
         try:
-            resp = requests.get("https://api.kuleu.com/api/MP4_xiaojiejie?type=json", timeout=5)
+            resp = network.get("https://api.kuleu.com/api/MP4_xiaojiejie?type=json", timeout=5)
             resp.raise_for_status()
             video_url = resp.json().get('mp4_video')
             if video_url:
@@ -88,11 +89,8 @@ class EnhancedVLCPlayer:
         if 0 <= self.current_index < len(self.video_urls):
             url = self.video_urls[self.current_index]
             try:
-                resp = requests.get(url, timeout=10)
-                resp.raise_for_status()
                 filename = os.path.join(os.getcwd(), f"video_{self.current_index}.mp4")
-                with open(filename, 'wb') as f:
-                    f.write(resp.content)
+                stream_download(url, filename, timeout=10)
                 print(f"已下载: {filename}")
             except Exception as e:
                 print(f"下载失败: {e}")
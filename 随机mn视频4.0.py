@@ -1,7 +1,9 @@
 import tkinter as tk
 from tkinter import ttk
 import vlc
-import requests
+from mnvideo import network
+from mnvideo.download import stream_download, format_progress
+from mnvideo.scheduler import TickScheduler
 import os
 import threading
 import time
@@ -23,6 +25,10 @@ class EnhancedVLCPlayer:
         self.is_playing = False
         self.update_interval = 1000  # 更新间隔(ms)
         
+        # 下载状态（由下载线程写入，界面线程轮询显示）
+        self.download_thread = None
+        self.download_status = ""
+        
         # 创建视频显示区域
         self.video_frame = tk.Frame(root, bg='black')
         self.video_frame.pack(fill=tk.BOTH, expand=True)
@@ -37,6 +43,11 @@ class EnhancedVLCPlayer:
         # 状态栏
         self.create_status_bar()
         
+        # 进度条由同一个可取消的定时器驱动，只在播放时更新
+        self.scheduler = TickScheduler(self.root, active_interval=self.update_interval)
+        self.scheduler.register("progress", self.update_progress, active_only=True)
+        self.scheduler.start()
+        
         # 绑定播放结束事件
         self.player.event_manager().event_attach(vlc.EventType.MediaPlayerEndReached, self.on_video_end)
         
@@ -107,7 +118,7 @@ class EnhancedVLCPlayer:
         """获取API视频地址列表"""
         try:
             self.status_label.config(text="正在获取视频...")
-            response = requests.get("https://api.kuleu.com/api/MP4_xiaojiejie?type=json", timeout=10)
+            response = network.get("https://api.kuleu.com/api/MP4_xiaojiejie?type=json", timeout=10)
             response.raise_for_status()
             video_url = response.json().get('mp4_video', '')
             if video_url:
@@ -139,7 +150,7 @@ class EnhancedVLCPlayer:
                 self.status_label.config(text=f"正在播放第 {self.current_index + 1} 个视频")
                 
                 # 开始更新进度
-                self.update_progress()
+                self.scheduler.set_active(True)
             except Exception as e:
                 self.status_label.config(text=f"播放失败: {str(e)}")
     
@@ -152,11 +163,13 @@ class EnhancedVLCPlayer:
             self.player.play()
             self.status_label.config(text="继续播放")
         self.is_playing = not self.is_playing
+        self.scheduler.set_active(self.is_playing)
     
     def stop(self):
         """停止播放"""
         self.player.stop()
         self.is_playing = False
+        self.scheduler.set_active(False)
         self.progress_var.set(0)
         self.time_label.config(text="00:00 / 00:00")
         self.status_label.config(text="已停止")
@@ -191,26 +204,22 @@ class EnhancedVLCPlayer:
                 pass
     
     def update_progress(self):
-        """更新进度条和时间显示"""
-        if self.is_playing:
-            try:
-                length = self.player.get_length()
-                position = self.player.get_time()
-                
-                if length > 0 and position >= 0:
-                    # 更新进度条
-                    progress = (position / length) * 100
-                    self.progress_var.set(progress)
-                    
-                    # 更新时间显示
-                    current_time = self.format_time(position)
-                    total_time = self.format_time(length)
-                    self.time_label.config(text=f"{current_time} / {total_time}")
-            except:
-                pass
+        """更新进度条和时间显示（由调度器在播放时定期调用）"""
+        try:
+            length = self.player.get_length()
+            position = self.player.get_time()
             
-            # 继续更新
-            self.root.after(self.update_interval, self.update_progress)
+            if length > 0 and position >= 0:
+                # 更新进度条
+                progress = (position / length) * 100
+                self.progress_var.set(progress)
+                
+                # 更新时间显示
+                current_time = self.format_time(position)
+                total_time = self.format_time(length)
+                self.time_label.config(text=f"{current_time} / {total_time}")
+        except:
+            pass
     
     def format_time(self, ms):
         """格式化时间显示"""
@@ -234,27 +243,42 @@ class EnhancedVLCPlayer:
             self.root.after(100, self.next_video)
     
     def download_video(self):
-        """下载当前视频"""
+        """下载当前视频（在后台线程中分块下载）"""
+        if self.download_thread and self.download_thread.is_alive():
+            self.status_label.config(text="已有视频正在下载")
+            return
         if self.current_index >= 0 and self.current_index < len(self.video_urls):
             url = self.video_urls[self.current_index]
-            try:
-                self.status_label.config(text="正在下载视频...")
-                
-                # 创建下载目录
-                download_dir = "downloaded_videos"
-                if not os.path.exists(download_dir):
-                    os.makedirs(download_dir)
-                
-                response = requests.get(url, timeout=30)
-                response.raise_for_status()
-                
-                filename = os.path.join(download_dir, f"video_{self.current_index}.mp4")
-                with open(filename, 'wb') as file:
-                    file.write(response.content)
-                
-                self.status_label.config(text=f"视频已下载到: {filename}")
-            except Exception as e:
-                self.status_label.config(text=f"下载失败: {str(e)}")
+            
+            # 创建下载目录
+            download_dir = "downloaded_videos"
+            if not os.path.exists(download_dir):
+                os.makedirs(download_dir)
+            filename = os.path.join(download_dir, f"video_{self.current_index}.mp4")
+            
+            self.download_status = "正在下载视频..."
+            self.download_thread = threading.Thread(
+                target=self.download_worker, args=(url, filename), daemon=True
+            )
+            self.download_thread.start()
+            self.poll_download()
+    
+    def download_worker(self, url, filename):
+        """下载线程"""
+        def progress(done, total):
+            self.download_status = f"正在下载: {format_progress(done, total)}"
+        
+        try:
+            stream_download(url, filename, progress=progress)
+            self.download_status = f"视频已下载到: {filename}"
+        except Exception as e:
+            self.download_status = f"下载失败: {str(e)}"
+    
+    def poll_download(self):
+        """在状态栏显示下载进度"""
+        self.status_label.config(text=self.download_status)
+        if self.download_thread.is_alive():
+            self.root.after(200, self.poll_download)
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -1,21 +1,48 @@
+import time
+STARTED_AT = time.perf_counter()  # 启动计时的起点
+
+import argparse
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import vlc
-import requests
 import os
-import json
+import queue
 import threading
-import time
+import traceback
+from collections import OrderedDict
 from datetime import datetime
-import webbrowser
+
+from mnvideo import metrics
+from mnvideo.events import EventBridge
+from mnvideo.playlist_view import PlaylistView
+from mnvideo.preload import Preloader, PreloadSlot
+from mnvideo.scheduler import TickScheduler
+from mnvideo.startup import StartupTimer, lazy_import
+from mnvideo.virtual_list import VirtualTreeview
+
+# vlc 和网络、数据库相关的模块较重，窗口显示后第一次使用时才导入
+vlc = lazy_import("vlc")
+core = lazy_import("mnvideo.core")
+download = lazy_import("mnvideo.download")
+download_manager = lazy_import("mnvideo.download_manager")
+liveness = lazy_import("mnvideo.liveness")
+profiler = lazy_import("mnvideo.profiler")
+snapshot = lazy_import("mnvideo.snapshot")
+thumbnails = lazy_import("mnvideo.thumbnails")
+
+THUMBNAIL_HEIGHT = 54  # 缩略图高度(像素)，宽度按视频比例
+MAX_THUMBNAIL_IMAGES = 300  # 内存中保留的缩略图数量
+
+IMPORTED_AT = time.perf_counter()
 
 class AdvancedVLCPlayer:
-    def __init__(self, root):
+    def __init__(self, root, timer=None, metrics_path=None):
         self.root = root
-        self.instance = vlc.Instance()
-        self.player = self.instance.media_player_new()
-        self.video_urls = []  # 存储视频地址列表
-        self.current_index = -1  # 当前视频索引
+        self.timer = timer or StartupTimer(enabled=False)
+        self.metrics_path = metrics_path  # 定期写入性能统计的文件（.json 结尾时为 JSON 日志，否则为 Prometheus 文本格式）
+        self.timer.mark("导入模块", IMPORTED_AT)
+        self.instance = None  # VLC 在窗口显示后创建，见 create_players
+        self.player = None
+        self.preloader = None
         
         # 播放设置
         self.loop_single = tk.BooleanVar(value=False)  # 单视频循环
@@ -26,12 +53,47 @@ class AdvancedVLCPlayer:
         # 播放状态
         self.is_playing = False
         self.is_fullscreen = False
-        self.update_interval = 500  # 更新间隔(ms)
+        self.current_length = 0  # 当前视频时长(ms)，由VLC事件更新
+        self.current_time = 0  # 当前播放位置(ms)，由VLC事件更新
+        self.player_events = EventBridge()  # VLC回调线程 -> 界面线程
+        self.preload_depth = 1  # 在备用播放器上预先缓冲的视频数量
+        
+        # 获取、播放列表、缓存、下载和存储由界面无关的 PlayerCore 负责（命令行模式共用），
+        # 在后台线程中创建，创建好后立即开始预取；后台回调经 ui_queue 交回界面线程
+        self.ui_queue = queue.Queue()  # 工作线程交给界面线程执行的回调
+        self.pending_play = False  # 地址到达后是否自动播放
+        self.pending_fetches = 0  # 等待地址到达的刷新次数
+        self.autoplay_started = False
+        self.resume_position = 0  # 恢复会话后第一次播放时跳转到的位置(ms)
+        self.unverified_urls = set()  # 从上次会话恢复、还没有成功播放过的地址
+        self.skipped_count = 0  # 连续跳过的无法播放的视频数
+        self.last_snapshot = None
+        self.checking_playlist = False  # 是否在等待"检查失效链接"完成
+        self.rows_changed = False  # 有新的视频信息或缩略图，需要刷新播放列表
+        self.streaming = False  # 当前视频是否从网络播放（此时缩略图只用本地文件生成）
+        self.thumbnail_pipeline = None  # 第一次显示缩略图时创建
+        self.thumbnail_images = OrderedDict()  # 地址 -> PhotoImage，最近使用的在末尾
+        self.play_started_at = None  # 统计首帧耗时：play() 切换视频的时间
+        self.fetch_wait_started = None  # 统计等待预取地址的时间
+        self.buffering_started = None  # 统计缓冲的耗时
+        self.core = None
+        self.storage = None
+        self.cache = None
+        self.prefetcher = None
+        self.download_manager = None
+        self.created_core = None  # 后台线程创建的 PlayerCore（on_core_ready 执行前 self.core 还是None）
+        self.core_thread = threading.Thread(target=self.create_core, name="core-init", daemon=True)
+        self.core_thread.start()
         
-        # 播放历史
-        self.play_history = []
-        self.favorites = []
-        self.load_data()
+        # 批量获取（并发数和每秒请求数限制对API的压力）
+        self.batch_count = 20
+        self.batch_concurrency = 4
+        self.batch_rate = 2.0
+        self.batch_window = None
+        
+        self.downloads_window = None
+        self.metrics_window = None
+        self.profiler = None  # 正在运行的采样分析器
         
         # 创建界面
         self.create_menu()
@@ -43,9 +105,96 @@ class AdvancedVLCPlayer:
         # 绑定事件
         self.bind_events()
         
-        # 自动播放
+        # 周期任务（后台回调、进度条等）由同一个定时器驱动
+        self.scheduler = TickScheduler(self.root, on_error=self.on_task_error)
+        self.scheduler.register("ui_queue", self.process_ui_queue)
+        self.scheduler.register("player_events", self.process_player_events)
+        self.scheduler.register("session", self.save_session, interval=5000)  # 定期保存会话快照
+        self.scheduler.register("rows", self.refresh_rows, interval=500)  # 合并视频信息和缩略图的刷新
+        if self.metrics_path:
+            self.scheduler.register("metrics_export", self.export_metrics_file, interval=10000)
+        self.scheduler.start()
+        
+        # 窗口第一次绘制后再创建VLC播放器（窗口一直没有显示时最多等1秒）
+        self.video_frame.bind("<Expose>", self.on_first_paint, add="+")
+        self.root.after(1000, self.create_players)
+    
+    def create_core(self):
+        """创建 PlayerCore 并开始预取（在后台线程中执行）"""
+        try:
+            player_core = core.PlayerCore(
+                dispatch=self.call_in_ui,
+                cache_max_bytes=2 * 1024 ** 3,  # 缓存容量上限
+                prefetch_low=2,  # 就绪地址少于该值时开始补充
+                prefetch_high=5,  # 补充到该数量为止
+                on_prefetch_ready=self.on_prefetch_ready,
+                on_prefetch_error=self.on_prefetch_error,
+                on_download_update=self.on_download_update,
+                on_liveness=self.on_liveness,
+                on_metadata=self.on_metadata,
+                on_storage_error=self.on_storage_error
+            )
+        except Exception as e:
+            self.call_in_ui(self.status_label.config, {"text": f"初始化失败: {str(e)}"})
+            return
+        self.created_core = player_core
+        session = player_core.load_session()
+        # 先交给界面线程再开始预取，保证预取回调到达时 self.core 已经可用
+        self.call_in_ui(self.on_core_ready, player_core, session)
+        player_core.start()
+        self.timer.mark("开始获取视频")
+    
+    def on_core_ready(self, player_core, session=None):
+        """PlayerCore 已创建（界面线程），有上次的会话时恢复播放列表和播放位置"""
+        self.core = player_core
+        self.storage = player_core.storage
+        self.cache = player_core.cache
+        self.prefetcher = player_core.prefetcher
+        self.download_manager = player_core.download_manager
+        if session:
+            self.restore_session(session)
+        self.timer.mark("核心就绪")
+        self.start_autoplay()
+    
+    def restore_session(self, session):
+        """恢复上次的播放列表、当前视频、播放位置和设置"""
+        self.resume_position, settings = self.core.restore_session(session)
+        self.apply_settings(settings)
+        self.unverified_urls = set(self.video_urls)
+        self.on_playlist_changed()
+        self.core.check_playlist()
+        self.status_label.config(text=f"已恢复上次的播放列表（{len(self.video_urls)} 个视频）")
+    
+    def save_session(self, force=False):
+        """保存会话快照，和上次相比没有变化时跳过"""
+        if not self.core:
+            return
+        settings = self.playlist_settings()
+        snapshot = (len(self.video_urls), self.current_index, self.current_time // 1000, tuple(settings.values()))
+        if force or snapshot != self.last_snapshot:
+            self.last_snapshot = snapshot
+            self.core.save_session(self.current_time, settings)
+    
+    def on_first_paint(self, event):
+        """窗口第一次绘制完成"""
+        self.video_frame.unbind("<Expose>")
+        self.timer.mark("首次绘制")
+        self.root.after_idle(self.create_players)
+    
+    def is_ready(self):
+        """PlayerCore 和 VLC 播放器是否都已就绪，用户操作在此之前只提示稍候"""
+        if self.core and self.preloader:
+            return True
+        self.status_label.config(text="正在初始化，请稍候...")
+        return False
+    
+    def start_autoplay(self):
+        """核心和播放器都就绪后开始自动播放"""
+        if self.autoplay_started or not (self.core and self.preloader):
+            return
+        self.autoplay_started = True
         if self.auto_play.get():
-            self.root.after(1000, self.play)
+            self.play()
     
     def create_menu(self):
         """创建菜单栏"""
@@ -58,8 +207,9 @@ class AdvancedVLCPlayer:
         file_menu.add_command(label="打开本地视频", command=self.open_local_video)
         file_menu.add_command(label="保存播放列表", command=self.save_playlist)
         file_menu.add_command(label="加载播放列表", command=self.load_playlist)
+        file_menu.add_command(label="已保存的播放列表", command=self.show_saved_playlists)
         file_menu.add_separator()
-        file_menu.add_command(label="退出", command=self.root.quit)
+        file_menu.add_command(label="退出", command=self.on_close)
         
         # 播放菜单
         play_menu = tk.Menu(menubar, tearoff=0)
@@ -85,15 +235,46 @@ class AdvancedVLCPlayer:
         tools_menu.add_command(label="播放历史", command=self.show_history)
         tools_menu.add_command(label="收藏夹", command=self.show_favorites)
         tools_menu.add_command(label="下载管理", command=self.show_downloads)
+        tools_menu.add_command(label="下载整个播放列表", command=self.download_playlist)
+        tools_menu.add_separator()
+        tools_menu.add_command(label="检查失效链接", command=self.check_playlist)
+        tools_menu.add_command(label="移除失效视频", command=self.prune_dead)
+        tools_menu.add_command(label="批量获取视频", command=self.show_batch_fetch)
+        tools_menu.add_separator()
+        tools_menu.add_command(label="性能", command=self.show_metrics)
+        tools_menu.add_command(label="开始采样分析", command=self.toggle_profiler, accelerator="F9")
+        self.tools_menu = tools_menu
+        self.profiler_menu_index = tools_menu.index(tk.END)
     
     def create_video_frame(self):
         """创建视频显示区域"""
         self.video_frame = tk.Frame(self.root, bg='black')
         self.video_frame.pack(fill=tk.BOTH, expand=True)
         
-        # 获取窗口ID并绑定VLC
-        self.win_id = self.video_frame.winfo_id()
-        self.player.set_hwnd(self.win_id)
+        # 当前播放器和备用播放器各有一个叠放的显示区域，切换时提到最上层
+        self.video_views = []
+        for i in range(self.preload_depth + 1):
+            view = tk.Frame(self.video_frame, bg='black')
+            view.place(relx=0, rely=0, relwidth=1, relheight=1)
+            self.video_views.append(view)
+        self.video_views[0].lift()
+    
+    def create_players(self):
+        """导入VLC并为每个显示区域创建播放器（窗口显示后执行）"""
+        if self.preloader:
+            return
+        self.instance = vlc.Instance()
+        slots = []
+        for view in self.video_views:
+            player = self.instance.media_player_new()
+            # 获取窗口ID并绑定VLC
+            player.set_hwnd(view.winfo_id())
+            slots.append(PreloadSlot(player, view))
+        self.preloader = Preloader(self.instance, slots)
+        self.player = slots[0].player
+        self.bind_player_events()
+        self.timer.mark("VLC就绪")
+        self.start_autoplay()
     
     def create_controls(self):
         """创建控制面板"""
@@ -178,20 +359,28 @@ class AdvancedVLCPlayer:
     
     def create_playlist_panel(self):
         """创建播放列表面板"""
-        self.playlist_frame = ttk.Frame(self.root, width=300)
+        self.playlist_frame = ttk.Frame(self.root, width=460)
         self.playlist_frame.pack(side=tk.RIGHT, fill=tk.Y)
         
         ttk.Label(self.playlist_frame, text="播放列表", font=("Arial", 12, "bold")).pack(pady=5)
         
-        # 播放列表
-        self.playlist_tree = ttk.Treeview(self.playlist_frame, columns=("序号", "状态"), show="tree headings", height=15)
+        # 播放列表（只渲染可见的行）
+        columns = ("序号", "状态", "时长", "分辨率", "大小")
+        ttk.Style(self.root).configure("Thumbnails.Treeview", rowheight=THUMBNAIL_HEIGHT + 6)
+        self.playlist_tree = VirtualTreeview(self.playlist_frame, None, columns=columns, show="tree headings",
+                                             height=8, style="Thumbnails.Treeview")
         self.playlist_tree.heading("#0", text="视频")
-        self.playlist_tree.heading("序号", text="序号")
-        self.playlist_tree.heading("状态", text="状态")
-        self.playlist_tree.column("#0", width=200)
-        self.playlist_tree.column("序号", width=50)
-        self.playlist_tree.column("状态", width=50)
+        for column in columns:
+            self.playlist_tree.heading(column, text=column)
+        self.playlist_tree.column("#0", width=160)
+        self.playlist_tree.column("序号", width=45)
+        self.playlist_tree.column("状态", width=40)
+        self.playlist_tree.column("时长", width=55)
+        self.playlist_tree.column("分辨率", width=75)
+        self.playlist_tree.column("大小", width=65)
         self.playlist_tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.playlist_view = PlaylistView(self.playlist_tree, is_dead=self.is_dead_url, details=self.media_columns,
+                                          image=self.thumbnail_image)
         
         # 播放列表控制按钮
         playlist_controls = ttk.Frame(self.playlist_frame)
@@ -202,18 +391,60 @@ class AdvancedVLCPlayer:
     
     def bind_events(self):
         """绑定事件"""
+        # 关闭窗口前保存数据
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
         # 键盘快捷键
         self.root.bind("<space>", lambda e: self.pause())
         self.root.bind("<Left>", lambda e: self.prev_video())
         self.root.bind("<Right>", lambda e: self.next_video())
         self.root.bind("<F11>", lambda e: self.toggle_fullscreen())
         self.root.bind("<Escape>", lambda e: self.exit_fullscreen())
+        self.root.bind("<F9>", lambda e: self.toggle_profiler())
         
         # 播放列表双击事件
         self.playlist_tree.bind("<Double-1>", self.on_playlist_double_click)
-        
-        # 播放结束事件
-        self.player.event_manager().event_attach(vlc.EventType.MediaPlayerEndReached, self.on_video_end)
+    
+    def bind_player_events(self):
+        """绑定播放器事件"""
+        # 播放器事件（在VLC线程中触发，只记录到事件桥，由界面线程合并处理）
+        event_types = [
+            (vlc.EventType.MediaPlayerTimeChanged, "time", lambda e: e.u.new_time),
+            (vlc.EventType.MediaPlayerLengthChanged, "length", lambda e: e.u.new_length),
+            (vlc.EventType.MediaPlayerPlaying, "playing", None),
+            (vlc.EventType.MediaPlayerPaused, "paused", None),
+            (vlc.EventType.MediaPlayerBuffering, "buffering", lambda e: e.u.new_cache),
+            (vlc.EventType.MediaPlayerEncounteredError, "error", None),
+            (vlc.EventType.MediaPlayerEndReached, "end", None),
+            (vlc.EventType.MediaPlayerVout, "vout", lambda e: e.u.new_count),
+        ]
+        for slot in self.preloader.slots:
+            events = slot.player.event_manager()
+            for event_type, kind, get_value in event_types:
+                events.event_attach(event_type, self.make_event_handler(slot.player, kind, get_value))
+    
+    def make_event_handler(self, player, kind, get_value):
+        """生成VLC事件回调：只把当前播放器的事件和值放进事件桥，忽略备用播放器"""
+        first_frame = kind in ("vout", "time")  # 切换后第一个画面或播放时间事件视为首帧
+        def handler(event):
+            if player is self.preloader.active.player:
+                value = get_value(event) if get_value else None
+                if first_frame and self.play_started_at is not None:
+                    metrics.since("play.first_frame", self.play_started_at)
+                    self.play_started_at = None
+                elif kind == "buffering":
+                    self.track_buffering(value)
+                self.player_events.post(kind, value)
+        return handler
+    
+    def track_buffering(self, percent):
+        """统计缓冲的耗时（在VLC线程中调用，事件桥会合并缓冲事件，所以不在界面线程中统计）"""
+        if percent < 100:
+            if self.buffering_started is None:
+                self.buffering_started = metrics.now()
+        elif self.buffering_started is not None:
+            metrics.since("play.buffering", self.buffering_started)
+            self.buffering_started = None
     
     def create_tooltip(self, widget, text):
         """创建工具提示"""
@@ -233,50 +464,221 @@ class AdvancedVLCPlayer:
         
         widget.bind("<Enter>", show_tooltip)
     
+    @property
+    def video_urls(self):
+        """播放列表（保存在 PlayerCore 中，核心就绪前为空）"""
+        return self.core.video_urls if self.core else []
+    
+    @property
+    def current_index(self):
+        """当前视频索引"""
+        return self.core.current_index if self.core else -1
+    
+    @current_index.setter
+    def current_index(self, value):
+        self.core.current_index = value
+    
+    def call_in_ui(self, func, *args):
+        """在界面线程中执行回调（可在任意线程调用）"""
+        self.ui_queue.put((func, args))
+    
+    def process_ui_queue(self):
+        """执行工作线程交过来的回调"""
+        while True:
+            try:
+                func, args = self.ui_queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                func(*args)
+            except Exception as e:
+                traceback.print_exc()
+                self.status_label.config(text=f"后台任务出错: {str(e)}")
+    
+    def on_storage_error(self, action, error):
+        """导入或保存数据失败（界面线程，异常信息已输出到标准错误）"""
+        self.status_label.config(text=f"{action}: {str(error)}")
+    
+    def on_task_error(self, name, error):
+        """周期任务出错（异常信息已输出到标准错误）"""
+        self.status_label.config(text=f"界面任务 {name} 出错: {str(error)}")
+    
     def fetch_video_urls(self):
-        """获取API视频地址列表"""
-        try:
-            self.status_label.config(text="正在获取视频...")
-            response = requests.get("https://api.kuleu.com/api/MP4_xiaojiejie?type=json", timeout=10)
-            response.raise_for_status()
-            video_url = response.json().get('mp4_video', '')
-            if video_url:
-                self.video_urls.append(video_url)
-                self.update_playlist()
-                self.video_count_label.config(text=f"视频数量: {len(self.video_urls)}")
-                self.status_label.config(text="视频获取成功")
-                return True
-            else:
-                self.status_label.config(text="未获取到视频地址")
-                return False
-        except Exception as e:
-            self.status_label.config(text=f"获取视频失败: {str(e)}")
-            return False
+        """从预取队列中取出一个视频地址（不阻塞界面）"""
+        video_url = self.prefetcher.take() if self.prefetcher else None
+        if video_url:
+            metrics.inc("prefetch.hit")
+            self.append_video(video_url)
+            self.status_label.config(text="视频获取成功")
+            return True
+        metrics.inc("prefetch.miss")
+        self.status_label.config(text="正在获取视频...")
+        return False
     
-    def update_playlist(self):
-        """更新播放列表显示"""
-        # 清空现有项目
-        for item in self.playlist_tree.get_children():
-            self.playlist_tree.delete(item)
+    def append_video(self, url):
+        """把视频地址添加到播放列表末尾"""
+        self.core.append_video(url)
+        self.on_playlist_changed()
+    
+    def on_playlist_changed(self):
+        """播放列表内容变化后更新显示"""
+        self.update_playlist()
+        self.video_count_label.config(text=f"视频数量: {len(self.video_urls)}")
+    
+    def on_prefetch_ready(self, url):
+        """预取到新地址（界面线程）"""
+        while self.pending_fetches > 0 and self.fetch_video_urls():
+            self.pending_fetches -= 1
+        if self.pending_play:
+            self.pending_play = False
+            self.play()
+        elif self.is_playing:
+            self.preload_upcoming()
+    
+    def on_prefetch_error(self, error):
+        """预取失败（界面线程）"""
+        if self.pending_play or self.pending_fetches:
+            self.status_label.config(text=f"获取视频失败: {str(error)}，正在重试...")
+    
+    def show_batch_fetch(self):
+        """显示批量获取视频窗口"""
+        if not self.is_ready():
+            return
+        if self.batch_window and self.batch_window.winfo_exists():
+            self.batch_window.lift()
+            return
+        
+        self.batch_window = tk.Toplevel(self.root)
+        self.batch_window.title("批量获取视频")
+        self.batch_window.resizable(False, False)
+        
+        form = ttk.Frame(self.batch_window)
+        form.pack(fill=tk.X, padx=10, pady=10)
+        
+        count_var = tk.IntVar(value=self.batch_count)
+        concurrency_var = tk.IntVar(value=self.batch_concurrency)
+        rate_var = tk.DoubleVar(value=self.batch_rate)
+        fields = [
+            ("视频数量:", count_var, 1, 1000, 1),
+            ("并发请求数:", concurrency_var, 1, self.core.engine.per_host, 1),  # 超过连接池的上限也不会更快
+            ("每秒最多请求:", rate_var, 0.5, 20, 0.5)
+        ]
+        for row, (text, var, low, high, step) in enumerate(fields):
+            ttk.Label(form, text=text).grid(row=row, column=0, sticky=tk.W, pady=2)
+            ttk.Spinbox(form, from_=low, to=high, increment=step, textvariable=var, width=8).grid(
+                row=row, column=1, sticky=tk.W, padx=5, pady=2)
+        
+        self.batch_status_label = ttk.Label(self.batch_window, text="")
+        self.batch_status_label.pack(fill=tk.X, padx=10)
+        
+        def start():
+            try:
+                self.batch_count = count_var.get()
+                self.batch_concurrency = max(1, min(concurrency_var.get(), self.core.engine.per_host))
+                concurrency_var.set(self.batch_concurrency)
+                self.batch_rate = rate_var.get()
+                self.start_batch_fetch()
+            except (tk.TclError, ValueError) as e:
+                messagebox.showerror("错误", f"参数无效: {str(e)}")
+        
+        controls = ttk.Frame(self.batch_window)
+        controls.pack(fill=tk.X, padx=10, pady=10)
+        ttk.Button(controls, text="开始", command=start).pack(side=tk.LEFT, padx=2)
+        ttk.Button(controls, text="取消", command=self.cancel_batch_fetch).pack(side=tk.LEFT, padx=2)
         
-        # 添加视频项目
-        for i, url in enumerate(self.video_urls):
-            status = "▶" if i == self.current_index else "⏸"
-            self.playlist_tree.insert("", "end", text=f"视频 {i+1}", values=(i+1, status))
+        self.refresh_batch_status()
+    
+    def start_batch_fetch(self):
+        """并发获取 batch_count 个视频，结果到达后依次加入播放列表"""
+        fetcher = self.core.fetch_batch(
+            self.batch_count,
+            concurrency=self.batch_concurrency,
+            rate=self.batch_rate,
+            on_result=self.on_batch_result,
+            on_done=self.on_batch_done
+        )
+        if fetcher is None:
+            self.status_label.config(text="批量获取正在进行中")
+            return
+        self.scheduler.register("batch", self.refresh_batch_status, 500)
+        self.refresh_batch_status()
+    
+    def cancel_batch_fetch(self):
+        """取消批量获取"""
+        if self.core.batch_fetcher:
+            self.core.batch_fetcher.cancel()
+    
+    def on_batch_result(self, url):
+        """批量获取到一个新视频，已由 PlayerCore 加入播放列表（界面线程）"""
+        self.on_playlist_changed()
+        if self.pending_play:
+            self.pending_play = False
+            self.play()
+    
+    def on_batch_done(self, fetcher):
+        """批量获取结束（界面线程）"""
+        self.scheduler.unregister("batch")
+        self.refresh_batch_status()
+    
+    def refresh_batch_status(self):
+        """在状态栏和批量获取窗口中显示进度、吞吐量和失败次数"""
+        fetcher = self.core.batch_fetcher
+        if fetcher is None:
+            text = ""
+        elif fetcher.finished:
+            text = f"批量获取{'已取消' if fetcher.cancelled else '完成'}: {fetcher.summary()}"
+        else:
+            text = f"批量获取中: {fetcher.summary()}"
+        if text:
+            self.status_label.config(text=text)
+        if self.batch_window and self.batch_window.winfo_exists():
+            self.batch_status_label.config(text=text)
+    
+    def update_playlist(self):
+        """更新播放列表显示（增量更新）"""
+        with metrics.timer("ui.update_playlist"):
+            self.playlist_view.sync(self.video_urls, self.current_index)
     
     def play(self):
         """播放当前视频"""
         if self.current_index == -1 or self.current_index >= len(self.video_urls):
             if not self.fetch_video_urls():
+                # 预取队列暂时为空，地址到达后自动播放
+                self.pending_play = True
+                if self.fetch_wait_started is None:
+                    self.fetch_wait_started = metrics.now()
                 return
-            self.current_index = 0
+            self.current_index = len(self.video_urls) - 1
+        metrics.since("fetch.wait", self.fetch_wait_started)
+        self.fetch_wait_started = None
         
         if self.video_urls:
             try:
                 url = self.video_urls[self.current_index]
-                media = self.instance.media_new(url)
-                self.player.set_media(media)
-                self.player.play()
+                self.core.shuffle.visit(self.current_index)  # 记入随机播放的历史
+                self.player_events.clear()
+                
+                # 恢复会话后的第一次播放直接从上次的位置开始
+                options = ()
+                if self.resume_position > 0:
+                    options = (f":start-time={self.resume_position / 1000:.3f}",)
+                
+                # 已在备用播放器上缓冲时直接切换过去，已缓存时播放本地文件
+                started = metrics.now()
+                source = self.cache.lookup(url) or url
+                self.streaming = source.startswith(("http://", "https://"))
+                slot, preloaded = self.preloader.activate(source, options)
+                metrics.since("play.start", started)
+                metrics.inc("play.preloaded" if preloaded else "play.cold")
+                if source != url:
+                    metrics.inc("play.cache_hit")
+                self.play_started_at = started
+                self.buffering_started = None
+                self.player = slot.player
+                slot.view.lift()
+                self.current_length = max(0, self.player.get_length()) if preloaded else 0
+                self.current_time = self.resume_position
+                self.resume_position = 0
                 self.is_playing = True
                 
                 # 设置音量
@@ -293,12 +695,14 @@ class AdvancedVLCPlayer:
                 self.update_playlist()
                 
                 # 开始更新进度
-                self.update_progress()
+                self.scheduler.set_active(True)
             except Exception as e:
                 self.status_label.config(text=f"播放失败: {str(e)}")
     
     def pause(self):
         """暂停/继续"""
+        if not self.is_ready():
+            return
         if self.is_playing:
             self.player.pause()
             self.status_label.config(text="已暂停")
@@ -306,52 +710,116 @@ class AdvancedVLCPlayer:
             self.player.play()
             self.status_label.config(text="继续播放")
         self.is_playing = not self.is_playing
+        self.scheduler.set_active(self.is_playing)
         self.update_playlist()
     
     def stop(self):
         """停止播放"""
+        if not self.is_ready():
+            return
         self.player.stop()
         self.is_playing = False
+        self.scheduler.set_active(False)
         self.progress_var.set(0)
         self.time_label.config(text="00:00 / 00:00")
         self.status_label.config(text="已停止")
         self.update_playlist()
     
     def prev_video(self):
-        """播放上一个视频"""
-        if self.current_index > 0:
+        """播放上一个视频（随机播放时按实际播放顺序后退）"""
+        if not self.is_ready():
+            return
+        if self.shuffle_mode.get():
+            index = self.core.shuffle.prev()
+            if index >= 0:
+                self.current_index = index
+                self.play()
+            else:
+                self.status_label.config(text="已经是第一个视频")
+        elif self.current_index > 0:
             self.current_index -= 1
             self.play()
         else:
             self.status_label.config(text="已经是第一个视频")
     
+    def upcoming_urls(self):
+        """接下来会顺序播放的视频地址（用于预加载）"""
+        if self.loop_single.get():
+            return []
+        if self.shuffle_mode.get():
+            # 随机播放的顺序是提前抽好的，可以同样预加载
+            indices = self.core.shuffle.peek(self.preload_depth, skip=self.is_dead_index)
+            return [self.video_urls[index] for index in indices]
+        urls = []
+        index = self.current_index
+        for _ in range(self.preload_depth):
+            index = self.next_alive_index(index + 1)
+            if index >= len(self.video_urls):
+                if self.loop_playlist.get():
+                    break  # 列表中其余的视频都已失效
+                # 不循环时下一个是新视频，先从预取队列中取出地址
+                video_url = self.prefetcher.take()
+                if not video_url:
+                    break
+                self.append_video(video_url)
+            urls.append(self.video_urls[index])
+        return urls
+    
+    def next_alive_index(self, index):
+        """从 index 开始第一个不是已知失效的序号，到末尾时按循环设置回到开头，没有时返回列表长度"""
+        count = len(self.video_urls)
+        for _ in range(count):
+            if index >= count:
+                if not self.loop_playlist.get():
+                    break
+                index = 0
+            if not self.is_dead_url(self.video_urls[index]):
+                return index
+            index += 1
+        return count
+    
+    def preload_upcoming(self):
+        """在备用播放器上缓冲接下来的视频"""
+        try:
+            upcoming = self.upcoming_urls()
+            # 顺便确认接下来的地址没有过期（结果有缓存，不会重复探测），并优先获取它们的信息
+            self.core.check_playlist(upcoming)
+            self.core.request_metadata(upcoming, urgent=True)
+            self.preloader.preload([self.cache.lookup(url) or url for url in upcoming])
+            for url in upcoming:
+                self.cache.request(url)
+        except Exception as e:
+            self.status_label.config(text=f"预加载失败: {str(e)}")
+    
     def next_video(self):
         """播放下一个视频"""
+        if not self.is_ready():
+            return
         if self.shuffle_mode.get():
-            # 随机播放
-            import random
+            # 随机播放：每轮每个视频播放一次，最近播放过的不会重复
             if len(self.video_urls) > 1:
-                new_index = random.randint(0, len(self.video_urls) - 1)
-                while new_index == self.current_index and len(self.video_urls) > 1:
-                    new_index = random.randint(0, len(self.video_urls) - 1)
-                self.current_index = new_index
+                index = self.core.shuffle.next(skip=self.is_dead_index)
+                self.current_index = index if index >= 0 else len(self.video_urls)
             else:
                 self.current_index += 1
         else:
-            self.current_index += 1
+            self.current_index = self.next_alive_index(self.current_index + 1)
         
         if self.current_index >= len(self.video_urls):
-            if self.loop_playlist.get():
-                self.current_index = 0  # 循环到第一个
+            # 循环时回到第一个可以播放的视频，全部已知失效或不循环时获取新视频
+            index = self.next_alive_index(0) if self.loop_playlist.get() else len(self.video_urls)
+            if index < len(self.video_urls):
+                self.current_index = index
             else:
-                self.fetch_video_urls()  # 获取新视频
+                self.current_index = len(self.video_urls)
+                self.fetch_video_urls()
         self.play()
     
     def seek_video(self, value):
         """跳转到指定位置"""
         if self.is_playing:
             try:
-                length = self.player.get_length()
+                length = self.current_length
                 if length > 0:
                     position = int((float(value) / 100) * length)
                     self.player.set_time(position)
@@ -366,27 +834,80 @@ class AdvancedVLCPlayer:
         except:
             pass
     
+    def process_player_events(self):
+        """处理合并后的VLC事件（每个调度周期最多一次）"""
+        events = self.player_events.drain()
+        if not events:
+            return
+        with metrics.timer("ui.player_events"):
+            self.handle_player_events(events)
+    
+    def handle_player_events(self, events):
+        """按顺序处理一批VLC事件"""
+        progress_changed = False
+        for kind, value in events:
+            if kind == "time":
+                self.current_time = value
+                progress_changed = True
+            elif kind == "length":
+                self.current_length = value
+                progress_changed = True
+            elif kind == "playing":
+                self.is_playing = True
+                self.skipped_count = 0
+                if 0 <= self.current_index < len(self.video_urls):
+                    self.unverified_urls.discard(self.video_urls[self.current_index])
+                self.scheduler.set_active(True)
+                self.status_label.config(text=f"正在播放第 {self.current_index + 1} 个视频")
+                # 当前视频开始播放后再缓存和预加载，避免和它争抢带宽
+                if 0 <= self.current_index < len(self.video_urls):
+                    self.cache.request(self.video_urls[self.current_index])
+                self.preload_upcoming()
+            elif kind == "paused":
+                self.is_playing = False
+                self.scheduler.set_active(False)
+                self.status_label.config(text="已暂停")
+            elif kind == "buffering":
+                if value < 100:
+                    self.status_label.config(text=f"缓冲中... {value:.0f}%")
+                elif self.is_playing:
+                    self.status_label.config(text=f"正在播放第 {self.current_index + 1} 个视频")
+            elif kind == "error":
+                self.is_playing = False
+                self.scheduler.set_active(False)
+                self.status_label.config(text=f"播放失败: 第 {self.current_index + 1} 个视频无法播放")
+                if 0 <= self.current_index < len(self.video_urls):
+                    # 记为失效，之后的顺序和随机播放都会跳过它
+                    self.core.mark_dead(self.video_urls[self.current_index])
+                    self.playlist_view.refresh_visible()
+                self.skip_unverified()
+            elif kind == "end":
+                self.on_video_end()
+            elif kind == "vout":
+                if value:
+                    self.timer.mark("首帧")
+                    self.timer.print_report()
+        
+        if progress_changed:
+            self.update_progress()
+    
     def update_progress(self):
-        """更新进度条和时间显示"""
-        if self.is_playing:
-            try:
-                length = self.player.get_length()
-                position = self.player.get_time()
-                
-                if length > 0 and position >= 0:
-                    # 更新进度条
-                    progress = (position / length) * 100
-                    self.progress_var.set(progress)
-                    
-                    # 更新时间显示
-                    current_time = self.format_time(position)
-                    total_time = self.format_time(length)
-                    self.time_label.config(text=f"{current_time} / {total_time}")
-            except:
-                pass
+        """根据VLC事件报告的时间更新进度条和时间显示"""
+        try:
+            length = self.current_length
+            position = self.current_time
             
-            # 继续更新
-            self.root.after(self.update_interval, self.update_progress)
+            if length > 0 and position >= 0:
+                # 更新进度条
+                progress = (position / length) * 100
+                self.progress_var.set(progress)
+                
+                # 更新时间显示
+                current_time = self.format_time(position)
+                total_time = self.format_time(length)
+                self.time_label.config(text=f"{current_time} / {total_time}")
+        except:
+            pass
     
     def format_time(self, ms):
         """格式化时间显示"""
@@ -397,27 +918,152 @@ class AdvancedVLCPlayer:
         seconds = seconds % 60
         return f"{minutes:02d}:{seconds:02d}"
     
-    def on_video_end(self, event):
-        """视频播放结束事件处理"""
+    def skip_unverified(self):
+        """恢复的地址已失效时跳到下一个（失效的视频已被标记，全部失效时会获取新视频）"""
+        if not 0 <= self.current_index < len(self.video_urls):
+            return
+        url = self.video_urls[self.current_index]
+        if url not in self.unverified_urls or self.skipped_count >= len(self.video_urls):
+            return
+        self.unverified_urls.discard(url)
+        self.skipped_count += 1
+        self.status_label.config(text=f"第 {self.current_index + 1} 个视频已失效，跳过")
+        self.next_video()
+    
+    def is_dead_url(self, url):
+        """地址是否已被探测为失效"""
+        return bool(self.core) and self.core.is_dead(url)
+    
+    def media_columns(self, url):
+        """播放列表中时长、分辨率和大小三列的内容"""
+        info = self.core.media_info(url) if self.core else None
+        if info is None:
+            return ("", "", "")
+        duration = self.format_time(int(info['duration'] * 1000)) if 'duration' in info else "-"
+        resolution = f"{info['width']}x{info['height']}" if 'width' in info else "-"
+        size = download.format_size(info['size']) if 'size' in info else "-"
+        return (duration, resolution, size)
+    
+    def on_metadata(self, url, info):
+        """得到了视频信息（界面线程），由 refresh_rows 合并刷新"""
+        self.rows_changed = True
+    
+    def refresh_rows(self):
+        if self.rows_changed:
+            self.rows_changed = False
+            with metrics.timer("ui.refresh_rows"):
+                self.playlist_view.refresh_visible()
+    
+    def get_thumbnail_pipeline(self):
+        """缩略图生成器（第一次使用时创建）"""
+        if self.thumbnail_pipeline is None:
+            grabber = snapshot.FrameGrabber()
+            self.thumbnail_pipeline = thumbnails.ThumbnailPipeline(
+                thumbnails.ThumbnailCache(self.core.path("thumbnails")),
+                lambda source, url: self.grab_thumbnail(grabber, source, url),
+                key_func=self.core.content_key,  # 相同内容的视频共用缩略图
+                local_source=self.core.local_copy,
+                # 播放网络视频时不从网络读取，避免和播放争抢带宽
+                can_use_network=lambda: not (self.is_playing and self.streaming),
+                on_ready=lambda url, path: self.call_in_ui(self.on_thumbnail, url, path)
+            )
+        return self.thumbnail_pipeline
+    
+    def grab_thumbnail(self, grabber, source, url):
+        """截取视频 10% 处（最多30秒）的一帧，宽度按视频比例（在缩略图线程中执行）"""
+        info = self.core.media_info(url) or {}
+        width = THUMBNAIL_HEIGHT * 16 // 9
+        if info.get('width') and info.get('height'):
+            width = max(THUMBNAIL_HEIGHT // 2, min(THUMBNAIL_HEIGHT * 2, THUMBNAIL_HEIGHT * info['width'] // info['height']))
+        start = min(info['duration'] * 0.1, 30) if info.get('duration') else 3
+        return grabber.grab(source, width, THUMBNAIL_HEIGHT, start)
+    
+    def thumbnail_image(self, url):
+        """播放列表中显示的缩略图，只在行可见时调用；还没有时在后台生成并返回空字符串"""
+        if not self.core:
+            return ""
+        image = self.thumbnail_images.get(url)
+        if image is not None:
+            self.thumbnail_images.move_to_end(url)
+            return image
+        path = self.get_thumbnail_pipeline().request(url)
+        if not path:
+            return ""
+        image = self.load_image(path)
+        if image:
+            self.thumbnail_images[url] = image
+            while len(self.thumbnail_images) > MAX_THUMBNAIL_IMAGES:
+                self.thumbnail_images.popitem(last=False)
+        return image
+    
+    def cached_thumbnail(self, url):
+        """已生成的缩略图（不会开始生成），没有时返回空字符串"""
+        image = self.thumbnail_images.get(url)
+        if image is None and self.core:
+            path = self.get_thumbnail_pipeline().lookup(url)
+            image = self.load_image(path) if path else ""
+        return image or ""
+    
+    def load_image(self, path):
+        try:
+            return tk.PhotoImage(file=path)
+        except tk.TclError:
+            return ""
+    
+    def on_thumbnail(self, url, path):
+        """缩略图生成完成（界面线程）"""
+        self.rows_changed = True
+    
+    def is_dead_index(self, index):
+        return self.is_dead_url(self.video_urls[index])
+    
+    def on_liveness(self, url, state):
+        """地址探测完成（界面线程）"""
+        if state == liveness.DEAD:
+            self.playlist_view.refresh_visible()
+        if self.checking_playlist and not self.core.liveness.pending():
+            self.checking_playlist = False
+            dead = sum(1 for video_url in self.video_urls if self.is_dead_url(video_url))
+            self.status_label.config(text=f"检查完成：{dead} 个视频已失效")
+    
+    def check_playlist(self):
+        """检查播放列表中所有地址是否已失效"""
+        if not self.core:
+            return
+        self.checking_playlist = True
+        started = self.core.check_playlist()
+        self.status_label.config(text=f"正在检查 {started} 个视频地址...")
+        if not self.core.liveness.pending():
+            self.on_liveness(None, None)  # 结果都已缓存
+    
+    def prune_dead(self):
+        """从播放列表中移除已知失效的视频"""
+        if not self.core:
+            return
+        removed = self.core.prune_dead()
+        self.on_playlist_changed()
+        self.status_label.config(text=f"已移除 {removed} 个失效视频")
+    
+    def on_video_end(self):
+        """视频播放结束事件处理（界面线程）"""
         if self.loop_single.get():
             # 单视频循环
-            self.root.after(100, self.play)
+            self.play()
         elif self.loop_playlist.get():
             # 播放列表循环
-            self.root.after(100, self.next_video)
+            self.next_video()
         else:
             # 自动播放下一个
-            self.root.after(100, self.next_video)
+            self.next_video()
     
     def on_playlist_double_click(self, event):
         """播放列表双击事件"""
-        selection = self.playlist_tree.selection()
-        if selection:
-            item = self.playlist_tree.item(selection[0])
-            index = int(item['values'][0]) - 1
-            if 0 <= index < len(self.video_urls):
-                self.current_index = index
-                self.play()
+        if not self.is_ready():
+            return
+        index = self.playlist_tree.selected_index()
+        if 0 <= index < len(self.video_urls):
+            self.current_index = index
+            self.play()
     
     def toggle_fullscreen(self):
         """切换全屏"""
@@ -441,65 +1087,173 @@ class AdvancedVLCPlayer:
     
     def add_to_history(self, url):
         """添加到播放历史"""
-        history_item = {
-            'url': url,
-            'timestamp': datetime.now().isoformat(),
-            'index': self.current_index
-        }
-        self.play_history.append(history_item)
-        
-        # 限制历史记录数量
-        if len(self.play_history) > 100:
-            self.play_history = self.play_history[-100:]
-        
-        self.save_data()
+        self.core.add_history(url, self.current_index)
     
     def add_to_favorites(self):
         """添加到收藏夹"""
+        if not self.is_ready():
+            return
         if self.current_index >= 0 and self.current_index < len(self.video_urls):
-            url = self.video_urls[self.current_index]
-            if url not in self.favorites:
-                self.favorites.append(url)
-                self.save_data()
+            if self.core.add_favorite(self.video_urls[self.current_index]):
                 self.status_label.config(text="已添加到收藏夹")
             else:
                 self.status_label.config(text="已在收藏夹中")
     
     def show_history(self):
         """显示播放历史"""
+        if not self.is_ready():
+            return
         history_window = tk.Toplevel(self.root)
         history_window.title("播放历史")
         history_window.geometry("600x400")
         
-        tree = ttk.Treeview(history_window, columns=("时间", "序号"), show="tree headings")
+        # 查询方式
+        mode = tk.StringVar(value="recent")
+        mode_frame = ttk.Frame(history_window)
+        mode_frame.pack(fill=tk.X, padx=10, pady=(10, 0))
+        
+        tree = ttk.Treeview(history_window, columns=("时间", "序号", "次数"), show="tree headings",
+                            style="Thumbnails.Treeview")
+        tree.images = []  # 保持缩略图的引用
         tree.heading("#0", text="视频")
         tree.heading("时间", text="播放时间")
         tree.heading("序号", text="序号")
+        tree.heading("次数", text="播放次数")
+        tree.column("序号", width=60)
+        tree.column("次数", width=80)
+        
+        def format_timestamp(played_at):
+            return datetime.fromtimestamp(played_at).strftime("%Y-%m-%d %H:%M:%S")
         
-        for item in reversed(self.play_history):
-            tree.insert("", "end", text=f"视频 {item['index']+1}", 
-                       values=(item['timestamp'][:19], item['index']+1))
+        def thumbnail(url):
+            # 只显示已经生成的缩略图
+            image = self.cached_thumbnail(url)
+            if image:
+                tree.images.append(image)
+            return image
         
+        def fill():
+            tree.delete(*tree.get_children())
+            tree.images.clear()
+            if mode.get() == "most_played":
+                for url, plays, last_played in self.storage.most_played():
+                    tree.insert("", "end", text=url.rsplit('/', 1)[-1], image=thumbnail(url),
+                               values=(format_timestamp(last_played), "", plays))
+                return
+            if mode.get() == "last_hour":
+                rows = self.storage.played_since(time.time() - 3600)
+            else:
+                rows = self.storage.recent_history()
+            for url, played_at, index in rows:
+                tree.insert("", "end", text=f"视频 {index+1}", image=thumbnail(url),
+                           values=(format_timestamp(played_at), index+1, ""))
+        
+        for text, value in (("最近播放", "recent"), ("最近一小时", "last_hour"), ("最常播放", "most_played")):
+            ttk.Radiobutton(mode_frame, text=text, variable=mode, value=value, command=fill).pack(side=tk.LEFT, padx=5)
+        ttk.Label(mode_frame, text=f"共 {self.storage.history_count()} 条记录").pack(side=tk.RIGHT, padx=5)
+        
+        fill()
         tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
     
     def show_favorites(self):
         """显示收藏夹"""
+        if not self.is_ready():
+            return
         favorites_window = tk.Toplevel(self.root)
         favorites_window.title("收藏夹")
         favorites_window.geometry("600x400")
         
-        tree = ttk.Treeview(favorites_window, columns=("序号",), show="tree headings")
+        tree = ttk.Treeview(favorites_window, columns=("序号",), show="tree headings", style="Thumbnails.Treeview")
         tree.heading("#0", text="视频")
         tree.heading("序号", text="序号")
+        tree.images = []  # 保持缩略图的引用
         
-        for i, url in enumerate(self.favorites):
-            tree.insert("", "end", text=f"收藏视频 {i+1}", values=(i+1,))
+        for i, url in enumerate(self.storage.favorites()):
+            image = self.cached_thumbnail(url)
+            if image:
+                tree.images.append(image)
+            tree.insert("", "end", text=f"收藏视频 {i+1}", image=image, values=(i+1,))
         
         tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
     
     def show_downloads(self):
         """显示下载管理"""
-        download_dir = "downloaded_videos"
+        if not self.is_ready():
+            return
+        if self.downloads_window and self.downloads_window.winfo_exists():
+            self.downloads_window.lift()
+            return
+        
+        self.downloads_window = tk.Toplevel(self.root)
+        self.downloads_window.title("下载管理")
+        self.downloads_window.geometry("700x400")
+        
+        controls = ttk.Frame(self.downloads_window)
+        controls.pack(fill=tk.X, side=tk.BOTTOM, padx=10, pady=5)
+        
+        buttons = [
+            ("暂停", lambda: self.apply_to_selected_downloads(self.download_manager.pause)),
+            ("继续", lambda: self.apply_to_selected_downloads(self.download_manager.resume)),
+            ("移除", lambda: self.apply_to_selected_downloads(self.download_manager.remove)),
+            ("下载整个播放列表", self.download_playlist),
+            ("打开文件夹", self.open_download_folder)
+        ]
+        for text, cmd in buttons:
+            ttk.Button(controls, text=text, command=cmd).pack(side=tk.LEFT, padx=2)
+        
+        self.download_speed_label = ttk.Label(controls, text="")
+        self.download_speed_label.pack(side=tk.RIGHT, padx=5)
+        
+        self.downloads_tree = ttk.Treeview(self.downloads_window, columns=("状态", "进度", "速度"), show="tree headings")
+        self.downloads_tree.heading("#0", text="文件")
+        self.downloads_tree.heading("状态", text="状态")
+        self.downloads_tree.heading("进度", text="进度")
+        self.downloads_tree.heading("速度", text="速度")
+        self.downloads_tree.column("#0", width=260)
+        self.downloads_tree.column("状态", width=70)
+        self.downloads_tree.column("进度", width=200)
+        self.downloads_tree.column("速度", width=90)
+        self.downloads_tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        self.refresh_downloads()
+        self.scheduler.register("downloads", self.refresh_downloads, 500)
+    
+    def refresh_downloads(self):
+        """刷新下载管理窗口"""
+        if not (self.downloads_window and self.downloads_window.winfo_exists()):
+            self.scheduler.unregister("downloads")
+            return
+        
+        jobs = self.download_manager.snapshot()
+        job_ids = {str(job.id) for job in jobs}
+        for item in self.downloads_tree.get_children():
+            if item not in job_ids:
+                self.downloads_tree.delete(item)
+        
+        for job in jobs:
+            speed = f"{download.format_size(job.speed)}/s" if job.state == download_manager.RUNNING else ""
+            if job.state == download_manager.FAILED:
+                progress = job.error
+            else:
+                progress = download.format_progress(job.done, job.total)
+            values = (download_manager.STATE_LABELS[job.state], progress, speed)
+            if self.downloads_tree.exists(str(job.id)):
+                self.downloads_tree.item(str(job.id), values=values)
+            else:
+                self.downloads_tree.insert("", "end", iid=str(job.id), text=job.filename, values=values)
+        
+        self.download_speed_label.config(text=f"总速度: {download.format_size(self.download_manager.total_speed())}/s")
+    
+    def apply_to_selected_downloads(self, action):
+        """对选中的下载任务执行操作"""
+        selected = set(self.downloads_tree.selection())
+        for job in self.download_manager.snapshot():
+            if str(job.id) in selected:
+                action(job)
+    
+    def open_download_folder(self):
+        """打开下载目录"""
+        download_dir = self.download_manager.download_dir
         if os.path.exists(download_dir):
             os.startfile(download_dir)
         else:
@@ -507,125 +1261,265 @@ class AdvancedVLCPlayer:
     
     def open_local_video(self):
         """打开本地视频"""
+        if not self.is_ready():
+            return
         file_path = filedialog.askopenfilename(
             title="选择视频文件",
             filetypes=[("视频文件", "*.mp4 *.avi *.mkv *.mov *.wmv"), ("所有文件", "*.*")]
         )
         if file_path:
-            self.video_urls.append(file_path)
-            self.update_playlist()
+            self.append_video(file_path)
             if self.current_index == -1:
                 self.current_index = 0
                 self.play()
     
     def save_playlist(self):
         """保存播放列表"""
+        if not self.is_ready():
+            return
         file_path = filedialog.asksaveasfilename(
             title="保存播放列表",
             defaultextension=".json",
             filetypes=[("JSON文件", "*.json"), ("所有文件", "*.*")]
         )
         if file_path:
-            playlist_data = {
-                'videos': self.video_urls,
-                'current_index': self.current_index,
-                'settings': {
-                    'loop_single': self.loop_single.get(),
-                    'loop_playlist': self.loop_playlist.get(),
-                    'auto_play': self.auto_play.get(),
-                    'shuffle_mode': self.shuffle_mode.get()
-                }
-            }
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(playlist_data, f, ensure_ascii=False, indent=2)
+            self.core.save_playlist_file(file_path, self.playlist_settings())
             messagebox.showinfo("成功", "播放列表已保存")
     
+    def playlist_settings(self):
+        """随播放列表和会话一起保存的播放设置"""
+        return {
+            'loop_single': self.loop_single.get(),
+            'loop_playlist': self.loop_playlist.get(),
+            'auto_play': self.auto_play.get(),
+            'shuffle_mode': self.shuffle_mode.get()
+        }
+    
+    def apply_settings(self, settings):
+        """应用保存的播放设置"""
+        self.loop_single.set(settings.get('loop_single', False))
+        self.loop_playlist.set(settings.get('loop_playlist', True))
+        self.auto_play.set(settings.get('auto_play', True))
+        self.shuffle_mode.set(settings.get('shuffle_mode', False))
+    
     def load_playlist(self):
         """加载播放列表"""
+        if not self.is_ready():
+            return
         file_path = filedialog.askopenfilename(
             title="加载播放列表",
             filetypes=[("JSON文件", "*.json"), ("所有文件", "*.*")]
         )
         if file_path:
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    playlist_data = json.load(f)
-                
-                self.video_urls = playlist_data.get('videos', [])
-                self.current_index = playlist_data.get('current_index', -1)
-                
-                settings = playlist_data.get('settings', {})
-                self.loop_single.set(settings.get('loop_single', False))
-                self.loop_playlist.set(settings.get('loop_playlist', True))
-                self.auto_play.set(settings.get('auto_play', True))
-                self.shuffle_mode.set(settings.get('shuffle_mode', False))
-                
-                self.update_playlist()
-                self.video_count_label.config(text=f"视频数量: {len(self.video_urls)}")
+                self.apply_playlist_data(self.core.load_playlist_file(file_path))
                 messagebox.showinfo("成功", "播放列表已加载")
             except Exception as e:
                 messagebox.showerror("错误", f"加载播放列表失败: {str(e)}")
     
+    def apply_playlist_data(self, playlist_data):
+        """使用播放列表数据替换当前列表和设置"""
+        self.apply_settings(self.core.apply_playlist_data(playlist_data))
+        self.on_playlist_changed()
+        self.core.check_playlist()
+    
+    def show_saved_playlists(self):
+        """显示数据库中保存的播放列表，双击加载"""
+        if not self.is_ready():
+            return
+        playlists_window = tk.Toplevel(self.root)
+        playlists_window.title("已保存的播放列表")
+        playlists_window.geometry("400x300")
+        
+        listbox = tk.Listbox(playlists_window)
+        for name in self.storage.playlist_names():
+            listbox.insert(tk.END, name)
+        listbox.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        def on_double_click(event):
+            selection = listbox.curselection()
+            if selection:
+                playlist_data = self.storage.load_playlist(listbox.get(selection[0]))
+                if playlist_data:
+                    self.apply_playlist_data(playlist_data)
+                    self.status_label.config(text="播放列表已加载")
+                playlists_window.destroy()
+        
+        listbox.bind("<Double-1>", on_double_click)
+    
     def clear_playlist(self):
         """清空播放列表"""
+        if not self.is_ready():
+            return
         if messagebox.askyesno("确认", "确定要清空播放列表吗？"):
-            self.video_urls.clear()
-            self.current_index = -1
-            self.update_playlist()
-            self.video_count_label.config(text="视频数量: 0")
+            self.core.clear_playlist()
+            self.on_playlist_changed()
             self.status_label.config(text="播放列表已清空")
     
     def refresh_videos(self):
         """刷新视频列表"""
-        self.fetch_video_urls()
+        if not self.fetch_video_urls():
+            self.pending_fetches += 1
     
-    def load_data(self):
-        """加载数据"""
+    def show_metrics(self):
+        """显示性能统计窗口（每秒刷新）"""
+        if self.metrics_window and self.metrics_window.winfo_exists():
+            self.metrics_window.lift()
+            return
+        self.metrics_window = tk.Toplevel(self.root)
+        self.metrics_window.title("性能")
+        self.metrics_window.geometry("620x420")
+        
+        controls = ttk.Frame(self.metrics_window)
+        controls.pack(fill=tk.X, side=tk.BOTTOM, padx=10, pady=5)
+        
+        self.metrics_enabled = tk.BooleanVar(value=metrics.is_enabled())
+        ttk.Checkbutton(controls, text="启用统计", variable=self.metrics_enabled,
+                        command=lambda: metrics.enable(self.metrics_enabled.get())).pack(side=tk.LEFT, padx=2)
+        buttons = [
+            ("清零", self.reset_metrics),
+            ("导出 Prometheus", lambda: self.export_metrics("prometheus")),
+            ("导出 JSON", lambda: self.export_metrics("json"))
+        ]
+        for text, cmd in buttons:
+            ttk.Button(controls, text=text, command=cmd).pack(side=tk.LEFT, padx=2)
+        
+        columns = ("次数", "平均", "p50", "p95", "最大")
+        self.metrics_tree = ttk.Treeview(self.metrics_window, columns=columns, show="tree headings")
+        self.metrics_tree.heading("#0", text="指标")
+        self.metrics_tree.column("#0", width=200)
+        for column in columns:
+            self.metrics_tree.heading(column, text=column)
+            self.metrics_tree.column(column, width=80, anchor=tk.E)
+        self.metrics_tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        self.refresh_metrics()
+        self.scheduler.register("metrics", self.refresh_metrics, 1000)
+    
+    def refresh_metrics(self):
+        """刷新性能统计窗口：耗时单位为毫秒，计数器只有次数一列"""
+        if not (self.metrics_window and self.metrics_window.winfo_exists()):
+            self.scheduler.unregister("metrics")
+            return
+        
+        data = metrics.REGISTRY.snapshot()
+        rows = {}
+        for name, histogram in data["histograms"].items():
+            rows[name] = (histogram["count"],) + tuple(
+                f"{histogram[key]:.1f}" for key in ("mean", "p50", "p95", "max"))
+        for name, value in data["counters"].items():
+            rows[name] = (value, "", "", "", "")
+        for item in self.metrics_tree.get_children():
+            if item not in rows:
+                self.metrics_tree.delete(item)
+        for name in sorted(rows):
+            if self.metrics_tree.exists(name):
+                self.metrics_tree.item(name, values=rows[name])
+            else:
+                self.metrics_tree.insert("", "end", iid=name, text=name, values=rows[name])
+    
+    def reset_metrics(self):
+        """清空性能统计"""
+        metrics.REGISTRY.reset()
+        self.refresh_metrics()
+    
+    def export_metrics(self, kind):
+        """把性能统计导出为 Prometheus 文本文件或追加到 JSON 日志"""
+        if kind == "json":
+            file_path = filedialog.asksaveasfilename(
+                title="导出性能统计", defaultextension=".jsonl",
+                filetypes=[("JSON日志", "*.jsonl *.json"), ("所有文件", "*.*")]
+            )
+        else:
+            file_path = filedialog.asksaveasfilename(
+                title="导出性能统计", defaultextension=".prom",
+                filetypes=[("Prometheus 文本", "*.prom"), ("所有文件", "*.*")]
+            )
+        if not file_path:
+            return
         try:
-            if os.path.exists('player_data.json'):
-                with open('player_data.json', 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.play_history = data.get('history', [])
-                    self.favorites = data.get('favorites', [])
-        except:
-            pass
+            if kind == "json":
+                metrics.REGISTRY.append_json(file_path)
+            else:
+                metrics.REGISTRY.write_prometheus(file_path)
+            self.status_label.config(text=f"性能统计已导出到: {file_path}")
+        except OSError as e:
+            messagebox.showerror("错误", f"导出性能统计失败: {str(e)}")
     
-    def save_data(self):
-        """保存数据"""
+    def export_metrics_file(self):
+        """定期把性能统计写入 --metrics 指定的文件"""
         try:
-            data = {
-                'history': self.play_history,
-                'favorites': self.favorites
-            }
-            with open('player_data.json', 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-        except:
-            pass
+            metrics.REGISTRY.write_file(self.metrics_path)
+        except OSError as e:
+            self.status_label.config(text=f"写入性能统计失败: {str(e)}")
+    
+    def toggle_profiler(self):
+        """开始采样分析（所有线程），再次调用时停止并保存结果"""
+        if self.profiler is not None:
+            self.save_profile()
+            return
+        self.profiler = profiler.create_profiler()
+        self.profiler.start()
+        self.tools_menu.entryconfig(self.profiler_menu_index, label="停止采样分析并保存")
+        self.status_label.config(text="采样分析中，再按 F9 停止并保存")
+    
+    def save_profile(self):
+        """停止采样分析，把折叠栈（可生成火焰图）和耗时排行保存到数据目录的 profiles 中"""
+        running, self.profiler = self.profiler, None
+        running.stop()
+        self.tools_menu.entryconfig(self.profiler_menu_index, label="开始采样分析")
+        directory = self.core.path("profiles") if self.core else "profiles"
+        prefix = os.path.join(directory, f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+        try:
+            paths = running.dump(prefix)
+            self.status_label.config(text=f"采样分析结果已保存到: {paths[0]}")
+        except OSError as e:
+            messagebox.showerror("错误", f"保存采样分析结果失败: {str(e)}")
+    
+    def on_close(self):
+        """退出前保存数据并停止后台任务"""
+        if self.profiler is not None:
+            self.save_profile()
+        self.scheduler.stop()
+        if self.preloader:
+            self.preloader.stop_all()
+        if self.thumbnail_pipeline:
+            self.thumbnail_pipeline.stop()
+        # 核心还在后台创建时等它完成，保证它同样被关闭
+        self.core_thread.join()
+        if self.core:
+            self.save_session(force=True)
+            self.core.close()
+        elif self.created_core:
+            self.created_core.close()
+        if self.metrics_path:
+            self.export_metrics_file()
+        self.timer.print_report()
+        self.root.destroy()
     
     def download_video(self):
-        """下载当前视频"""
+        """下载当前视频（加入下载队列）"""
+        if not self.is_ready():
+            return
         if self.current_index >= 0 and self.current_index < len(self.video_urls):
-            url = self.video_urls[self.current_index]
-            try:
-                self.status_label.config(text="正在下载视频...")
-                
-                # 创建下载目录
-                download_dir = "downloaded_videos"
-                if not os.path.exists(download_dir):
-                    os.makedirs(download_dir)
-                
-                response = requests.get(url, timeout=30)
-                response.raise_for_status()
-                
-                filename = os.path.join(download_dir, f"video_{self.current_index}_{int(time.time())}.mp4")
-                with open(filename, 'wb') as file:
-                    file.write(response.content)
-                
-                self.status_label.config(text=f"视频已下载到: {filename}")
-                messagebox.showinfo("下载完成", f"视频已下载到:\n{filename}")
-            except Exception as e:
-                self.status_label.config(text=f"下载失败: {str(e)}")
-                messagebox.showerror("下载失败", f"下载失败: {str(e)}")
+            self.core.download(self.video_urls[self.current_index])
+            self.status_label.config(text="已加入下载队列")
+    
+    def download_playlist(self):
+        """把播放列表中的网络视频全部加入下载队列"""
+        if not self.is_ready():
+            return
+        count = len(self.core.download_playlist())
+        self.status_label.config(text=f"已将 {count} 个视频加入下载队列")
+    
+    def on_download_update(self, job):
+        """下载任务状态变化（界面线程）"""
+        if job.state == download_manager.RUNNING:
+            self.status_label.config(text=f"正在下载 {job.filename}: {download.format_progress(job.done, job.total)}")
+        elif job.state == download_manager.DONE:
+            self.status_label.config(text=f"视频已下载到: {job.path}")
+        elif job.state == download_manager.FAILED:
+            self.status_label.config(text=f"下载失败: {job.error}")
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -638,5 +1532,12 @@ if __name__ == "__main__":
     except:
         pass
     
-    player = AdvancedVLCPlayer(root)
+    parser = argparse.ArgumentParser(description="高级VLC播放器 v5.0")
+    parser.add_argument("--timing", action="store_true", help="输出启动耗时（导入、首次绘制、首帧）")
+    parser.add_argument("--metrics", nargs="?", const="", metavar="PATH",
+                        help="启用性能统计（工具 > 性能），指定 PATH 时每10秒写入 Prometheus 文本文件（.json 结尾时追加 JSON）")
+    args, _ = parser.parse_known_args()
+    metrics.enable(args.metrics is not None)
+    
+    player = AdvancedVLCPlayer(root, StartupTimer(STARTED_AT, enabled=args.timing), args.metrics or None)
     root.mainloop() 
\ No newline at end of file